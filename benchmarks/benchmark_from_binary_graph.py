@@ -0,0 +1,100 @@
+"""Benchmark the graph construction of `sarxarray.from_binary`.
+
+Building the graph does not touch the files, so no data is needed. The script
+reports, for an increasing number of epochs, the time to build the stack and the
+number of tasks in the graph of the `complex` variable. Both should grow linearly
+with the number of epochs.
+
+For reference, the same numbers are reported for the previous implementation,
+which concatenated the stack one epoch at a time.
+
+Usage:
+
+    python benchmarks/benchmark_from_binary_graph.py
+"""
+
+import time
+
+import dask
+import dask.array as da
+import numpy as np
+
+import sarxarray
+
+SHAPE = (20_000, 70_000)
+CHUNKS = (2000, 2000)
+N_EPOCHS = (25, 50, 100, 200, 400)
+# The legacy graph grows quadratically, limit it to keep the runtime reasonable
+N_EPOCHS_LEGACY_MAX = 100
+
+
+def legacy_stack(slc_files, shape, dtype, chunks):
+    """Build the stack by repeated concatenation, as in sarxarray<=1.3."""
+
+    def load(filename, shape, dtype, sl1, sl2):
+        return np.memmap(filename, mode="r", shape=shape, dtype=dtype)[sl1, sl2]
+
+    def mmap_dask_array(filename):
+        load_delayed = dask.delayed(load)
+        rows = []
+        for i_az in range(0, shape[0], chunks[0]):
+            size_az = min(chunks[0], shape[0] - i_az)
+            cols = []
+            for i_ra in range(0, shape[1], chunks[1]):
+                size_ra = min(chunks[1], shape[1] - i_ra)
+                cols.append(
+                    da.from_delayed(
+                        load_delayed(
+                            filename,
+                            shape,
+                            dtype,
+                            slice(i_az, i_az + size_az),
+                            slice(i_ra, i_ra + size_ra),
+                        ),
+                        shape=(size_az, size_ra),
+                        dtype=dtype,
+                    )
+                )
+            rows.append(da.concatenate(cols, axis=1))
+        return da.concatenate(rows, axis=0).reshape((shape[0], shape[1], 1))
+
+    slcs = None
+    for f_slc in slc_files:
+        slc = mmap_dask_array(f_slc)
+        slcs = slc if slcs is None else da.concatenate([slcs, slc], axis=2)
+    return slcs
+
+
+def run(build, n_epochs):
+    """Return build time in seconds, and number of tasks and layers."""
+    slc_files = [f"epoch_{i:04d}.raw" for i in range(n_epochs)]
+    t0 = time.perf_counter()
+    arr = build(slc_files)
+    graph = arr.__dask_graph__()
+    n_tasks = len(graph)
+    elapsed = time.perf_counter() - t0
+    return elapsed, n_tasks, len(graph.layers)
+
+
+def main():
+    """Run the benchmark and print a table."""
+    builders = {
+        "from_binary": lambda files: sarxarray.from_binary(
+            files, SHAPE, chunks=CHUNKS
+        ).complex.data,
+        "legacy": lambda files: legacy_stack(files, SHAPE, np.complex64, CHUNKS),
+    }
+    print(f"shape={SHAPE}, chunks={CHUNKS}")
+    print(f"{'builder':>12} {'epochs':>7} {'time [s]':>9} {'tasks':>9} {'layers':>7}")
+    for label, build in builders.items():
+        for n_epochs in N_EPOCHS:
+            if label == "legacy" and n_epochs > N_EPOCHS_LEGACY_MAX:
+                continue
+            elapsed, n_tasks, n_layers = run(build, n_epochs)
+            print(
+                f"{label:>12} {n_epochs:>7} {elapsed:>9.3f} {n_tasks:>9} {n_layers:>7}"
+            )
+
+
+if __name__ == "__main__":
+    main()
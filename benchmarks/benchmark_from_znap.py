@@ -0,0 +1,150 @@
+"""Benchmark `sarxarray.from_znap` for an increasing number of ZNAP archives.
+
+The script creates synthetic ZNAP archives from the test data: the daughter archive
+in `tests/data/zarrs` is repeated with a shifted acquisition time in its metadata.
+The data layers are symbolic links to the original archive, so the archives take
+little space. The mother archive of the test data is linked once.
+
+It reports, for an increasing number of daughter epochs, the time of `from_znap`
+and the number of tasks in the graph of the `complex` variable. Both should grow
+linearly with the number of epochs. For reference, the time to stack the daughter
+epochs is compared with the previous implementation, which concatenated the stack
+one epoch at a time. Finally, it reports the time to write an index of the
+archives with `build_znap_index`, and the time of `from_znap` with that index.
+
+Usage:
+
+    python benchmarks/benchmark_from_znap.py [directory]
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import xarray as xr
+
+import sarxarray
+from sarxarray._io import (
+    _extract_snap_epoch,
+    _read_one_znap_archive,
+    _stack_daughters,
+)
+
+DATA_DIR = Path(__file__).parents[1] / "tests" / "data" / "zarrs"
+DAUGHTER = DATA_DIR / "20230319-coreg.znap"
+MOTHER = DATA_DIR / "20230331-coreg.znap"
+DAUGHTER_TIMESTAMP = "20230319T055031"
+N_EPOCHS = (25, 50, 100, 200, 400)
+# The legacy stacking grows quadratically, limit it to keep the runtime reasonable
+N_EPOCHS_LEGACY_MAX = 200
+
+
+def write_archives(directory, n_epochs):
+    """Write `n_epochs` synthetic daughter archives, and return all archives."""
+    metadata = (DAUGHTER / "SNAP" / "product_metadata.json").read_text()
+    t_daughter = datetime.strptime(DAUGHTER_TIMESTAMP, "%Y%m%dT%H%M%S")
+    archives = [Path(directory) / MOTHER.name]
+    os.symlink(MOTHER, archives[0])
+    for i_epoch in range(n_epochs):
+        timestamp = (t_daughter - timedelta(days=6 * (i_epoch + 1))).strftime(
+            "%Y%m%dT%H%M%S"
+        )
+        archive = Path(directory) / f"{timestamp}-coreg.znap"
+        (archive / "SNAP").mkdir(parents=True)
+        for item in DAUGHTER.iterdir():
+            if item.name == "SNAP":
+                continue
+            if item.is_dir():
+                os.symlink(item, archive / item.name)
+            else:
+                shutil.copy(item, archive / item.name)
+        (archive / "SNAP" / "product_metadata.json").write_text(
+            metadata.replace(DAUGHTER_TIMESTAMP, timestamp)
+        )
+        archives.append(archive)
+    return archives
+
+
+def legacy_stack_daughters(daughters):
+    """Stack the daughters by repeated concatenation, as in sarxarray<=1.3."""
+    ds_stack = None
+    for time_stamp, data in daughters:
+        if ds_stack is None:
+            ds_stack = data.expand_dims(time=[time_stamp])
+            ds_stack.attrs = {}
+            continue
+        ds_stack = xr.concat(
+            [ds_stack, data.expand_dims(time=[time_stamp])],
+            dim="time",
+            combine_attrs="override",
+        )
+    return ds_stack
+
+
+def time_stacking(stack_daughters, daughters):
+    """Return the time in seconds to stack the daughters."""
+    t0 = time.perf_counter()
+    stack_daughters(daughters)
+    return time.perf_counter() - t0
+
+
+def run(directory, archives):
+    """Return the from_znap time, number of tasks, stacking and index times."""
+    t0 = time.perf_counter()
+    stack = sarxarray.from_znap(archives)
+    elapsed = time.perf_counter() - t0
+    n_tasks = len(stack.complex.data.__dask_graph__())
+
+    daughters = []
+    for archive in archives[1:]:
+        data, _ = _read_one_znap_archive(archive)
+        metadata = sarxarray.read_metadata(
+            f"{archive}/SNAP/product_metadata.json", driver="snap"
+        )
+        time_stamp, _ = _extract_snap_epoch(metadata, False)
+        daughters.append((time_stamp, data))
+    elapsed_stack = time_stacking(_stack_daughters, daughters)
+    if len(daughters) <= N_EPOCHS_LEGACY_MAX:
+        elapsed_legacy = time_stacking(legacy_stack_daughters, daughters)
+    else:
+        elapsed_legacy = float("nan")
+
+    t0 = time.perf_counter()
+    index = sarxarray.build_znap_index(directory)
+    elapsed_build = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    sarxarray.from_znap(index=index)
+    elapsed_index = time.perf_counter() - t0
+    return (
+        elapsed,
+        n_tasks,
+        elapsed_stack,
+        elapsed_legacy,
+        elapsed_build,
+        elapsed_index,
+    )
+
+
+def main():
+    """Run the benchmark and print a table."""
+    directory = sys.argv[1] if len(sys.argv) > 1 else None
+    print(
+        f"{'epochs':>7} {'from_znap [s]':>13} {'tasks':>7} {'stack [s]':>9} "
+        f"{'legacy stack [s]':>16} {'build index [s]':>15} {'with index [s]':>14}"
+    )
+    for n_epochs in N_EPOCHS:
+        with tempfile.TemporaryDirectory(dir=directory) as tmp_dir:
+            archives = write_archives(tmp_dir, n_epochs)
+            elapsed, n_tasks, stack, legacy, build, indexed = run(tmp_dir, archives)
+        print(
+            f"{n_epochs:>7} {elapsed:>13.2f} {n_tasks:>7} {stack:>9.3f} "
+            f"{legacy:>16.3f} {build:>15.2f} {indexed:>14.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
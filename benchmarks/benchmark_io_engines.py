@@ -0,0 +1,85 @@
+"""Benchmark cold-cache read throughput of the I/O engines and hints of `from_binary`.
+
+The script writes a synthetic stack of binary files to a directory, then reads it
+with `from_binary` in range-chunked windows, with the "mmap" and "pread" engines,
+each with `io_hints=False` and `io_hints=True`. Before each run, the files are
+evicted from the file system cache with `posix_fadvise(POSIX_FADV_DONTNEED)` (Linux
+only), so that the reads hit the storage.
+
+Put the directory on the storage to benchmark, e.g. a spinning disk RAID or an NFS
+mount, since the gain of the engines and hints depends on the latency of the
+storage.
+
+Usage:
+
+    python benchmarks/benchmark_io_engines.py [directory]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+from synthetic import write_stack
+
+import sarxarray
+
+SHAPE = (4000, 8000)
+N_EPOCHS = 8
+CHUNKS = (4000, 1000)  # range-chunked windows
+N_REPEATS = 3
+
+
+def drop_file_cache(slc_files):
+    """Evict the files from the file system cache."""
+    # Close the cached memory maps, mapped pages can not be evicted
+    sarxarray.set_mmap_cache_size(sarxarray.mmap_cache_info()["maxsize"], clear=True)
+    for f_slc in slc_files:
+        fd = os.open(f_slc, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+        finally:
+            os.close(fd)
+
+
+def run(slc_files, engine, io_hints):
+    """Return the cold-cache read throughput in MB/s."""
+    stack = sarxarray.from_binary(
+        slc_files,
+        SHAPE,
+        vlabel="slc",
+        chunks=CHUNKS,
+        io_hints=io_hints,
+        engine=engine,
+    )
+    drop_file_cache(slc_files)
+    t0 = time.perf_counter()
+    stack.slc.data.sum().compute()
+    elapsed = time.perf_counter() - t0
+    return stack.slc.nbytes / 1024**2 / elapsed
+
+
+def main():
+    """Run the benchmark and print the throughput of each mode."""
+    if not hasattr(os, "posix_fadvise"):
+        sys.exit("This benchmark requires os.posix_fadvise to drop the file cache.")
+
+    directory = sys.argv[1] if len(sys.argv) > 1 else None
+    with tempfile.TemporaryDirectory(dir=directory) as tmp_dir:
+        slc_files = write_stack(tmp_dir, SHAPE, N_EPOCHS)
+        print(f"shape={SHAPE}, epochs={N_EPOCHS}, chunks={CHUNKS}, dir={tmp_dir}")
+        for engine in ("mmap", "pread"):
+            for io_hints in (False, True):
+                throughputs = [
+                    run(slc_files, engine, io_hints) for _ in range(N_REPEATS)
+                ]
+                print(
+                    f"engine={engine:>5}, io_hints={io_hints!s:>5}: "
+                    f"{np.median(throughputs):8.1f} MB/s (median of {N_REPEATS})"
+                )
+
+
+if __name__ == "__main__":
+    main()
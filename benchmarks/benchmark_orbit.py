@@ -0,0 +1,66 @@
+"""Benchmark `sarxarray.Orbit` for the interpolation of many times.
+
+The script builds orbits from the state vectors of the metadata in the test data:
+a Doris v5 orbit, interpolated with a polynomial, and a SNAP orbit, interpolated
+with Hermite polynomials. Each orbit is evaluated at 10^7 sorted times within the
+state vectors, e.g. the azimuth times of the lines of many epochs, as a NumPy
+array and as a chunked dask array.
+
+It reports the time of the interpolation, and the time per million query times.
+
+Usage:
+
+    python benchmarks/benchmark_orbit.py
+"""
+
+import time
+from pathlib import Path
+
+import dask
+import dask.array as da
+import numpy as np
+
+import sarxarray
+
+DATA_DIR = Path(__file__).parents[1] / "tests" / "data"
+METADATA_FILES = {
+    "doris5": DATA_DIR / "metadata/meta_doris5/20180306/metadata.res",
+    "snap": DATA_DIR / "zarrs/20230331-coreg.znap/SNAP/product_metadata.json",
+}
+N_TIMES = 10**7
+CHUNK_SIZE = 10**6
+
+
+def run(orbit, times):
+    """Return the time in seconds to interpolate the orbit at the times."""
+    t0 = time.perf_counter()
+    position, velocity = orbit.interpolate(times)
+    if isinstance(times, da.Array):
+        # Compute the position and velocity together, in one pass over the chunks
+        dask.compute(position, velocity)
+    return time.perf_counter() - t0
+
+
+def main():
+    """Run the benchmark and print a table."""
+    print(f"times={N_TIMES}, chunk size={CHUNK_SIZE}")
+    print(
+        f"{'driver':>7} {'method':>10} {'array':>6} {'time [s]':>9} {'per 1e6 [s]':>11}"
+    )
+    for driver, file in METADATA_FILES.items():
+        metadata = sarxarray.read_metadata(file, driver=driver)
+        orbit = sarxarray.Orbit.from_metadata(metadata)
+        times = np.linspace(orbit.time[0], orbit.time[-1], N_TIMES)
+        for label, query in [
+            ("numpy", times),
+            ("dask", da.from_array(times, chunks=CHUNK_SIZE)),
+        ]:
+            elapsed = run(orbit, query)
+            print(
+                f"{driver:>7} {orbit.method:>10} {label:>6} {elapsed:>9.2f} "
+                f"{elapsed / N_TIMES * 1e6:>11.3f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
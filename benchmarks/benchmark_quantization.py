@@ -0,0 +1,105 @@
+"""Benchmark the quantized storage of `binary_to_zarr`.
+
+The script writes a synthetic stack of binary files to a directory, with complex
+Gaussian speckle on a spatially varying mean amplitude, and converts it to Zarr
+without quantization, and with int16 and float16 quantization. The stores are
+compressed with the Zarr default compressor.
+
+For each store, it reports the compression ratio with respect to the raw complex64
+data, the read throughput of the decoded complex data with `from_dataset`, the
+maximum absolute error of the real and imaginary parts, and the 99th percentile of
+the phase error.
+
+Usage:
+
+    python benchmarks/benchmark_quantization.py [directory]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import xarray as xr
+from synthetic import write_stack
+
+import sarxarray
+
+SHAPE = (2000, 4000)
+N_EPOCHS = 8
+CHUNKS = (1000, 1000)
+N_REPEATS = 3
+
+# (quantization, max_error)
+MODES = [
+    (None, None),
+    ("int16", None),
+    ("int16", 1.0),
+    ("float16", None),
+]
+
+
+def store_size(path):
+    """Return the size of a Zarr store in bytes."""
+    return sum(
+        os.path.getsize(os.path.join(root, f))
+        for root, _, files in os.walk(path)
+        for f in files
+    )
+
+
+def run(slc_files, reference, directory, quantization, max_error):
+    """Return the compression ratio, read MB/s, max error and phase error."""
+    output = sarxarray.binary_to_zarr(
+        slc_files,
+        SHAPE,
+        os.path.join(directory, f"stack_{quantization}_{max_error}.zarr"),
+        chunks=CHUNKS,
+        quantization=quantization,
+        max_error=max_error,
+    )
+    ratio = reference.nbytes / store_size(output)
+
+    elapsed = []
+    for _ in range(N_REPEATS):
+        stack = sarxarray.from_dataset(xr.open_zarr(output), attach_amp_phase=False)
+        t0 = time.perf_counter()
+        decoded = stack.complex.values
+        elapsed.append(time.perf_counter() - t0)
+    throughput = reference.nbytes / 1024**2 / np.median(elapsed)
+
+    error = max(
+        np.abs(decoded.real - reference.real).max(),
+        np.abs(decoded.imag - reference.imag).max(),
+    )
+    phase_error = np.abs(np.angle(decoded * reference.conj()))
+    return ratio, throughput, error, np.percentile(phase_error, 99)
+
+
+def main():
+    """Run the benchmark and print a table."""
+    directory = sys.argv[1] if len(sys.argv) > 1 else None
+    with tempfile.TemporaryDirectory(dir=directory) as tmp_dir:
+        # Speckle on a spatially varying mean amplitude
+        rng = np.random.default_rng(0)
+        amplitude = np.exp(rng.normal(4, 1, SHAPE)).astype(np.float32)
+        slc_files = write_stack(tmp_dir, SHAPE, N_EPOCHS, amplitude=amplitude)
+        reference = sarxarray.from_binary(slc_files, SHAPE).complex.values
+        print(f"shape={SHAPE}, epochs={N_EPOCHS}, chunks={CHUNKS}")
+        print(
+            f"{'quantization':>12} {'max_error':>9} {'ratio':>6} {'read [MB/s]':>11} "
+            f"{'error':>9} {'phase p99 [rad]':>15}"
+        )
+        for quantization, max_error in MODES:
+            ratio, throughput, error, phase_error = run(
+                slc_files, reference, tmp_dir, quantization, max_error
+            )
+            print(
+                f"{quantization!s:>12} {max_error!s:>9} {ratio:>6.2f} "
+                f"{throughput:>11.1f} {error:>9.4f} {phase_error:>15.2e}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""Benchmark `sarxarray.read_metadata` for many large DORIS .res files.
+
+The script generates a stack of DORIS5 metadata files from the test data: each
+epoch gets a copy of a `metadata.res` file, padded to a few MB with lines of a
+processing log, as in the long-term archives, and an `ifgs.res` file next to it.
+
+It reports the time to read the metadata of all files one after another, with a
+thread pool and with a process pool.
+
+Usage:
+
+    python benchmarks/benchmark_read_metadata.py [directory]
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+
+import sarxarray
+
+DATA_DIR = Path(__file__).parents[1] / "tests" / "data" / "metadata" / "meta_doris5"
+N_FILES = 500
+FILE_SIZE_MB = 2
+N_WORKERS = min(8, os.cpu_count())
+
+
+def write_res_files(directory):
+    """Write `N_FILES` padded metadata files, and return their paths."""
+    content = (DATA_DIR / "20180306" / "metadata.res").read_text()
+    line = "Processing_log_entry:\t\t\t" + "0.123456789E+00 " * 4 + "\n"
+    n_lines = (FILE_SIZE_MB * 1024**2 - len(content)) // len(line)
+    content += line * n_lines
+
+    res_files = []
+    for i_epoch in range(N_FILES):
+        epoch_dir = Path(directory) / f"{i_epoch:04d}"
+        epoch_dir.mkdir()
+        (epoch_dir / "metadata.res").write_text(content)
+        shutil.copy(DATA_DIR / "20180306" / "ifgs.res", epoch_dir / "ifgs.res")
+        res_files.append(epoch_dir / "metadata.res")
+    return res_files
+
+
+def run(res_files, executor_class):
+    """Return the time in seconds to read the metadata of all files."""
+    t0 = time.perf_counter()
+    if executor_class is None:
+        sarxarray.read_metadata(res_files, driver="doris5")
+    else:
+        with executor_class(max_workers=N_WORKERS) as executor:
+            sarxarray.read_metadata(res_files, driver="doris5", executor=executor)
+    return time.perf_counter() - t0
+
+
+def main():
+    """Run the benchmark and print a table."""
+    directory = sys.argv[1] if len(sys.argv) > 1 else None
+    with tempfile.TemporaryDirectory(dir=directory) as tmp_dir:
+        res_files = write_res_files(tmp_dir)
+        print(f"files={N_FILES}, size={FILE_SIZE_MB} MB, workers={N_WORKERS}")
+        print(f"{'executor':>12} {'time [s]':>9} {'speedup':>8}")
+        elapsed_sequential = None
+        for label, executor_class in [
+            ("sequential", None),
+            ("threads", ThreadPoolExecutor),
+            ("processes", ProcessPoolExecutor),
+        ]:
+            elapsed = run(res_files, executor_class)
+            elapsed_sequential = elapsed_sequential or elapsed
+            print(f"{label:>12} {elapsed:>9.2f} {elapsed_sequential / elapsed:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
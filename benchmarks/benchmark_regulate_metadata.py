@@ -0,0 +1,74 @@
+"""Benchmark the regulation of the array metadata of many epochs.
+
+The script generates the metadata of a stack as read from DORIS5 .res files: each
+epoch has a list of orbit records, each a tuple of strings with the time and the
+position. It reports the time to regulate the orbit records of all epochs with
+`sarxarray._io._regulate_metadata`, compared with the previous implementation,
+which converted the records element by element.
+
+Usage:
+
+    python benchmarks/benchmark_regulate_metadata.py
+"""
+
+import time
+
+import numpy as np
+
+from sarxarray._io import _regulate_metadata
+
+N_EPOCHS = (10, 100, 1000)
+N_RECORDS = 2000
+
+
+def make_metadata(n_epochs):
+    """Return the unregulated metadata of `n_epochs` epochs."""
+    rng = np.random.default_rng(0)
+    orbits = []
+    for _ in range(n_epochs):
+        positions = rng.uniform(-7e6, 7e6, (N_RECORDS, 3))
+        orbits.append(
+            [
+                (str(t), *(f"{p:.6f}" for p in position))
+                for t, position in enumerate(positions)
+            ]
+        )
+    times = [f"2020-JAN-{i % 28 + 1:02d} 05:50:00.000000" for i in range(n_epochs)]
+    return {"first_azimuth_time": times, "orbit_txyz": orbits}
+
+
+def legacy_regulate_arrays(arrays):
+    """Convert the arrays element by element, as in sarxarray<=1.3."""
+    regulated_arrays = []
+    for arr in arrays:
+        regulated_array = np.zeros((len(arr), len(arr[0])))
+        for row in range(len(arr)):
+            for col in range(len(arr[row])):
+                regulated_array[row, col] = float(arr[row][col])
+        regulated_arrays.append(np.copy(regulated_array))
+    return [np.copy(regulated_array) for regulated_array in regulated_arrays]
+
+
+def main():
+    """Run the benchmark and print a table."""
+    print(f"records per epoch={N_RECORDS}")
+    print(f"{'epochs':>7} {'regulate [s]':>12} {'legacy [s]':>10} {'speedup':>8}")
+    for n_epochs in N_EPOCHS:
+        metadata = make_metadata(n_epochs)
+        arrays = metadata["orbit_txyz"]
+
+        t0 = time.perf_counter()
+        _regulate_metadata(dict(metadata), driver="doris5")
+        elapsed = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        legacy_regulate_arrays(arrays)
+        elapsed_legacy = time.perf_counter() - t0
+        print(
+            f"{n_epochs:>7} {elapsed:>12.3f} {elapsed_legacy:>10.3f} "
+            f"{elapsed_legacy / elapsed:>8.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
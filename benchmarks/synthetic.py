@@ -0,0 +1,44 @@
+"""Synthetic SLC stacks shared by the benchmarks.
+
+The benchmarks are run as scripts from the repository root, e.g.
+`python benchmarks/benchmark_io_engines.py`, such that this module is imported from
+the directory of the script.
+"""
+
+import os
+
+import numpy as np
+
+
+def write_stack(directory, shape, n_epochs, amplitude=None):
+    """Write a synthetic stack of complex64 binary files.
+
+    Each epoch is complex Gaussian noise, e.g. speckle, scaled by `amplitude`.
+
+    Parameters
+    ----------
+    directory : str
+        Directory to write the files to.
+    shape : tuple[int, int]
+        Shape of each file, in (n_azimuth, n_range).
+    n_epochs : int
+        Number of files.
+    amplitude : numpy.ndarray, optional
+        Mean amplitude of each pixel, with shape `shape`, by default None, i.e. 1.
+
+    Returns
+    -------
+    list[str]
+        Paths of the files, in the order of the epochs.
+    """
+    rng = np.random.default_rng(0)
+    slc_files = []
+    for i_epoch in range(n_epochs):
+        f_slc = os.path.join(directory, f"slc_{i_epoch:03d}.raw")
+        data = rng.standard_normal((shape[0], 2 * shape[1]), dtype=np.float32)
+        slc = data.view(np.complex64)
+        if amplitude is not None:
+            slc = slc * amplitude
+        slc.tofile(f_slc)
+        slc_files.append(f_slc)
+    return slc_files
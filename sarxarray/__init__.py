@@ -1,20 +1,33 @@
 from sarxarray import stack
 from sarxarray._io import (
+    build_znap_index,
     from_binary,
     from_dataset,
     from_znap,
+    mmap_cache_info,
     read_metadata,
+    set_mmap_cache_size,
     to_binary,
+    to_binary_stack,
 )
+from sarxarray._zarr import append_to_zarr, binary_to_zarr
+from sarxarray.orbit import Orbit
 from sarxarray.utils import complex_coherence, crop, multi_look
 
 __all__ = (
     "stack",
     "from_binary",
     "to_binary",
+    "to_binary_stack",
     "from_dataset",
     "from_znap",
+    "build_znap_index",
     "read_metadata",
+    "mmap_cache_info",
+    "set_mmap_cache_size",
+    "binary_to_zarr",
+    "append_to_zarr",
+    "Orbit",
     "multi_look",
     "complex_coherence",
     "crop",
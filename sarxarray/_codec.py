@@ -0,0 +1,211 @@
+import dask.array as da
+import numpy as np
+import xarray as xr
+
+from .conf import _dtypes
+
+# Largest absolute value of the quantized components
+_QUANTIZATION_MAX = {"int16": np.iinfo(np.int16).max, "float16": 1.0}
+
+# Maximum rounding error of a float16 component in [-1, 1], i.e. half of the unit in
+# the last place of the largest values
+_FLOAT16_ROUNDING = 2.0**-12
+
+
+def _quantize_complex(
+    complex: xr.DataArray, quantization: str, max_error: float | None = None
+) -> xr.Dataset:
+    """Quantize complex data to int16 or float16 real and imaginary parts.
+
+    The components of each chunk of `complex` are divided by a scale factor, and
+    rounded to int16 or float16. There is one scale factor per (azimuth, range)
+    chunk and epoch, stored in the data variable `scale` with the dimensions
+    `(azimuth_block, range_block, time)`.
+
+    For "int16", the scale factor is the quantization step. By default, the step is
+    the smallest one that fits the largest value of the chunk. If `max_error` is
+    given, the step is enlarged to `2 * max_error`, which gives coarser integers that
+    compress better. For "float16", the components are normalized by the largest
+    value of the chunk.
+
+    Parameters
+    ----------
+    complex : xr.DataArray
+        Complex data with the dimensions `(azimuth, range, time)`, backed by a Dask
+        array. The (azimuth, range) chunks are the blocks of the scale factors.
+    quantization : {"int16", "float16"}
+        Data type of the quantized components.
+    max_error : float, optional
+        Maximum absolute error of the real and imaginary parts, by default None,
+        i.e. the error is as small as the data type allows. A chunk for which the
+        error bound can not be met raises a ValueError when it is computed.
+
+    Returns
+    -------
+    xr.Dataset
+        Dataset with the data variables `real` and `imag` of dtype `quantization`,
+        and `scale`. The attributes of `real` record the quantization, such that
+        `_decode_complex` can restore the complex data.
+    """
+    if quantization not in _QUANTIZATION_MAX:
+        raise ValueError(
+            f"Quantization '{quantization}' is not supported. "
+            f"Supported quantizations are: {list(_QUANTIZATION_MAX)}."
+        )
+    data = complex.transpose("azimuth", "range", "time").data
+    if not isinstance(data, da.Array):
+        data = da.from_array(data)
+
+    scale = da.map_blocks(
+        _block_scale,
+        data,
+        quantization,
+        max_error,
+        chunks=((1,) * data.numblocks[0], (1,) * data.numblocks[1], data.chunks[2]),
+        dtype=np.float32,
+    )
+    # Real and imaginary parts stacked on a new last axis, computed from one pass
+    # over each complex block
+    iq = da.blockwise(
+        _quantize_block,
+        "ijkc",
+        data,
+        "ijk",
+        scale,
+        "ijk",
+        quantization,
+        None,
+        new_axes={"c": 2},
+        dtype=quantization,
+        align_arrays=False,
+    )
+
+    attrs = {
+        "quantization": quantization,
+        "quantization_block": [data.chunks[0][0], data.chunks[1][0]],
+    }
+    if max_error is not None:
+        attrs["quantization_max_error"] = max_error
+    coords = {dim: complex[dim] for dim in ["azimuth", "range", "time"]}
+    return xr.Dataset(
+        {
+            "real": (("azimuth", "range", "time"), iq[..., 0], attrs),
+            "imag": (("azimuth", "range", "time"), iq[..., 1]),
+            # One chunk of scale factors per row of chunks
+            "scale": (
+                ("azimuth_block", "range_block", "time"),
+                scale.rechunk({1: -1}),
+            ),
+        },
+        coords={dim: coord for dim, coord in coords.items() if dim in complex.coords},
+    )
+
+
+def _decode_complex(ds: xr.Dataset) -> xr.DataArray:
+    """Restore complex64 data from quantized real and imaginary parts.
+
+    Parameters
+    ----------
+    ds : xr.Dataset
+        Dataset with the data variables `real`, `imag` and `scale`, as created by
+        `_quantize_complex`.
+
+    Returns
+    -------
+    xr.DataArray
+        Complex data with dimensions `(azimuth, range, time)` and dtype complex64.
+    """
+    block = tuple(ds["real"].attrs["quantization_block"])
+    # The scale factors are small, one per chunk and epoch, so they are loaded
+    scale = np.asarray(ds["scale"].transpose("azimuth_block", "range_block", "time"))
+    real = ds["real"].transpose("azimuth", "range", "time").data
+    imag = ds["imag"].transpose("azimuth", "range", "time").data
+    if not isinstance(real, da.Array):
+        real, imag = da.from_array(real), da.from_array(imag)
+    complex = da.map_blocks(
+        _dequantize_block,
+        real,
+        imag.rechunk(real.chunks),
+        scale=scale,
+        block=block,
+        dtype=_dtypes["complex"],
+    )
+    return xr.DataArray(
+        complex,
+        dims=("azimuth", "range", "time"),
+        coords={dim: ds[dim] for dim in ["azimuth", "range", "time"] if dim in ds},
+    )
+
+
+def _is_quantized(ds: xr.Dataset) -> bool:
+    """Check whether the real and imaginary parts in `ds` are quantized."""
+    return "real" in ds.variables and "quantization" in ds["real"].attrs
+
+
+def _block_scale(complex, quantization, max_error):
+    # Largest absolute value of the components, per epoch
+    max_abs = np.maximum(
+        np.abs(complex.real).max(axis=(0, 1), initial=0),
+        np.abs(complex.imag).max(axis=(0, 1), initial=0),
+    ).astype(np.float64)
+    if not np.all(np.isfinite(max_abs)):
+        raise ValueError(
+            "Complex data with NaN or infinite values can not be quantized."
+        )
+
+    # Margin for the float32 rounding of the scale factor and the decoded values
+    rounding = 4 * np.finfo(np.float32).eps * max_abs
+    if quantization == "int16":
+        scale = max_abs / _QUANTIZATION_MAX["int16"]
+        error = scale / 2 + rounding
+        if max_error is not None:
+            scale = np.maximum(scale, 2 * (max_error - rounding))
+    else:
+        scale = max_abs
+        error = scale * _FLOAT16_ROUNDING + rounding
+    if max_error is not None and np.any(error > max_error):
+        raise ValueError(
+            f"The error bound {max_error} can not be met with {quantization} "
+            f"quantization for values up to {max_abs.max()}."
+        )
+    # Avoid division by zero for chunks of zeros
+    scale[scale == 0] = 1
+    return scale.astype(np.float32).reshape((1, 1, -1))
+
+
+def _quantize_block(complex, scale, quantization):
+    iq = np.empty((*complex.shape, 2), dtype=quantization)
+    inv_scale = (1 / scale.astype(np.float64)).astype(np.float32)
+    if quantization == "int16":
+        # Clip the rounding of the largest values, which can exceed the maximum
+        max_int = _QUANTIZATION_MAX["int16"]
+        for part, out in [(complex.real, iq[..., 0]), (complex.imag, iq[..., 1])]:
+            np.clip(
+                np.rint(part * inv_scale), -max_int, max_int, out=out, casting="unsafe"
+            )
+    else:
+        np.multiply(complex.real, inv_scale, out=iq[..., 0], casting="unsafe")
+        np.multiply(complex.imag, inv_scale, out=iq[..., 1], casting="unsafe")
+    return iq
+
+
+def _dequantize_block(real, imag, scale, block, block_info=None):
+    (az0, az1), (rg0, rg1), (t0, t1) = block_info[0]["array-location"]
+    if (
+        az0 // block[0] == (az1 - 1) // block[0]
+        and rg0 // block[1] == (rg1 - 1) // block[1]
+    ):
+        # Block within one quantization block, one scale factor per epoch
+        scale_block = scale[az0 // block[0], rg0 // block[1], t0:t1]
+    else:
+        scale_block = scale[
+            np.ix_(
+                np.arange(az0, az1) // block[0],
+                np.arange(rg0, rg1) // block[1],
+                np.arange(t0, t1),
+            )
+        ]
+    complex = np.empty(real.shape, dtype=_dtypes["complex"])
+    np.multiply(real, scale_block, out=complex.real, dtype=np.float32)
+    np.multiply(imag, scale_block, out=complex.imag, dtype=np.float32)
+    return complex
@@ -1,18 +1,28 @@
+import hashlib
 import json
 import logging
 import math
+import mmap
 import os
 import re
-from collections import defaultdict
+import threading
+from collections import OrderedDict, defaultdict
+from concurrent.futures import Executor, ThreadPoolExecutor
 from datetime import datetime, timedelta
+from functools import cache, partial
 from pathlib import Path
+from time import perf_counter
 from typing import Literal
 
 import dask
 import dask.array as da
 import numpy as np
 import xarray as xr
+from dask.array.core import normalize_chunks
+from dask.base import tokenize
+from dask.highlevelgraph import HighLevelGraph
 
+from ._codec import _decode_complex, _is_quantized
 from .conf import (
     META_ARRAY_KEYS,
     META_ARRAY_SHAPES_SNAP,
@@ -31,18 +41,136 @@ from .conf import (
     TIME_FORMAT_SNAP,
     TIME_STAMP_KEY,
     ZNAP_DATA_VAR_MOTHER,
+    _complex_interleaved_dtypes,
     _dtypes,
     _memsize_chunk_mb,
+    _metadata_cache_max_size_mb,
+    _mmap_cache_maxsize,
 )
 
 logger = logging.getLogger(__name__)
 
+# Version of the format of the entries in the metadata cache
+_METADATA_CACHE_VERSION = 1
 
-def from_dataset(ds: xr.Dataset) -> xr.Dataset:
+# Patterns parsed from the metadata files per driver, part of the metadata cache key
+_METADATA_PATTERNS = {
+    "doris4": [RE_PATTERNS_DORIS4],
+    "doris5": [RE_PATTERNS_DORIS5, RE_PATTERNS_DORIS5_IFG],
+    "snap": [RE_PATTERNS_SNAP, META_ARRAY_SHAPES_SNAP],
+}
+
+# Default file name and format version of the index of ZNAP archives
+_ZNAP_INDEX_FILE = "znap_index.json"
+_ZNAP_INDEX_VERSION = 1
+
+
+class _MemmapCache:
+    """Least-recently-used cache of open read-only memory maps.
+
+    The memory maps are keyed by (path, dtype, shape). There is one cache per
+    process, so each Dask worker process keeps its own memory maps open. The number
+    of open memory maps is bounded by `maxsize`, to stay under the limit of open
+    file descriptors. A cached memory map is reopened if the file has been modified.
+    """
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._maps = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, filename, shape, dtype):
+        """Return a read-only memory map of the file, opening it if needed.
+
+        The memory map is returned both as a NumPy array and as the underlying
+        `mmap.mmap`, which is used to advise the kernel about the access pattern.
+        """
+        filename = os.fspath(filename)
+        key = (filename, np.dtype(dtype), tuple(shape))
+        stat = os.stat(filename)
+        signature = (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+        with self._lock:
+            cached = self._maps.get(key)
+            if cached is not None and cached[0] == signature:
+                self._maps.move_to_end(key)
+                self.hits += 1
+                return cached[1:]
+            self.misses += 1
+
+        nbytes = math.prod(shape) * np.dtype(dtype).itemsize
+        with open(filename, "rb") as f:
+            mm = mmap.mmap(f.fileno(), nbytes, access=mmap.ACCESS_READ)
+        data = np.ndarray(shape, dtype=dtype, buffer=mm)
+        with self._lock:
+            self._maps[key] = (signature, data, mm)
+            self._maps.move_to_end(key)
+            self._evict()
+        return data, mm
+
+    def info(self):
+        """Return the hit/miss counters and the size of the cache."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "maxsize": self.maxsize,
+                "currsize": len(self._maps),
+            }
+
+    def resize(self, maxsize):
+        """Change the maximum number of open memory maps."""
+        with self._lock:
+            self.maxsize = maxsize
+            self._evict()
+
+    def clear(self):
+        """Close all cached memory maps and reset the counters."""
+        with self._lock:
+            self._maps.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def _evict(self):
+        while len(self._maps) > self.maxsize:
+            self._maps.popitem(last=False)
+
+
+_mmap_cache = _MemmapCache(_mmap_cache_maxsize)
+
+
+class _BinaryWriter:
+    """Target of `dask.array.store` writing regions of a raw binary file.
+
+    The file is memory mapped for each written region, so that the writer can be
+    sent to Dask workers, and each worker writes the chunks it computed.
+    """
+
+    def __init__(self, path, shape, dtype):
+        self.path = os.fspath(path)
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+
+    def create(self):
+        """Create the file with the size of the data, or truncate it."""
+        with open(self.path, "wb") as f:
+            f.truncate(math.prod(self.shape) * self.dtype.itemsize)
+
+    def __setitem__(self, key, value):
+        if math.prod(self.shape) == 0:
+            return
+        memmap = np.memmap(self.path, dtype=self.dtype, mode="r+", shape=self.shape)
+        memmap[key] = value
+        memmap.flush()
+
+
+def from_dataset(ds: xr.Dataset, attach_amp_phase: bool = True) -> xr.Dataset:
     """Create a SLC stack or from an Xarray Dataset.
 
     This function create tasks graph converting the two data variables of complex data:
     `real` and `imag`, to three variables: `complex`, `amplitude`, and `phase`.
+    The complex data is always complex64, and each chunk is built in one allocation.
 
     The function is intended for an SLC stack in `xr.Dataset` loaded from a Zarr file.
 
@@ -53,21 +181,33 @@ def from_dataset(ds: xr.Dataset) -> xr.Dataset:
     ds : xr.Dataset
         SLC stack loaded from a Zarr file.
         Must have three dimensions: `(azimuth, range, time)`.
-        Must have two variables: `real` and `imag`.
+        Must have two variables: `real` and `imag`, or one variable `iq` with the
+        interleaved real and imaginary parts along a `component` dimension of size
+        2, which is viewed as complex64 without a copy if stored as float32.
+        Quantized `real` and `imag`, written by `binary_to_zarr` with the
+        `quantization` option, are decoded to complex64.
+    attach_amp_phase : bool, optional
+        Whether to attach the `amplitude` and `phase` data variables, by default
+        True. If False, only `complex` is attached, and the amplitude and phase
+        can be computed on access with `ds.slcstack.amplitude` and
+        `ds.slcstack.phase`. This halves the size of the stack when it is
+        computed or written, e.g. with `to_zarr`.
 
     Returns
     -------
     xr.Dataset
         Converted SLC stack.
         An xarray.Dataset with three dimensions: `(azimuth, range, time)`, and
-        three variables: `complex`, `amplitude`, `phase`.
+        three variables: `complex`, `amplitude`, `phase`, or only `complex` if
+        `attach_amp_phase` is False.
 
     Raises
     ------
     ValueError
         The input dataset should have three dimensions: `(azimuth, range, time)`.
     ValueError
-        The input dataset should have the following variables: `('real', 'imag')`.
+        The input dataset should have the following variables: `('real', 'imag')`,
+        or `iq`.
     """
     # Check ds should have the following dimensions: (azimuth, range, time)
     if any(dim not in ds.sizes for dim in ["azimuth", "range", "time"]):
@@ -75,19 +215,31 @@ def from_dataset(ds: xr.Dataset) -> xr.Dataset:
             "The input dataset should have three dimensions: (azimuth, range, time)."
         )
 
-    # Check ds should have the following variables: ("real", "imag")
-    if any(var not in ds.variables for var in ["real", "imag"]):
+    # Check ds should have the following variables: ("real", "imag"), or "iq"
+    if "iq" in ds.variables and "component" in ds["iq"].dims:
+        ds_vars = ["iq"]
+    elif all(var in ds.variables for var in ["real", "imag"]):
+        ds_vars = ["real", "imag"]
+    else:
         raise ValueError(
-            "The input dataset should have the following variables: ('real', 'imag')."
+            "The input dataset should have the following variables: ('real', 'imag'),"
+            " or 'iq' with a 'component' dimension."
         )
 
     # Construct the three datavariables: complex, amplitude, and phase
-    ds["complex"] = ds["real"] + 1j * ds["imag"]
-    ds = ds.slcstack._get_amplitude()
-    ds = ds.slcstack._get_phase()
+    # Quantized real and imag, e.g. written by `binary_to_zarr`, are decoded
+    if ds_vars == ["iq"]:
+        ds["complex"] = _view_complex(ds["iq"])
+    elif _is_quantized(ds):
+        ds["complex"] = _decode_complex(ds)
+        ds = ds.drop_vars("scale")
+    else:
+        ds["complex"] = _combine_complex(ds["real"], ds["imag"])
+    if attach_amp_phase:
+        ds = ds.slcstack._get_amplitude_phase()
 
     # Remove the original real and imag variables
-    ds = ds.drop_vars(["real", "imag"])
+    ds = ds.drop_vars(ds_vars)
 
     return ds
 
@@ -96,9 +248,13 @@ def from_binary(
     slc_files: list[str | Path],
     shape: tuple[int, int],
     vlabel: str = "complex",
-    dtype: np.dtype = np.complex64,
+    dtype: np.dtype | str = np.complex64,
     chunks: tuple[int, int] | None = None,
     ratio: float = 1,
+    time_chunks: int | Literal["auto"] = 1,
+    io_hints: bool = False,
+    engine: Literal["mmap", "pread"] = "mmap",
+    attach_amp_phase: bool = True,
 ):
     """Read a SLC stack or related variables from binary files.
 
@@ -110,21 +266,60 @@ def from_binary(
         Shape of each SLC file, in (n_azimuth, n_range)
     vlabel : str, optional
         Name of the variable to read, by default "complex".
-    dtype : numpy.dtype, optional
-        Data type of the file to read, by default np.float32
+    dtype : numpy.dtype or str, optional
+        Data type of the file to read, by default np.complex64.
+        Interleaved complex data, e.g. the CInt16 format of Sentinel-1 and
+        TerraSAR-X SLCs, can be read with a customized dtype with the fields "re"
+        and "im", or with the shorthands "cint16" and "cfloat16". Interleaved
+        complex data is decoded to complex64 when reading each chunk.
     chunks : list, optional
         2-D chunk size, by default None
     ratio:
         Ratio of resolutions (azimuth/range), by default 1
+    time_chunks : int or "auto", optional
+        Chunk size in the time direction, by default 1. Each task reads the same
+        window from `time_chunks` files. Use -1 to put all epochs in one chunk, such
+        that temporal operations do not need to rechunk. If "auto", all epochs are
+        put in one chunk, and the 2-D chunk size (if not user-defined) is reduced
+        such that a chunk fits in the optimal chunk memory size.
+    io_hints : bool, optional
+        Whether to advise the kernel about the access pattern when reading a chunk,
+        by default False. The bytes of a chunk are advised as needed before
+        reading. If a chunk covers complete azimuth rows, they are also advised as
+        sequential, and as not needed after reading. The pages of a chunk that is
+        split in range are kept, since the neighbouring chunks read them too.
+        This can improve the throughput on storage with a high latency, such as
+        spinning disks or network file systems, when the files are not in the file
+        system cache. Only effective on platforms supporting `madvise` (for the
+        "mmap" engine) or `posix_fadvise` (for the "pread" engine).
+    engine : {"mmap", "pread"}, optional
+        I/O engine to read the binary files, by default "mmap". The "mmap" engine
+        memory maps the files, which performs well on local storage and when the
+        files are in the file system cache. The "pread" engine reads each chunk
+        with explicit positional reads, one per contiguous run of bytes, which can
+        be faster on network or parallel file systems, e.g. NFS or Lustre.
+    attach_amp_phase : bool, optional
+        Whether to attach the `amplitude` and `phase` data variables when reading
+        complex data, by default True. If False, they can be computed on access
+        with `stack.slcstack.amplitude` and `stack.slcstack.phase`.
 
     Returns
     -------
     xarray.Dataset
         An xarray.Dataset with three dimensions: (azimuth, range, time).
 
+    Raises
+    ------
+    ValueError
+        If `slc_files` is not a non-empty Iterable, or if `engine` is not supported.
+    TypeError
+        If a customized `dtype` does not have the fields "re" and "im".
     """
     # Check dtype
-    if not np.dtype(dtype).isbuiltin:
+    if isinstance(dtype, str) and dtype.lower() in _complex_interleaved_dtypes:
+        dtype = _complex_interleaved_dtypes[dtype.lower()]
+    dtype = np.dtype(dtype)
+    if not dtype.isbuiltin:
         if not all([name in (("re", "im")) for name in dtype.names]):
             raise TypeError(
                 "The customed dtype should have only two field names: "
@@ -141,8 +336,14 @@ def from_binary(
     ds_stack = xr.Dataset(coords=coords)
 
     # Calculate appropriate chunk size if not user-defined
-    if chunks is None:
-        chunks = _calc_chunksize(shape, dtype, ratio)
+    if time_chunks == "auto":
+        time_chunks = -1
+        if chunks is None:
+            chunks = _calc_chunksize(
+                shape, _decoded_dtype(dtype), ratio, n_time=len(slc_files)
+            )
+    elif chunks is None:
+        chunks = _calc_chunksize(shape, _decoded_dtype(dtype), ratio)
 
     # Check if slc_files is a non empty Iterable and not a string
     if not hasattr(slc_files, "__iter__") or isinstance(slc_files, str):
@@ -153,35 +354,33 @@ def from_binary(
     if len(slc_files) == 0:
         raise ValueError("slc_files should be a non-empty Iterable.")
 
-    # Read in all SLCs
-    slcs = None
-    for f_slc in slc_files:
-        if slcs is None:
-            slcs = _mmap_dask_array(f_slc, shape, dtype, chunks).reshape(
-                (shape[0], shape[1], 1)
-            )
-        else:
-            slc = _mmap_dask_array(f_slc, shape, dtype, chunks).reshape(
-                (shape[0], shape[1], 1)
-            )
-            slcs = da.concatenate([slcs, slc], axis=2)
+    if engine not in _load_chunk_engines:
+        raise ValueError(
+            f"Engine '{engine}' is not supported. "
+            f"Supported engines are: {list(_load_chunk_engines)}."
+        )
 
-    # unpack the customized dtype
-    if not np.dtype(dtype).isbuiltin:
-        meta_arr = np.array((), dtype=_dtypes["complex"])
-        slcs = da.apply_gufunc(_unpack_complex, "()->()", slcs, meta=meta_arr)
+    # Read in all SLCs as one (azimuth, range, time) Dask array
+    # The customized dtype is unpacked to complex when reading
+    slcs = _binary_dask_stack(
+        slc_files, shape, dtype, chunks, time_chunks, io_hints, engine
+    )
 
     ds_stack = ds_stack.assign({vlabel: (("azimuth", "range", "time"), slcs)})
 
     # If reading complex data, automatically
-    if vlabel == "complex":
-        ds_stack = ds_stack.slcstack._get_amplitude()
-        ds_stack = ds_stack.slcstack._get_phase()
+    if vlabel == "complex" and attach_amp_phase:
+        ds_stack = ds_stack.slcstack._get_amplitude_phase()
 
     return ds_stack
 
 
-def from_znap(snap_znap_archives: list[str | Path]) -> xr.Dataset:
+def from_znap(
+    snap_znap_archives: list[str | Path] | None = None,
+    attach_amp_phase: bool = True,
+    max_workers: int | None = 1,
+    index: str | Path | None = None,
+) -> xr.Dataset:
     """Read an SLC stack from a list of ZNAP archives produced by SNAP.
 
     SNAP produces .znap-archives, which are very similar to the .zarr
@@ -206,10 +405,31 @@ def from_znap(snap_znap_archives: list[str | Path]) -> xr.Dataset:
     These layers are not passed on, as they do not fit into the azimuth/range
     coordinate system of sarxarray.
 
+    Since SNAP does not consolidate the metadata of the ZNAP archives, each
+    archive is discovered by listing and reading many small files, and its SNAP
+    metadata is parsed from a large JSON file. For repeated loading of the same
+    archives, an index can be written once with `build_znap_index`, and passed as
+    `index` instead of `snap_znap_archives`.
+
     Parameters
     ----------
-    snap_znap_archives: list[str | Path]
-        List of .znap archives to be read into an xarray Dataset
+    snap_znap_archives: list[str | Path] | None
+        List of .znap archives to be read into an xarray Dataset. Should be None if
+        `index` is given.
+    attach_amp_phase: bool
+        Whether to attach the amplitude and phase data layers, by default True. If
+        False, they can be computed on access with `ds.slcstack.amplitude` and
+        `ds.slcstack.phase`.
+    max_workers: int | None
+        Number of threads to open the archives and parse their metadata, by default
+        1, i.e. one archive after another. On network storage, where opening an
+        archive is dominated by latency, more threads can speed up the loading. If
+        None, the default of `concurrent.futures.ThreadPoolExecutor` is used. The
+        result does not depend on the number of threads.
+    index: str | Path | None
+        Path to an index of ZNAP archives written by `build_znap_index`, by default
+        None. If given, all archives in the index are read, using the variables
+        and metadata recorded in the index.
 
     Returns
     -------
@@ -217,7 +437,8 @@ def from_znap(snap_znap_archives: list[str | Path]) -> xr.Dataset:
         Dataset containing:
             - the coordinates azimuth/range (corrected for cropping offsets) and time
             - complex data layer based on ZNAPs i and q data layers
-            - amplitude and phase data layers as calculated from the complex data
+            - amplitude and phase data layers as calculated from the complex data,
+                if `attach_amp_phase` is True
             - any extra data layers present in the ZNAPs at a daughter acquisition as
                 (azimuth, range, time) data variables
             - any extra data layers present only in the mother ZNAP archive as
@@ -227,35 +448,48 @@ def from_znap(snap_znap_archives: list[str | Path]) -> xr.Dataset:
     ------
     ValueError
         If `snap_znap_archives` is empty or not iterable
+        If both or none of `snap_znap_archives` and `index` are given
         If the timestamp of the image cannot be found in the metadata
         If multiple mother images are identified
     """
     # Validate input for from_znap
-    _validate_snap_znap_archives(snap_znap_archives)
-
-    # Loop over all ZNAP archives and read into ds_stack
-    ds_stack = None  # Stack of all epochs as xr.Dataset
+    if (snap_znap_archives is None) == (index is None):
+        raise ValueError("Either snap_znap_archives or index should be given.")
+    if index is None:
+        _validate_snap_znap_archives(snap_znap_archives)
+        read_archive = _read_one_znap
+        entries = snap_znap_archives
+    else:
+        index = Path(index)
+        with open(index) as f:
+            entries = json.load(f)["archives"]
+        # Archive paths are relative to the index
+        read_archive = partial(_read_indexed_znap, root=index.parent)
+
+    # Open all ZNAP archives and parse their metadata, possibly concurrently
+    # The results are in the order of the archives
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        archives = list(executor.map(read_archive, entries))
+
+    # Loop over all ZNAP archives and collect the daughter epochs
+    daughters = []  # List of (timestamp, xr.Dataset) of the daughter epochs
     data_mother = None  # Mother epoch specific xr.Dataset
     mother_epoch = None  # Mother epoch
     mother_timestamp = None  # Mother timestamp
-    metadata_file = None  # Metadata file, read from mother epoch
-    epoch_file_dict = {}  # Map of epoch to file. snap_znap_archives may not be sorted
-    for file in snap_znap_archives:
-        # Read the ZNAP archive and check if it is a mother epoch
-        data, is_mother = _read_one_znap_archive(file)
-
+    metadata_mother = None  # Metadata of the mother epoch
+    epoch_metadata_dict = {}  # Map of epoch to metadata. Archives may not be sorted
+    for data, is_mother, metadata in archives:
         # Get current epoch
         # Mother and daughter epochs need to be treated differently
-        metadata = read_metadata(f"{file}/SNAP/product_metadata.json", driver="snap")
         time_stamp, epoch = _extract_snap_epoch(metadata, is_mother)
 
-        # register the epoch and file in a dictionary for later use
-        epoch_file_dict[epoch] = file
+        # register the epoch and metadata in a dictionary for later use
+        epoch_metadata_dict[epoch] = metadata
 
-        # Append all daughter epochs to ds_stack
+        # Collect all daughter epochs, they are stacked at once below
         # Mother epoch will be added later
         if not is_mother:
-            ds_stack = _append_one_daughter(ds_stack, data, time_stamp)
+            daughters.append((time_stamp, data))
         else:
             # If mother epoch, keep variables ZNAP_DATA_VAR_MOTHER separately
             # Assign an all zero h2ph variable
@@ -270,7 +504,10 @@ def from_znap(snap_znap_archives: list[str | Path]) -> xr.Dataset:
             data_mother = data
             mother_epoch = epoch
             mother_timestamp = time_stamp
-            metadata_file = f"{file}/SNAP/product_metadata.json"
+            metadata_mother = metadata
+
+    # Stack all daughter epochs in one concatenation
+    ds_stack = _stack_daughters(daughters)
 
     # If it exists, add the mother epoch data to ds_stack, separated by variables
     # with and without time dimension. For those that only exist at daughter epochs
@@ -293,21 +530,16 @@ def from_znap(snap_znap_archives: list[str | Path]) -> xr.Dataset:
     # sort ds_stack by time
     ds_stack = ds_stack.sortby("time")
 
-    # order epoch_file_dict by epoch
-    epoch_file_dict = dict(sorted(epoch_file_dict.items()))
-
-    # Read the metadata from the mother epoch if it exists
-    if metadata_file is not None:
-        metadata = read_metadata(metadata_file, driver="snap")
+    # Use the metadata of the mother epoch if it exists
+    if metadata_mother is not None:
+        metadata = metadata_mother
     else:
         warning_msg = (
             "Mother epoch has not been identified. "
             "Using first epoch for metadata instead."
         )
         logger.warning(warning_msg)
-        file_first_epoch = next(iter(epoch_file_dict.values()))
-        metadata_file = f"{file_first_epoch}/SNAP/product_metadata.json"
-        metadata = read_metadata(metadata_file, driver="snap")
+        metadata = epoch_metadata_dict[min(epoch_metadata_dict)]
 
     # Assign the metadata to ds_stack.attrs["metadata_mother"]
     ds_stack = ds_stack.assign_attrs({"metadata_mother": metadata})
@@ -327,13 +559,15 @@ def from_znap(snap_znap_archives: list[str | Path]) -> xr.Dataset:
             azimuth=ds_stack["azimuth"] + metadata["first_line_number"],
             range=ds_stack["range"] + metadata["first_pixel_number"],
         )  # shift the azimuth and range coordinates by offset
-        .assign({"complex": ds_stack["i"] + 1j * ds_stack["q"]})  # assign complex
+        .assign(
+            {"complex": _combine_complex(ds_stack["i"], ds_stack["q"])}
+        )  # assign complex
         .drop_vars(["i", "q"])  # drop the original i and q variables
     )
 
     # Calculate amplitude and phase from complex
-    ds_stack = ds_stack.slcstack._get_amplitude()
-    ds_stack = ds_stack.slcstack._get_phase()
+    if attach_amp_phase:
+        ds_stack = ds_stack.slcstack._get_amplitude_phase()
 
     return ds_stack
 
@@ -349,6 +583,10 @@ def to_binary(
     The dtype and shape of the resulting binary file will be the same as the input
     data.
 
+    If the data is a Dask array, it is written chunk by chunk, in parallel by the
+    Dask scheduler, without loading the whole array in memory. The write throughput
+    is logged at the INFO level.
+
     Parameters
     ----------
     output_path: str
@@ -394,20 +632,187 @@ def to_binary(
     else:
         raise ValueError("data is not xr.DataArray or xr.Dataset!")
 
-    # Create the memmap
-    memmap = np.memmap(
-        output_path, dtype=datalayer.dtype, mode="w+", shape=datalayer.shape
+    # Create the file, then write the data region by region
+    writer = _BinaryWriter(output_path, datalayer.shape, datalayer.dtype)
+    writer.create()
+    t_start = perf_counter()
+    if isinstance(datalayer.data, da.Array):
+        da.store(datalayer.data, writer, lock=False)
+    else:
+        writer[...] = datalayer.data
+    _log_write_throughput(datalayer.nbytes, perf_counter() - t_start, output_path)
+
+
+def to_binary_stack(
+    output: str | Path,
+    data: xr.Dataset | xr.DataArray,
+    data_var_name: str | None = None,
+    allow_overwrite: bool = False,
+    resume: bool = False,
+) -> list[str]:
+    """Write a stack data layer to one binary file per epoch.
+
+    This exports an `(azimuth, range, time)` data layer to the layout of DORIS,
+    i.e. one raw binary file per epoch. The dtype of the files is the dtype of
+    the data layer, and the shape of each file is the shape of one epoch.
+
+    All epochs are written concurrently through one Dask graph, so chunks shared
+    by several epochs, e.g. chunks read by `from_binary` with `time_chunks>1`, are
+    computed only once. Each file is first written with the suffix ".part", which
+    is removed when the epoch is complete. Therefore, after a partial failure, the
+    export can be resumed with `resume=True`, which skips the complete files.
+
+    Parameters
+    ----------
+    output : str | Path
+        Output directory, or filename pattern. In a filename pattern, the fields
+        `{epoch}` and `{index}` are replaced by the time coordinate of the epoch
+        (formatted as YYYYMMDD for datetime coordinates) and the index of the epoch
+        along the time dimension, e.g. "stack/{epoch}/slave_rsmp.raw". If a
+        directory is given, the files are named "{epoch}.raw" in that directory.
+        Missing directories are created.
+    data : xr.Dataset | xr.DataArray
+        Dataset or DataArray containing the data variable that should be written.
+        If `data` is an `xr.Dataset`, the argument `data_var_name` is required to
+        indicate which data variable should be written. The data variable must have
+        a `time` dimension.
+    data_var_name : str | None
+        Name of the data variable that should be written. Only used if `data` is an
+        `xr.Dataset`, otherwise ignored. Default is `None`
+    allow_overwrite : bool
+        Whether or not to allow overwriting existing files. If an output file exists,
+        `allow_overwrite=False` and `resume=False`, an OSError is raised. Default is
+        `False`
+    resume : bool
+        Whether to skip the epochs of which the output file exists, e.g. to resume
+        an interrupted export. Takes precedence over `allow_overwrite`. Default is
+        `False`
+
+    Returns
+    -------
+    list[str]
+        Paths to the binary files of all epochs, in the order of the time dimension.
+
+    Raises
+    ------
+    ValueError
+        - When `data` is an `xr.Dataset` but `data_var_name` is `None`
+        - When `data` is not an `xr.Dataset` or `xr.DataArray`
+        - When the data layer has no `time` dimension
+        - When the filename pattern gives the same path for different epochs
+
+    KeyError
+        When `data` is an `xr.Dataset` and `data_var_name` is not a data variable in
+        `data`
+
+    OSError
+        When an output file exists, and both `allow_overwrite` and `resume` are
+        `False`
+    """
+    if isinstance(data, xr.Dataset):
+        if data_var_name is not None:
+            datalayer = xr.DataArray(data[data_var_name])
+        else:
+            raise ValueError("Dataset provided but data_var_name is None!")
+    elif isinstance(data, xr.DataArray):
+        datalayer = data
+    else:
+        raise ValueError("data is not xr.DataArray or xr.Dataset!")
+
+    if "time" not in datalayer.dims:
+        raise ValueError("The data layer should have a time dimension.")
+
+    output_paths = _epoch_output_paths(output, datalayer["time"].values)
+    if len(set(output_paths)) != len(output_paths):
+        raise ValueError(
+            f"The output {output} gives the same path for different epochs. "
+            "Please use the {epoch} or {index} field in the filename pattern."
+        )
+
+    # Check all existing files before writing anything
+    epochs_to_write = []
+    for index, output_path in enumerate(output_paths):
+        if os.path.exists(output_path):
+            if resume:
+                logger.info(f"Skipping epoch {index}, {output_path} exists.")
+                continue
+            if not allow_overwrite:
+                raise OSError(
+                    f"Requested output file {output_path} exists and overwriting "
+                    "is not allowed!"
+                )
+        epochs_to_write.append(index)
+
+    # Build the writes of all epochs, then compute them in one graph
+    writes = []
+    nbytes = 0
+    for index in epochs_to_write:
+        output_path = output_paths[index]
+        os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+        epoch_layer = datalayer.isel(time=index)
+        writer = _BinaryWriter(
+            f"{output_path}.part", epoch_layer.shape, epoch_layer.dtype
+        )
+        writer.create()
+        if isinstance(epoch_layer.data, da.Array):
+            stored = da.store(epoch_layer.data, writer, lock=False, compute=False)
+            # Without graph optimization, since fusing the reads into the writes of
+            # each epoch would read the chunks shared by several epochs once per
+            # epoch
+            stored = stored.to_delayed(optimize_graph=False).ravel().tolist()
+        else:
+            writer[...] = epoch_layer.data
+            stored = None
+        writes.append(dask.delayed(_finalize_part)(stored, writer.path, output_path))
+        nbytes += epoch_layer.nbytes
+
+    t_start = perf_counter()
+    dask.compute(*writes)
+    _log_write_throughput(nbytes, perf_counter() - t_start, output)
+
+    return output_paths
+
+
+def _epoch_output_paths(output, times):
+    """Get the output path of each epoch from a directory or a filename pattern."""
+    output = os.fspath(output)
+    if "{" not in output:
+        output = os.path.join(output, "{epoch}.raw")
+
+    output_paths = []
+    for index, time_value in enumerate(times):
+        if np.issubdtype(np.asarray(time_value).dtype, np.datetime64):
+            epoch = np.datetime_as_string(time_value, unit="D").replace("-", "")
+        else:
+            epoch = str(time_value)
+        output_paths.append(output.format(epoch=epoch, index=index))
+    return output_paths
+
+
+def _finalize_part(_stored, part_path, output_path):
+    """Rename a completely written ".part" file to its final name."""
+    os.replace(part_path, output_path)
+
+
+def _log_write_throughput(nbytes, elapsed, output):
+    """Log the throughput of writing `nbytes` in `elapsed` seconds."""
+    throughput = nbytes / 1024**2 / max(elapsed, 1e-9)
+    logger.info(
+        f"Wrote {nbytes / 1024**2:.1f} MB to {output} in {elapsed:.2f} s "
+        f"({throughput:.1f} MB/s)."
     )
-    # Assign the data to the memmap
-    memmap[:] = datalayer.data[:]
-    # Save the memmap
-    memmap.flush()
 
 
-def _mmap_dask_array(filename, shape, dtype, chunks):
-    """Create a Dask array from raw binary data by memory mapping.
+def _binary_dask_stack(
+    slc_files, shape, dtype, chunks, time_chunks=1, io_hints=False, engine="mmap"
+):
+    """Create a 3D Dask array from a stack of raw binary files.
+
+    The whole `(azimuth, range, time)` cube is described by a single graph layer,
+    with one task per (azimuth-chunk, range-chunk, time-chunk). Therefore the size
+    of the graph, and the time to build it, grow linearly with the number of files.
 
-    This method is particularly effective if the file is already
+    The "mmap" engine is particularly effective if the files are already
     in the file system cache and if arbitrary smaller subsets are
     to be extracted from the Dask array without optimizing its
     chunking scheme.
@@ -416,48 +821,114 @@ def _mmap_dask_array(filename, shape, dtype, chunks):
 
     Parameters
     ----------
-    filename : str
-        The path to the file that contains raw binary data.
+    slc_files : list
+        Paths to the files that contain raw binary data, one file per epoch.
     shape : tuple
-        Total shape of the data in the file
+        Total shape of the data in each file, in (n_azimuth, n_range)
     dtype:
-        NumPy dtype of the data in the file
-    chunks : int, optional
-        Chunk size for the outermost axis. The other axes remain unchunked.
+        NumPy dtype of the data in the files
+    chunks : tuple
+        Chunk size in azimuth and range direction.
+    time_chunks : int, optional
+        Chunk size in time direction, by default 1. Use -1 for a single chunk.
+    io_hints : bool, optional
+        Whether to advise the kernel about the access pattern, by default False.
+    engine : str, optional
+        I/O engine, "mmap" or "pread", by default "mmap".
 
     Returns
     -------
     dask.array.Array
-        Dask array matching :code:`shape` and :code:`dtype`, backed by
-        memory-mapped chunks.
+        Dask array of shape `(n_azimuth, n_range, n_files)` and :code:`dtype`, or
+        complex64 if :code:`dtype` is a customized dtype with fields "re" and "im".
     """
-    load = dask.delayed(_mmap_load_chunk)
-    range_chunks = []
-    for azimuth_index in range(0, shape[0], chunks[0]):
-        azimuth_chunks = []
-        # Truncate the last chunk if necessary
-        azimuth_chunk_size = min(chunks[0], shape[0] - azimuth_index)
-        for range_index in range(0, shape[1], chunks[1]):
-            # Truncate the last chunk if necessary
-            range_chunk_size = min(chunks[1], shape[1] - range_index)
-            chunk = dask.array.from_delayed(
-                load(
-                    filename,
-                    shape=shape,
-                    dtype=dtype,
-                    sl1=slice(azimuth_index, azimuth_index + azimuth_chunk_size),
-                    sl2=slice(range_index, range_index + range_chunk_size),
-                ),
-                shape=(azimuth_chunk_size, range_chunk_size),
-                dtype=dtype,
-            )
-            azimuth_chunks.append(chunk)
-        range_chunk = da.concatenate(azimuth_chunks, axis=1)
-        range_chunks.append(range_chunk)
-    return da.concatenate(range_chunks, axis=0)
+    slc_files = [str(f_slc) for f_slc in slc_files]
+    chunks_3d = normalize_chunks(
+        (chunks[0], chunks[1], time_chunks),
+        shape=(shape[0], shape[1], len(slc_files)),
+        dtype=_decoded_dtype(dtype),
+    )
+    name = "from-binary-" + tokenize(
+        slc_files, shape, dtype, chunks_3d, io_hints, engine
+    )
+
+    dsk = {}
+    for i_az, sl1 in enumerate(_chunk_slices(chunks_3d[0])):
+        for i_ra, sl2 in enumerate(_chunk_slices(chunks_3d[1])):
+            for i_t, sl3 in enumerate(_chunk_slices(chunks_3d[2])):
+                dsk[(name, i_az, i_ra, i_t)] = (
+                    _load_block,
+                    slc_files[sl3],
+                    shape,
+                    dtype,
+                    sl1,
+                    sl2,
+                    io_hints,
+                    engine,
+                )
+
+    graph = HighLevelGraph.from_collections(name, dsk, dependencies=())
+    return da.Array(graph, name, chunks_3d, dtype=_decoded_dtype(dtype))
+
+
+def _chunk_slices(chunks_1d):
+    """Convert the chunk sizes along one dimension to slices."""
+    stops = np.cumsum(chunks_1d, dtype=int)
+    return [
+        slice(int(stop - size), int(stop))
+        for size, stop in zip(chunks_1d, stops, strict=True)
+    ]
+
+
+def _load_block(filenames, shape, dtype, sl1, sl2, io_hints=False, engine="mmap"):
+    """Load the same window from a list of files into one 3D block.
 
+    Parameters
+    ----------
+    filenames : list
+        Paths to the files that contain raw binary data, one file per epoch.
+    shape : tuple
+        Total shape of the data in each file
+    dtype:
+        NumPy dtype of the data in the files
+    sl1:
+        Slice object in azimuth direction
+    sl2:
+        Slice object in range direction
+    io_hints : bool, optional
+        Whether to advise the kernel about the access pattern, by default False.
+    engine : str, optional
+        I/O engine, "mmap" or "pread", by default "mmap".
+
+    Returns
+    -------
+    numpy.ndarray
+        Block of shape `(n_azimuth, n_range, len(filenames))`. If only one file is
+        given, the engine is "mmap" and `io_hints` is False, this is a view into
+        the memory map. A customized dtype with fields "re" and "im" is unpacked to
+        complex64.
+    """
+    load_chunk = _load_chunk_engines[engine]
+    unpack = not np.dtype(dtype).isbuiltin
+    if len(filenames) == 1 and engine == "mmap" and not io_hints:
+        chunk = load_chunk(filenames[0], shape, dtype, sl1, sl2)
+        if unpack:
+            chunk = _unpack_complex(chunk)
+        return chunk[..., np.newaxis]
+
+    # Read each epoch into a contiguous slice of the block, then move the
+    # time axis to the end without copying
+    block = np.empty(
+        (len(filenames), sl1.stop - sl1.start, sl2.stop - sl2.start), dtype=dtype
+    )
+    for i_t, filename in enumerate(filenames):
+        load_chunk(filename, shape, dtype, sl1, sl2, io_hints, out=block[i_t])
+    if unpack:
+        block = _unpack_complex(block)
+    return np.moveaxis(block, 0, -1)
 
-def _mmap_load_chunk(filename, shape, dtype, sl1, sl2):
+
+def _mmap_load_chunk(filename, shape, dtype, sl1, sl2, io_hints=False, out=None):
     """Memory map the given file with overall shape and dtype.
 
     It returns a slice specified by :code:`sl1` in azimuth direction and
@@ -477,27 +948,305 @@ def _mmap_load_chunk(filename, shape, dtype, sl1, sl2):
     sl2:
         Slice object in range direction that can be used for indexing or slicing
         a NumPy array to extract a chunk
+    io_hints : bool, optional
+        Whether to advise the kernel about the access pattern, by default False.
+        If True, the chunk is copied out of the memory map, after which its pages
+        are advised as not needed if the chunk covers complete azimuth rows.
+    out : numpy.ndarray, optional
+        Array to copy the chunk into, by default None.
 
     Returns
     -------
-    numpy.memmap or numpy.ndarray
+    numpy.ndarray
         View into memory map created by indexing with :code:`sl1` and
-        :code:`sl2`, or NumPy ndarray in case no view can be created.
+        :code:`sl2`, or a copy in case no view can be created, or if `io_hints` or
+        `out` is given.
     """
-    data = np.memmap(filename, mode="r", shape=shape, dtype=dtype)
-    return data[sl1, sl2]
+    data, mm = _mmap_cache.get(filename, shape, dtype)
+
+    if io_hints:
+        runs, full_rows = _chunk_runs(shape, dtype, sl1, sl2)
+        if full_rows:
+            _madvise(mm, ("MADV_SEQUENTIAL", "MADV_WILLNEED"), *runs[0])
+        else:
+            for run in runs:
+                _madvise(mm, ("MADV_WILLNEED",), *run)
+
+    if out is not None:
+        out[...] = data[sl1, sl2]
+        chunk = out
+    elif io_hints:
+        chunk = np.array(data[sl1, sl2])
+    else:
+        chunk = data[sl1, sl2]
+
+    # The pages of a chunk that does not cover complete rows are shared with the
+    # neighbouring chunks in range, which may still read them
+    if io_hints and full_rows:
+        _madvise(mm, ("MADV_DONTNEED",), *runs[0])
+
+    return chunk
+
+
+def _pread_load_chunk(filename, shape, dtype, sl1, sl2, io_hints=False, out=None):
+    """Read a chunk from the given file with explicit positional reads.
+
+    The chunk is read with one `os.preadv` per contiguous run of bytes directly
+    into a preallocated buffer: one run for the whole chunk if it covers complete
+    azimuth rows, otherwise one run per azimuth row.
+
+    Parameters
+    ----------
+    filename : str
+        The path to the file that contains raw binary data.
+    shape : tuple
+        Total shape of the data in the file
+    dtype:
+        NumPy dtype of the data in the file
+    sl1:
+        Slice object in azimuth direction
+    sl2:
+        Slice object in range direction
+    io_hints : bool, optional
+        Whether to advise the kernel about the access pattern with
+        `posix_fadvise`, by default False.
+    out : numpy.ndarray, optional
+        C-contiguous array to read the chunk into, by default None.
+
+    Returns
+    -------
+    numpy.ndarray
+        The chunk, of shape `(n_azimuth, n_range)`.
+    """
+    n_rows = sl1.stop - sl1.start
+    n_cols = sl2.stop - sl2.start
+
+    chunk = np.empty((n_rows, n_cols), dtype=dtype) if out is None else out
+    buffer = memoryview(chunk.reshape(-1).view(np.uint8))
+    runs, full_rows = _chunk_runs(shape, dtype, sl1, sl2)
+
+    with open(filename, "rb", buffering=0) as f:
+        if io_hints:
+            if full_rows:
+                _fadvise(f, ("POSIX_FADV_SEQUENTIAL", "POSIX_FADV_WILLNEED"), *runs[0])
+            else:
+                for run in runs:
+                    _fadvise(f, ("POSIX_FADV_WILLNEED",), *run)
+
+        # The runs are read one after another into the buffer
+        position = 0
+        for offset, length in runs:
+            _pread_into(f, buffer[position : position + length], offset)
+            position += length
+
+        # The pages of a chunk that does not cover complete rows are shared with
+        # the neighbouring chunks in range, which may still read them
+        if io_hints and full_rows:
+            _fadvise(f, ("POSIX_FADV_DONTNEED",), *runs[0])
+
+    return chunk
+
+
+def _chunk_runs(shape, dtype, sl1, sl2):
+    """Return the contiguous byte runs of a chunk in a file, as (offset, length).
+
+    There is one run for the whole chunk if it covers complete azimuth rows, which
+    is also returned as a flag, otherwise one run per azimuth row.
+    """
+    itemsize = np.dtype(dtype).itemsize
+    row_nbytes = shape[1] * itemsize
+    n_rows = sl1.stop - sl1.start
+    n_cols = sl2.stop - sl2.start
+    if n_cols == shape[1]:
+        return [(sl1.start * row_nbytes, n_rows * row_nbytes)], True
+    offset = sl1.start * row_nbytes + sl2.start * itemsize
+    runs = [(offset + i_row * row_nbytes, n_cols * itemsize) for i_row in range(n_rows)]
+    return runs, False
+
+
+def _pread_into(f, buffer, offset):
+    """Fill the buffer with bytes from the file starting at `offset`."""
+    while len(buffer) > 0:
+        if hasattr(os, "preadv"):
+            n_bytes = os.preadv(f.fileno(), [buffer], offset)
+        else:  # e.g. on Windows
+            f.seek(offset)
+            n_bytes = f.readinto(buffer)
+        if not n_bytes:
+            raise OSError(
+                f"Unexpected end of file {f.name} at byte {offset}. "
+                "Please check the shape and dtype of the file."
+            )
+        buffer = buffer[n_bytes:]
+        offset += n_bytes
+
+
+def _fadvise(f, advices, start, length):
+    """Advise the kernel about the use of a byte range of an open file.
+
+    Advices not supported by the platform are skipped.
+    """
+    if not hasattr(os, "posix_fadvise"):
+        return
+    for advice in advices:
+        if hasattr(os, advice):
+            os.posix_fadvise(f.fileno(), start, length, getattr(os, advice))
+
+
+def _madvise(mm, advices, start, length):
+    """Advise the kernel about the use of a byte range of a memory map.
+
+    Advices not supported by the platform are skipped.
+    """
+    if not hasattr(mm, "madvise"):  # e.g. on Windows
+        return
+
+    # madvise requires the start to be aligned to the page size
+    aligned_start = start - start % mmap.PAGESIZE
+    length = length + start - aligned_start
+    for advice in advices:
+        if hasattr(mmap, advice):
+            mm.madvise(getattr(mmap, advice), aligned_start, length)
+
+
+# Functions to load a chunk from a binary file, per I/O engine
+_load_chunk_engines = {"mmap": _mmap_load_chunk, "pread": _pread_load_chunk}
+
+
+def mmap_cache_info() -> dict:
+    """Get the statistics of the cache of memory maps used by `from_binary`.
+
+    `from_binary` keeps the memory maps of the binary files open in a
+    least-recently-used cache, so that repeated reads of the same file do not
+    open and map it again. The cache and its counters are per process. When
+    using a Dask distributed cluster, the statistics of each worker can be
+    retrieved by `client.run(sarxarray.mmap_cache_info)`.
+
+    Returns
+    -------
+    dict
+        Dictionary with the number of cache `hits` and `misses`, the maximum
+        number of open memory maps `maxsize`, and the current number `currsize`.
+    """
+    return _mmap_cache.info()
+
+
+def set_mmap_cache_size(maxsize: int, clear: bool = False) -> None:
+    """Set the maximum number of open memory maps cached by `from_binary`.
+
+    When the cache is full, the least recently used memory map is closed. Each
+    open memory map holds a file descriptor, so `maxsize` should stay well below
+    the limit of open files of the process. The setting is per process.
+
+    Parameters
+    ----------
+    maxsize : int
+        Maximum number of open memory maps. Use 0 to disable caching.
+    clear : bool, optional
+        Whether to close all cached memory maps and reset the hit/miss counters,
+        by default False.
+
+    Raises
+    ------
+    ValueError
+        If `maxsize` is negative.
+    """
+    if maxsize < 0:
+        raise ValueError(f"maxsize should be non-negative, got {maxsize}.")
+    if clear:
+        _mmap_cache.clear()
+    _mmap_cache.resize(maxsize)
 
 
 def _unpack_complex(complex):
-    return complex["re"] + 1j * complex["im"]
+    """Unpack a customized dtype with fields "re" and "im" to complex64.
 
+    If both fields have the same type and are packed, the data is viewed as an
+    array of components and cast to float32 in one vectorized step, which is then
+    viewed as complex64. Otherwise, the fields are cast into a complex64 array.
+    Both avoid intermediate complex arrays.
+    """
+    complex = np.asarray(complex)
+    comp_dtype = complex.dtype.fields["re"][0]
+    if (
+        complex.ndim > 0
+        and complex.dtype == np.dtype([("re", comp_dtype), ("im", comp_dtype)])
+        and complex.strides[-1] == complex.dtype.itemsize
+    ):
+        components = complex.view(comp_dtype)  # last axis doubled: re, im, re, ...
+        return components.astype(np.float32).view(_dtypes["complex"])
+
+    unpacked = np.empty(complex.shape, dtype=_dtypes["complex"])
+    unpacked.real = complex["re"]
+    unpacked.imag = complex["im"]
+    return unpacked
+
+
+def _combine_complex(real: xr.DataArray, imag: xr.DataArray) -> xr.DataArray:
+    """Combine the real and imaginary parts to complex64, chunk by chunk.
+
+    Unlike `real + 1j * imag`, this allocates only the complex64 output of each
+    chunk, and the output dtype does not depend on the dtype of the parts.
+    """
+    return xr.apply_ufunc(
+        _combine_complex_block,
+        real,
+        imag,
+        dask="parallelized",
+        output_dtypes=[_dtypes["complex"]],
+    )
+
+
+def _combine_complex_block(real, imag):
+    complex = np.empty(np.broadcast_shapes(real.shape, imag.shape), _dtypes["complex"])
+    complex.real = real
+    complex.imag = imag
+    return complex
 
-def _calc_chunksize(shape: tuple, dtype: np.dtype, ratio: int):
+
+def _view_complex(iq: xr.DataArray, dim: str = "component") -> xr.DataArray:
+    """View interleaved real and imaginary parts along `dim` as complex64.
+
+    The chunks of interleaved float32 parts, with `dim` as the last axis, are viewed
+    as complex64 without a copy. Otherwise, the parts are combined into a new
+    complex64 array.
+    """
+    return xr.apply_ufunc(
+        _view_complex_block,
+        iq,
+        input_core_dims=[[dim]],
+        dask="parallelized",
+        output_dtypes=[_dtypes["complex"]],
+    )
+
+
+def _view_complex_block(iq):
+    if (
+        iq.dtype == _dtypes["float"]
+        and iq.shape[-1] == 2
+        and iq.strides[-1] == iq.itemsize
+        and iq.strides[-2] == 2 * iq.itemsize
+    ):
+        return iq.view(_dtypes["complex"])[..., 0]
+    return _combine_complex_block(iq[..., 0], iq[..., 1])
+
+
+def _decoded_dtype(dtype):
+    """Return the dtype of the data after unpacking a customized complex dtype."""
+    if np.dtype(dtype).isbuiltin:
+        return np.dtype(dtype)
+    return np.dtype(_dtypes["complex"])
+
+
+def _calc_chunksize(shape: tuple, dtype: np.dtype, ratio: int, n_time: int = 1):
     """Calculate an optimal chunking size.
 
     It calculates an optimal chunking size in the azimuth and range direction
     for reading with dask and store it in variable `chunks`.
 
+    When `n_time` is larger than 1, the optimal memory size is shared by `n_time`
+    epochs, i.e. a chunk of all epochs fits in the optimal memory size.
+
     Parameters
     ----------
     shape : tuple
@@ -506,19 +1255,26 @@ def _calc_chunksize(shape: tuple, dtype: np.dtype, ratio: int):
         NumPy dtype of the data in the file
     ratio:
         Ratio of resolutions (azimuth/range)
+    n_time:
+        Number of epochs in one chunk, by default 1
 
     Returns
     -------
     chunks: tuple
         Chunk sizes (as multiples of 1000) in the azimuth and range direction.
+        Chunks smaller than 1000 are multiples of the largest power of ten below
+        their size.
         Default value of [-1, -1] when unmodified activates this function.
     """
     n_elements = (
-        _memsize_chunk_mb * 1024 * 1024 / np.dtype(dtype).itemsize
+        _memsize_chunk_mb * 1024 * 1024 / np.dtype(dtype).itemsize / n_time
     )  # Optimal number of elements for a memory size of 100mb (first number)
+    chunks_ra_raw = (n_elements / ratio) ** 0.5
+    # Round up to nearest thousand, or nearest power of ten for small chunks
+    unit = min(1000, 10 ** max(0, math.floor(math.log10(chunks_ra_raw))))
     chunks_ra = (
-        int(math.ceil((n_elements / ratio) ** 0.5 / 1000.0)) * 1000
-    )  # Chunking size in range direction up to nearest thousand
+        int(math.ceil(chunks_ra_raw / unit)) * unit
+    )  # Chunking size in range direction
     chunks_az = chunks_ra * ratio
 
     # Regulate chunk to the size of each dim
@@ -534,7 +1290,12 @@ def read_metadata(
     files: str | list | Path,
     driver: Literal["doris4", "doris5", "snap"] = "doris5",
     ifg_file_name: str = "ifgs.res",
-) -> dict:
+    max_workers: int | None = 1,
+    executor: Executor | None = None,
+    cache_dir: str | Path | None = None,
+    cache_max_size_mb: float = _metadata_cache_max_size_mb,
+    per_epoch: bool = False,
+) -> dict | xr.Dataset:
     """Read metadata of a coregistered interferogram stack.
 
     This function reads metadata from one or more metadata files from a coregistered
@@ -566,6 +1327,15 @@ def read_metadata(
     TIME_STAMP_KEY, it treats it as the timestamp of acquisition and
     converts it to a numpy array of datetime64 format, sorted in ascending order.
 
+    With `per_epoch=True`, the metadata of the files is not combined, but returned as
+    a table with one row per file: an xarray Dataset with a variable per metadata key
+    along the `time` dimension. The time coordinate is TIME_STAMP_KEY of each file,
+    sorted in ascending order. The keys in META_FLOAT_KEYS are converted to float64
+    and the keys in META_INT_KEYS to int64, both in SI units, and the other keys are
+    kept as strings. A value missing in a file is NaN for numbers and an empty
+    string otherwise; an integer key with missing values is converted to float64.
+    The keys in META_ARRAY_KEYS, which have an array per file, are left out.
+
 
     Parameters
     ----------
@@ -579,16 +1349,40 @@ def read_metadata(
         We assume this file is next to each metadata file and use it to read the
         interferogram size information. if it is not found, the size
         information will not be included in the metadata. Default is "ifgs.res".
+    max_workers : int | None, optional
+        Number of threads to parse the files, by default 1, i.e. one file after
+        another. If None, the default of `concurrent.futures.ThreadPoolExecutor` is
+        used. Threads mainly help when reading the files is dominated by latency,
+        e.g. on network storage. Ignored if `executor` is given.
+    executor : concurrent.futures.Executor | None, optional
+        Executor to parse the files with, by default None. Parsing the files is
+        CPU bound, so for many large files a `concurrent.futures.ProcessPoolExecutor`
+        can be faster than threads. The result does not depend on the executor.
+    cache_dir : str | Path | None, optional
+        Directory of an on-disk cache of the parsed metadata files, by default None,
+        i.e. no caching. The parsed metadata of each file is stored in the cache,
+        keyed by the path, size and modification time of the file and the driver,
+        such that reading the same files again, e.g. in a new session, skips the
+        parsing. A modified file is parsed again. The directory is created if it
+        does not exist.
+    cache_max_size_mb : float, optional
+        Maximum size of the cache directory in MB, by default 1024. When the cache
+        is larger, the least recently used entries are removed.
+    per_epoch : bool, optional
+        Return the metadata of each file as a table indexed by time, instead of
+        combining it, by default False. Only for the drivers "doris4" and "doris5".
 
     Returns
     -------
-    dict
-        Dictionary containing the metadata read from the files.
+    dict | xr.Dataset
+        Dictionary containing the metadata read from the files, or a Dataset with
+        the metadata of each file if `per_epoch` is True.
 
     Raises
     ------
     NotImplementedError
-        If the driver is not "doris4" or "doris5".
+        If the driver is not "doris4" or "doris5", or if `per_epoch` is True for the
+        "snap" driver.
     """
     # Check driver
     if driver not in ["doris4", "doris5", "snap"]:
@@ -596,6 +1390,12 @@ def read_metadata(
             f"Driver '{driver}' is not implemented. "
             "Supported drivers are: 'doris4', 'doris5', 'snap'."
         )
+    if per_epoch and driver == "snap":
+        # The abstracted metadata of each coregistered SNAP product is the mother's
+        raise NotImplementedError(
+            "per_epoch is not implemented for driver 'snap', since the metadata "
+            "of each SNAP archive describes the mother image."
+        )
 
     # If there is only one file, convert it to a list
     if not isinstance(files, list):
@@ -604,11 +1404,36 @@ def read_metadata(
     # Force all files to be Path objects in case files is a list of strings
     files = [Path(file) for file in files]
 
-    # Parse metadata from each file
+    # Parse metadata from each file, possibly concurrently
+    # The results are in the order of files
+    parse = partial(_parse_metadata, driver=driver, ifg_file_name=ifg_file_name)
+    if cache_dir is not None:
+        cache = _MetadataCache(cache_dir, cache_max_size_mb)
+        parse = partial(
+            _parse_metadata_cached,
+            parse=parse,
+            cache=cache,
+            driver=driver,
+            ifg_file_name=ifg_file_name,
+        )
+    if executor is not None:
+        results = list(executor.map(parse, files))
+    elif max_workers == 1 or len(files) == 1:
+        results = [parse(file) for file in files]
+    else:
+        with ThreadPoolExecutor(max_workers=max_workers) as thread_executor:
+            results = list(thread_executor.map(parse, files))
+
+    # Limit the size of the cache once, after all files are cached
+    if cache_dir is not None:
+        cache.evict()
+
+    if per_epoch:
+        return _tabulate_metadata(results, driver)
+
     # if a key does not exists, a list will be created
     metadata = defaultdict(list)
-    for file in files:
-        res = _parse_metadata(file, driver, ifg_file_name)
+    for res in results:
         for key, value in res.items():
             metadata[key].append(value)
 
@@ -644,19 +1469,7 @@ def _parse_metadata(file, driver, ifg_file_name):
         with open(file) as f:
             content = f.read()
 
-        for key, pattern in patterns.items():
-            if key in META_ARRAY_KEYS.keys():  # multiple hits allowed
-                matches = re.findall(pattern, content)
-                if matches:
-                    results[key] = matches
-                else:
-                    results[key] = None
-            else:
-                match = re.search(pattern, content)
-                if match:
-                    results[key] = match.group(1)
-                else:
-                    results[key] = None
+        results.update(_scan_res(content, patterns))
 
         # Doris5 has size information in ifgs.res file
         # Try to get the ifg size from ifgs.res next to slave.res, if it exists
@@ -665,25 +1478,17 @@ def _parse_metadata(file, driver, ifg_file_name):
             if file_ifg.exists():
                 with open(file_ifg) as f_ifg:
                     content_ifg = f_ifg.read()
-                    for key, pattern in RE_PATTERNS_DORIS5_IFG.items():
-                        match = re.search(pattern, content_ifg)
-                        if match:
-                            results[key] = match.group(1)
-                        else:
-                            results[key] = None
+                    results.update(_scan_res(content_ifg, patterns_ifg))
     elif mode == "json":
         # Open the file
         with open(file) as f:
             content = json.load(f)
 
-        raw_results = _flatten_snap_json_metadata(content)
-        raw_keys = list(raw_results.keys())
-        for key, pattern in patterns.items():
-            matches = list(filter(re.compile(pattern).match, raw_keys))
+        for key, matches in _scan_snap_json(content, patterns).items():
             if len(matches) == 1 and key not in array_shapes.keys():
-                results[key] = raw_results[matches[0]]
+                results[key] = matches[0]
             else:
-                results[key] = [raw_results[match] for match in matches]
+                results[key] = matches
                 if key in array_shapes.keys():
                     fixed_dims = [dim for dim in array_shapes[key] if dim != "auto"]
                     auto_dim = len(results[key]) // np.prod(fixed_dims)
@@ -698,40 +1503,295 @@ def _parse_metadata(file, driver, ifg_file_name):
     return results
 
 
-def _flatten_snap_json_metadata(content: dict | list, cur_keys: tuple = ()):
-    """Extract all values in nested SNAP metadata into `path -> value` mappings."""
-    flattened_values = []
+class _MetadataCache:
+    """On-disk cache of the parsed metadata of single files.
+
+    Each entry is the result of `_parse_metadata` for one file, stored as a NumPy
+    .npz file in `directory`. Arrays are stored as arrays, and the other values as
+    JSON, with the Python type of each value such that it is restored exactly. The
+    entries are keyed by the path, size and modification time of the metadata file,
+    and of the interferogram file next to it for "doris5", the driver and the
+    patterns of the driver. When the size of the directory exceeds `max_size_mb`,
+    `evict` removes the least recently used entries; an entry is marked as used by
+    updating its modification time. The directory is scanned once per `evict`, so
+    it is called after all files of `read_metadata` are cached.
+    """
 
+    def __init__(self, directory, max_size_mb):
+        self.directory = Path(directory).expanduser()
+        self.max_size_mb = max_size_mb
+
+    def key(self, file, driver, ifg_file_name):
+        """Return the key of the cache entry of a metadata file."""
+        signature = [_METADATA_CACHE_VERSION, driver, _file_signature(file)]
+        if driver == "doris5":
+            signature.append(_file_signature(file.with_name(ifg_file_name)))
+        signature.append(_METADATA_PATTERNS[driver])
+        return hashlib.sha256(json.dumps(signature).encode()).hexdigest()
+
+    def get(self, key):
+        """Return the cached parsed metadata, or None if it is not cached."""
+        path = self.directory / f"{key}.npz"
+        try:
+            with np.load(path, allow_pickle=False) as entry:
+                results = _decode_metadata_entry(entry)
+            os.utime(path)  # mark as recently used
+        except (OSError, ValueError, KeyError):
+            # Not cached, or removed or corrupted by another process
+            return None
+        return results
+
+    def put(self, key, results):
+        """Store the parsed metadata."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        try:
+            arrays = _encode_metadata_entry(results)
+        except (TypeError, ValueError):
+            logger.debug(f"Parsed metadata can not be cached: {results.keys()}")
+            return
+        path = self.directory / f"{key}.npz"
+        # Write atomically, such that concurrent readers never see a partial entry
+        path_tmp = self.directory / f"{key}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(path_tmp, "wb") as f:
+            np.savez(f, **arrays)
+        os.replace(path_tmp, path)
+
+    def evict(self):
+        """Remove the least recently used entries if the cache is full."""
+        entries = []
+        for path in self.directory.glob("*.npz"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime_ns, stat.st_size, path))
+        size = sum(entry[1] for entry in entries)
+        for _, entry_size, path in sorted(entries):
+            if size <= self.max_size_mb * 1024**2:
+                break
+            path.unlink(missing_ok=True)
+            size -= entry_size
+
+
+def _file_signature(file):
+    try:
+        stat = os.stat(file)
+    except FileNotFoundError:
+        return None
+    return [os.path.abspath(file), stat.st_size, stat.st_mtime_ns]
+
+
+def _parse_metadata_cached(file, parse, cache, driver, ifg_file_name):
+    """Parse a single metadata file, or get the parsed metadata from the cache."""
+    key = cache.key(file, driver, ifg_file_name)
+    results = cache.get(key)
+    if results is None:
+        results = parse(file)
+        cache.put(key, results)
+    return results
+
+
+def _encode_metadata_entry(results):
+    """Encode parsed metadata as arrays for `np.savez`."""
+    arrays = {}
+    types = {}
+    values = {}
+    for i_key, (key, value) in enumerate(results.items()):
+        if isinstance(value, np.ndarray):
+            if value.dtype.hasobject:
+                raise TypeError(f"Object array of key {key} can not be cached.")
+            types[key] = "array"
+            arrays[f"array_{i_key}"] = value
+        elif isinstance(value, list) and value and isinstance(value[0], tuple):
+            # Matches of re.findall with multiple groups, e.g. orbit_txyz
+            types[key] = "tuples"
+            arrays[f"array_{i_key}"] = np.array(value, dtype=str)
+        else:
+            types[key] = type(value).__name__
+            values[key] = value
+    arrays["header"] = np.array(
+        json.dumps({"keys": list(results), "types": types, "values": values})
+    )
+    return arrays
+
+
+def _decode_metadata_entry(entry):
+    """Decode parsed metadata from the arrays of `_encode_metadata_entry`."""
+    header = json.loads(entry["header"].item())
+    results = {}
+    for i_key, key in enumerate(header["keys"]):
+        value_type = header["types"][key]
+        if value_type == "array":
+            results[key] = entry[f"array_{i_key}"]
+        elif value_type == "tuples":
+            results[key] = [tuple(row) for row in entry[f"array_{i_key}"].tolist()]
+        elif value_type == "tuple":
+            results[key] = tuple(header["values"][key])
+        else:
+            results[key] = header["values"][key]
+    return results
+
+
+def _scan_res(content: str, patterns: dict) -> dict:
+    """Search the content of a DORIS .res file for the metadata patterns.
+
+    The result is the same as `re.search` of each pattern over the content, or
+    `re.findall` for the keys in META_ARRAY_KEYS. The patterns are compiled once. A
+    pattern starting with a literal label, e.g. "Radar_wavelength (m):", is only
+    matched where the label occurs, and the search stops at its first match, which
+    is usually in the header of the file.
+    """
+    results = {}
+    for key, (compiled, label) in _compile_res_patterns(tuple(patterns.items())):
+        if key in META_ARRAY_KEYS:  # multiple hits allowed
+            results[key] = compiled.findall(content) or None
+            continue
+        match = None
+        if label:
+            pos = content.find(label)
+            while pos != -1:
+                match = compiled.match(content, pos)
+                if match:
+                    break
+                pos = content.find(label, pos + 1)
+        else:
+            match = compiled.search(content)
+        results[key] = match.group(1) if match else None
+    return results
+
+
+@cache
+def _compile_res_patterns(patterns: tuple) -> tuple:
+    """Compile the patterns of `_scan_res`, with their literal labels."""
+    return tuple(
+        (key, (re.compile(pattern), _literal_prefix(pattern)))
+        for key, pattern in patterns
+    )
+
+
+def _literal_prefix(pattern: str) -> str:
+    """Return the literal text a regular expression starts with."""
+    if _has_top_level_alternation(pattern):
+        return ""  # the branches start with different text
+    literal = []
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        if char in "*+?{":
+            # The last character is quantified, so it is not literal
+            return "".join(literal[:-1])
+        if char in ".^$[]|()":
+            break
+        if char == "\\":
+            if i + 1 >= len(pattern) or pattern[i + 1].isalnum():
+                break  # special sequence, e.g. \s or \d
+            i += 1
+            char = pattern[i]
+        literal.append(char)
+        i += 1
+    return "".join(literal)
+
+
+def _has_top_level_alternation(pattern: str) -> bool:
+    """Return whether a regular expression has a "|" outside groups and sets."""
+    depth = 0
+    in_set = False
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        if char == "\\":
+            i += 1  # skip the escaped character
+        elif in_set:
+            in_set = char != "]"
+        elif char == "[":
+            in_set = True
+            # A "]" right after "[" or "[^" is part of the set
+            if pattern[i + 1 : i + 2] == "^":
+                i += 1
+            if pattern[i + 1 : i + 2] == "]":
+                i += 1
+        elif char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        elif char == "|" and depth == 0:
+            return True
+        i += 1
+    return False
+
+
+def _scan_snap_json(content: dict | list, patterns: dict) -> dict:
+    """Extract the values in nested SNAP metadata whose path matches the patterns.
+
+    The path of a value joins the names of the nodes and list indices above it with
+    dots, e.g. "0.Abstracted_Metadata.attributes.3.PASS". The result is the same as
+    `re.match` of each pattern over the paths of all values, but the tree is walked
+    once. A node is skipped with its subtree when its path cannot start a match of
+    any pattern, e.g. the original product metadata, and only the values of matching
+    paths are converted.
+
+    Returns a dictionary with the list of matching values of each key, in the order
+    of the file.
+    """
+    compiled, match_any, match_start = _compile_snap_patterns(tuple(patterns.items()))
+    found = {}
+    _walk_snap_json(content, "", match_any, match_start, found)
+    return {
+        key: [value for path, value in found.items() if pattern.match(path)]
+        for key, pattern in compiled
+    }
+
+
+def _walk_snap_json(content, path, match_any, match_start, found):
+    """Collect the values of `_scan_snap_json` below `content` in `found`."""
     if isinstance(content, list):
         for index, item in enumerate(content):
-            list_item_keys = cur_keys + (str(index),)
-            flattened_values.extend(_flatten_snap_json_metadata(item, list_item_keys))
+            item_path = f"{path}.{index}" if path else str(index)
+            _walk_snap_json(item, item_path, match_any, match_start, found)
 
     elif isinstance(content, dict):
-        node_name = content["name"]
-        node_keys = cur_keys + (node_name,)
-
+        path = f"{path}.{content['name']}" if path else content["name"]
         if "data" in content:
-            value = _parse_snap_data_entry_value(content["data"])
-            flattened_values.append([value, node_keys])
-        else:
+            if match_any.match(path):
+                found[path] = _parse_snap_data_entry_value(content["data"])
+        elif match_start.fullmatch(path):
             for child_key in ("elements", "attributes"):
                 child_content = content.get(child_key)
-                if child_content is None:
-                    continue
-                child_keys = node_keys + (child_key,)
-                flattened_values.extend(
-                    _flatten_snap_json_metadata(child_content, child_keys)
-                )
+                child_path = f"{path}.{child_key}"
+                if child_content is not None and match_start.fullmatch(child_path):
+                    _walk_snap_json(
+                        child_content, child_path, match_any, match_start, found
+                    )
+
+
+@cache
+def _compile_snap_patterns(patterns: tuple) -> tuple:
+    """Compile the patterns of `_scan_snap_json`.
+
+    Returns the compiled patterns, a pattern matching the paths matched by any of
+    them, and a pattern fully matching the paths that can start such a match.
+    """
+    compiled = tuple((key, re.compile(pattern)) for key, pattern in patterns)
+    match_any = re.compile("|".join(f"(?:{pattern})" for _, pattern in patterns))
+    match_start = re.compile(
+        "|".join(f"(?:{_snap_path_starts(pattern)})" for _, pattern in patterns)
+    )
+    return compiled, match_any, match_start
+
 
-    # Recursive calls return (value, key_path) pairs for their parent to aggregate.
-    if cur_keys:
-        return flattened_values
+def _snap_path_starts(pattern: str) -> str:
+    """Return a pattern fully matching the paths that can start a match of `pattern`.
 
-    result = {}
-    for value, key_path in flattened_values:
-        result[".".join(key_path)] = value
-    return result
+    The pattern is split in path components at the dots that are not escaped or
+    quantified, e.g. "[0-9]+.Abstracted_Metadata.attributes" gives a pattern that
+    matches "0", "0.Abstracted_Metadata", "0.Abstracted_Metadata.attributes" and all
+    paths below it.
+    """
+    components = re.split(r"(?<!\\)\.(?![*+?{])", pattern)
+    starts = f"{components[-1]}.*"
+    for component in reversed(components[:-1]):
+        starts = f"{component}(?:.{starts})?"
+    return starts
 
 
 def _regulate_metadata(metadata, driver):
@@ -743,30 +1803,10 @@ def _regulate_metadata(metadata, driver):
     Check the documentation of `read_metadata` for the rules applied to the metadata.
     """
     # Convert time metadata from string to datetime
-    if driver == "doris5":
-        time_format = TIME_FORMAT_DORIS5
-        unit_conversions = META_UNIT_CONVERSION_MULTIPLICATION_KEYS_DORIS5
-    elif driver == "doris4":
-        time_format = TIME_FORMAT_DORIS4
-        unit_conversions = META_UNIT_CONVERSION_MULTIPLICATION_KEYS_DORIS4
-    elif driver == "snap":
-        time_format = TIME_FORMAT_SNAP
-        unit_conversions = META_UNIT_CONVERSION_MULTIPLICATION_KEYS_SNAP
-
-    list_time = []
-    for time in metadata[TIME_STAMP_KEY]:
-        try:
-            if time_format == "timestamp":  # SNAP returns timestamps
-                dt = datetime.fromtimestamp(time)
-            else:
-                dt = datetime.strptime(time, time_format)
-            list_time.append(np.datetime64(dt).astype("datetime64[ns]"))
-        except ValueError as e:
-            raise ValueError(
-                f"Invalid date format for key: '{TIME_STAMP_KEY}'. "
-                f"Expected format is '{time_format}', got {time}."
-            ) from e
-    metadata[TIME_STAMP_KEY] = np.sort(np.array(list_time))
+    time_format, unit_conversions = _driver_conventions(driver)
+    metadata[TIME_STAMP_KEY] = np.sort(
+        _to_datetime64(metadata[TIME_STAMP_KEY], time_format)
+    )
 
     for key, value in list(metadata.items()):
         # raise error if different types are found in value
@@ -777,24 +1817,19 @@ def _regulate_metadata(metadata, driver):
             )
 
         if key in META_ARRAY_KEYS.keys():  # need to regulate this one separately
+            if META_ARRAY_KEYS[key] is str:
+                dtype = np.dtypes.StringDType()
+            else:
+                dtype = np.float64
             regulated_arrays = []
             for arr in metadata[key]:
-                if META_ARRAY_KEYS[key] is str:
-                    regulated_array = np.zeros(
-                        (len(arr), len(arr[0])), dtype=np.dtypes.StringDType
-                    )
-                else:
-                    regulated_array = np.zeros((len(arr), len(arr[0])))
-                for row in range(len(arr)):
-                    for col in range(len(arr[row])):
-                        regulated_array[row, col] = META_ARRAY_KEYS[key](arr[row][col])
+                # Convert all rows at once, this always copies the input
+                regulated_array = np.array(arr, dtype=dtype)
                 if key in unit_conversions.keys():
                     regulated_array *= unit_conversions[key]
-                regulated_arrays.append(np.copy(regulated_array))
+                regulated_arrays.append(regulated_array)
 
-            metadata[key] = [
-                np.copy(regulated_array) for regulated_array in regulated_arrays
-            ]
+            metadata[key] = regulated_arrays
             if len(metadata[key]) == 1:
                 metadata[key] = metadata[key][0]
 
@@ -843,6 +1878,224 @@ def _regulate_metadata(metadata, driver):
     return metadata
 
 
+def _driver_conventions(driver: str) -> tuple[str, dict]:
+    """Return the time format and the unit conversions of the metadata of a driver."""
+    if driver == "doris5":
+        return TIME_FORMAT_DORIS5, META_UNIT_CONVERSION_MULTIPLICATION_KEYS_DORIS5
+    elif driver == "doris4":
+        return TIME_FORMAT_DORIS4, META_UNIT_CONVERSION_MULTIPLICATION_KEYS_DORIS4
+    elif driver == "snap":
+        return TIME_FORMAT_SNAP, META_UNIT_CONVERSION_MULTIPLICATION_KEYS_SNAP
+
+
+def _to_datetime64(times: list, time_format: str) -> np.ndarray:
+    """Convert the time stamps of the metadata to a datetime64 array."""
+    list_time = []
+    for time in times:
+        try:
+            if time_format == "timestamp":  # SNAP returns timestamps
+                dt = datetime.fromtimestamp(time)
+            else:
+                dt = datetime.strptime(time, time_format)
+            list_time.append(np.datetime64(dt).astype("datetime64[ns]"))
+        except (TypeError, ValueError) as e:
+            raise ValueError(
+                f"Invalid date format for key: '{TIME_STAMP_KEY}'. "
+                f"Expected format is '{time_format}', got {time}."
+            ) from e
+    return np.array(list_time, dtype="datetime64[ns]")
+
+
+def _read_time_stamps(files: list[str | Path], driver: str) -> np.ndarray:
+    """Read the acquisition time of each metadata file, in the order of the files.
+
+    Unlike `read_metadata`, which sorts the acquisition times, the times are
+    returned in the order of `files`. Only the time stamp is searched in each file.
+    """
+    patterns = {TIME_STAMP_KEY: _METADATA_PATTERNS[driver][0][TIME_STAMP_KEY]}
+    times = []
+    for file in files:
+        with open(file) as f:
+            if driver == "snap":
+                times.append(_scan_snap_json(json.load(f), patterns)[TIME_STAMP_KEY][0])
+            else:
+                times.append(_scan_res(f.read(), patterns)[TIME_STAMP_KEY])
+    time_format, _ = _driver_conventions(driver)
+    return _to_datetime64(times, time_format)
+
+
+def _tabulate_metadata(results: list[dict], driver: str) -> xr.Dataset:
+    """Tabulate the parsed metadata of each file along time.
+
+    Check the documentation of `read_metadata` for the types of the columns.
+    """
+    time_format, unit_conversions = _driver_conventions(driver)
+    times = _to_datetime64([res.get(TIME_STAMP_KEY) for res in results], time_format)
+
+    # All keys, in the order they are first found
+    keys = dict.fromkeys(key for res in results for key in res)
+    data_vars = {}
+    for key in keys:
+        if key == TIME_STAMP_KEY or key in META_ARRAY_KEYS:
+            continue
+        values = [res.get(key) for res in results]
+        missing = [value is None for value in values]
+        if key in META_INT_KEYS and not any(missing):
+            column = np.array(values, dtype=np.int64)
+        elif key in META_FLOAT_KEYS or key in META_INT_KEYS:
+            column = np.array(
+                [np.nan if value is None else value for value in values],
+                dtype=np.float64,
+            )
+        else:
+            column = np.array(["" if value is None else str(value) for value in values])
+        if key in unit_conversions.keys():
+            column = column * unit_conversions[key]
+        data_vars[key] = ("time", column)
+
+    return xr.Dataset(data_vars, coords={"time": times}).sortby("time")
+
+
+def _read_one_znap(file: str | Path) -> tuple[xr.Dataset, bool, dict]:
+    """Read a single ZNAP archive and its metadata."""
+    data, is_mother = _read_one_znap_archive(file)
+    metadata = read_metadata(f"{file}/SNAP/product_metadata.json", driver="snap")
+    return data, is_mother, metadata
+
+
+def _read_indexed_znap(entry: dict, root: Path) -> tuple[xr.Dataset, bool, dict]:
+    """Read a single ZNAP archive and its metadata from an index entry."""
+    path = str(root / entry["path"])
+    # Open the arrays directly, without listing the archive
+    variables = {}
+    for name, var in entry["variables"].items():
+        array = da.from_zarr(path, component=var["name"])
+        # The index records the native dtype, SNAP writes big-endian arrays
+        dtype = array.dtype.newbyteorder("=")
+        if list(array.shape) != var["shape"] or dtype != np.dtype(var["dtype"]):
+            raise ValueError(
+                f"The data variable {var['name']} of {path} does not match the "
+                "index. Please write the index again with build_znap_index."
+            )
+        variable = xr.Variable(var["dims"], array, var["attrs"])
+        # Apply the same decoding, e.g. masking of fill values, as xr.open_zarr
+        # Older xarray versions wrap the decoded dask array in a lazily indexed
+        # array, so it is chunked again with the chunks of the archive
+        variables[name] = xr.conventions.decode_cf_variable(name, variable).chunk(
+            dict(zip(var["dims"], var["chunks"], strict=True))
+        )
+    data = xr.Dataset(variables)
+    data = data.assign_coords(
+        {"x": range(data.sizes["x"]), "y": range(data.sizes["y"])}
+    )
+    metadata = _regulate_metadata(
+        {key: [value] for key, value in entry["metadata"].items()}, driver="snap"
+    )
+    return data, entry["is_mother"], metadata
+
+
+def build_znap_index(
+    directory: str | Path,
+    output: str | Path | None = None,
+    max_workers: int | None = 1,
+) -> str:
+    """Write an index of the ZNAP archives in a directory.
+
+    The directory is scanned once for archives with the suffix ".znap". For each
+    archive, the index records the data variables on the x/y grid with their
+    shapes, chunks, data types and attributes, the epoch timestamp, whether it is
+    the mother epoch, the subset offsets, and the parsed SNAP metadata. The index
+    is a JSON file, which can be passed to `from_znap` as `index` to read the
+    archives without listing them and without parsing their SNAP metadata. Only
+    the data variables in the index are opened, and checked against the recorded
+    shapes and data types.
+
+    The archives are recorded with their paths relative to the index, such that
+    the directory can be moved together with the index. The index should be
+    written again if archives are added or modified.
+
+    Parameters
+    ----------
+    directory : str | Path
+        Directory with the ZNAP archives.
+    output : str | Path | None, optional
+        Path of the index, by default "znap_index.json" in `directory`.
+    max_workers : int | None, optional
+        Number of threads to scan the archives, by default 1. If None, the default
+        of `concurrent.futures.ThreadPoolExecutor` is used.
+
+    Returns
+    -------
+    str
+        Path of the index.
+
+    Raises
+    ------
+    ValueError
+        If there are no ZNAP archives in `directory`.
+    """
+    directory = Path(directory)
+    files = sorted(directory.glob("*.znap"))
+    if len(files) == 0:
+        raise ValueError(f"No ZNAP archives found in {directory}.")
+    output = Path(directory / _ZNAP_INDEX_FILE if output is None else output)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        entries = list(executor.map(_index_one_znap, files))
+    for entry, file in zip(entries, files, strict=True):
+        entry["path"] = os.path.relpath(file, output.parent)
+
+    with open(output, "w") as f:
+        json.dump({"version": _ZNAP_INDEX_VERSION, "archives": entries}, f)
+    logger.info(f"Written index of {len(entries)} ZNAP archives to {output}")
+    return str(output)
+
+
+def _index_one_znap(file: Path) -> dict:
+    """Collect the index entry of a single ZNAP archive."""
+    data = xr.open_zarr(file, consolidated=False)
+    dims_non_xy = [dim for dim in data.dims if dim not in ["x", "y"]]
+    data = data.drop_dims(dims_non_xy)
+    variables = {}
+    for layer in data.data_vars:
+        encoding = data[layer].encoding
+        attrs = dict(data[layer].attrs)
+        if "_FillValue" in encoding:
+            attrs["_FillValue"] = np.asarray(encoding["_FillValue"]).item()
+        variables[_snap_datalayer_name(layer)] = {
+            "name": layer,
+            "dims": list(data[layer].dims),
+            "shape": list(data[layer].shape),
+            "chunks": list(encoding["chunks"]),
+            "dtype": str(encoding["dtype"]),
+            "attrs": attrs,
+        }
+    is_mother = any(v in variables for v in ZNAP_DATA_VAR_MOTHER)
+
+    # Keep the parsed metadata before regulation, which is JSON serializable
+    raw_metadata = _parse_metadata(
+        file / "SNAP" / "product_metadata.json", "snap", None
+    )
+    raw_metadata = {
+        key: value.tolist() if isinstance(value, np.ndarray) else value
+        for key, value in raw_metadata.items()
+    }
+    metadata = _regulate_metadata(
+        {key: [value] for key, value in raw_metadata.items()}, driver="snap"
+    )
+    time_stamp, epoch = _extract_snap_epoch(metadata, is_mother)
+    return {
+        "path": str(file),
+        "time_stamp": time_stamp.isoformat(),
+        "epoch": epoch,
+        "is_mother": is_mother,
+        "first_line_number": metadata["first_line_number"],
+        "first_pixel_number": metadata["first_pixel_number"],
+        "variables": variables,
+        "metadata": raw_metadata,
+    }
+
+
 def _read_one_znap_archive(file: str | Path) -> tuple[xr.Dataset, bool]:
     """Read a single ZNAP archive produced by SNAP and flag if mother."""
     # Initialize is_mother flag
@@ -858,16 +2111,7 @@ def _read_one_znap_archive(file: str | Path) -> tuple[xr.Dataset, bool]:
     data = data.drop_dims(dims_non_xy)
 
     # Rename the data variables according to RE_PATTERNS_SNAP_DATALAYER
-    for layer in data.data_vars:
-        for key, pattern in RE_PATTERNS_SNAP_DATALAYER.items():
-            if re.match(pattern, layer):
-                if key == "pol_date":
-                    use_key = "_".join(layer.split("_")[:-2])
-                    data = data.rename({layer: use_key})
-                elif key == "pol":
-                    use_key = "_".join(layer.split("_")[:-1])
-                    data = data.rename({layer: use_key})
-                break
+    data = data.rename({layer: _snap_datalayer_name(layer) for layer in data.data_vars})
 
     # Check if mother epoch
     is_mother = any(v in data.data_vars for v in ZNAP_DATA_VAR_MOTHER)
@@ -880,6 +2124,17 @@ def _read_one_znap_archive(file: str | Path) -> tuple[xr.Dataset, bool]:
     return data, is_mother
 
 
+def _snap_datalayer_name(layer: str) -> str:
+    """Strip the polarisation and date from a ZNAP data layer name."""
+    for key, pattern in RE_PATTERNS_SNAP_DATALAYER.items():
+        if re.match(pattern, layer):
+            if key == "pol_date":
+                return "_".join(layer.split("_")[:-2])
+            elif key == "pol":
+                return "_".join(layer.split("_")[:-1])
+    return layer
+
+
 def _validate_snap_znap_archives(snap_znap_archives: list[str | Path]) -> None:
     """Check if snap_znap_archives is a non empty Iterable and not a string."""
     if not hasattr(snap_znap_archives, "__iter__") or isinstance(
@@ -912,23 +2167,27 @@ def _extract_snap_epoch(metadata: dict, is_mother: bool) -> tuple[datetime, str]
     return time_stamp, epoch
 
 
-def _append_one_daughter(
-    ds_stack: xr.Dataset | None, data: xr.Dataset, time_stamp: datetime
-) -> xr.Dataset:
-    """Append a daughter epoch to the stack, initializing the stack if needed."""
-    if ds_stack is None:  # first epoch, initialize ds_stack
-        ds_stack = data.expand_dims(time=[time_stamp])
-        # Drop attrs inherited from the first epoch
-        ds_stack.attrs = {}
-        # Always initialize mother_epoch to None
-        # If first epoch is mother, it will be set to epoch below
-        return ds_stack.assign_attrs({"mother_epoch": None})
+def _stack_daughters(
+    daughters: list[tuple[datetime, xr.Dataset]],
+) -> xr.Dataset | None:
+    """Stack the daughter epochs along time, or return None if there are none.
 
-    return xr.concat(
-        [ds_stack, data.expand_dims(time=[time_stamp])],
+    All epochs are concatenated at once, such that the work and the task graph grow
+    linearly with the number of epochs.
+    """
+    if len(daughters) == 0:
+        return None
+
+    daughters = sorted(daughters, key=lambda daughter: daughter[0])
+    ds_stack = xr.concat(
+        [data.expand_dims(time=[time_stamp]) for time_stamp, data in daughters],
         dim="time",
-        combine_attrs="override",  # override the attrs of the first epoch
+        combine_attrs="override",  # keep the attrs of the variables
     )
+    # Drop the attrs of the epochs, and always initialize mother_epoch to None
+    # If there is a mother epoch, it will be set in _append_mother
+    ds_stack.attrs = {}
+    return ds_stack.assign_attrs({"mother_epoch": None})
 
 
 def _append_mother(
@@ -955,11 +2214,24 @@ def _append_mother(
     data_mother_time_dims = data_mother
     for layer in time_dim_layers:
         if layer not in data_mother_time_dims.data_vars:
+            # Layer of zeros with the dtype and chunks of the daughter epochs, or a
+            # single chunk if the daughter layer is not a dask array
+            # Each chunk is a broadcast view of a single zero, without I/O
+            layer_data = ds_stack[layer].data
+            if isinstance(layer_data, da.Array):
+                dims = ds_stack[layer].dims
+                chunks = tuple(layer_data.chunks[dims.index(dim)] for dim in "yx")
+            else:
+                chunks = -1
             data_mother_time_dims = data_mother_time_dims.assign(
                 {
                     layer: (
                         ("y", "x"),
-                        da.zeros((ds_stack.sizes["y"], ds_stack.sizes["x"])),
+                        da.zeros(
+                            (ds_stack.sizes["y"], ds_stack.sizes["x"]),
+                            dtype=ds_stack[layer].dtype,
+                            chunks=chunks,
+                        ),
                     )
                 }
             )
@@ -0,0 +1,528 @@
+import argparse
+import json
+import logging
+import os
+from datetime import datetime
+from pathlib import Path
+from time import perf_counter
+from typing import Literal
+
+import numpy as np
+import xarray as xr
+import zarr
+
+from ._codec import _is_quantized, _quantize_complex
+from ._io import _chunk_slices, _read_time_stamps, from_binary, read_metadata
+from .conf import META_ARRAY_KEYS, TIME_STAMP_KEY, _dtypes
+
+logger = logging.getLogger(__name__)
+
+# Suffix of the manifest file recording the written regions, next to the store
+_MANIFEST_SUFFIX = ".manifest.json"
+
+# Zarr 2 takes a single numcodecs "compressor" instead of "compressors"
+_ZARR_V2 = int(zarr.__version__.split(".")[0]) < 3
+
+
+def binary_to_zarr(
+    slc_files: list[str | Path],
+    shape: tuple[int, int],
+    output: str | Path,
+    dtype: np.dtype | str = np.complex64,
+    chunks: tuple[int, int] | None = None,
+    time_chunks: int | Literal["auto"] = 1,
+    compressors="auto",
+    metadata_files: list[str | Path] | None = None,
+    driver: Literal["doris4", "doris5", "snap"] = "doris5",
+    resume: bool = True,
+    engine: Literal["mmap", "pread"] = "mmap",
+    quantization: Literal["int16", "float16"] | None = None,
+    max_error: float | None = None,
+) -> str:
+    """Convert a SLC stack in binary files to a Zarr store.
+
+    The stack is read with `from_binary`, and written as the data variables `real`
+    and `imag` with dimensions `(azimuth, range, time)`, which can be loaded with
+    `xr.open_zarr` and `sarxarray.from_dataset`.
+
+    The store is written region by region, where a region is one row of chunks in
+    azimuth and one chunk in time. The chunks within a region are written in
+    parallel by Dask. Each written region is recorded in a manifest file next to
+    the store, named "<output>.manifest.json". If the conversion is interrupted, a
+    rerun with `resume=True` only writes the regions missing from the manifest.
+    The throughput of the conversion is logged at the INFO level.
+
+    Parameters
+    ----------
+    slc_files : list[str | Path]
+        Paths to the SLC files, in the order of the time dimension.
+    shape : tuple[int, int]
+        Shape of each SLC file, in (n_azimuth, n_range).
+    output : str | Path
+        Path of the Zarr store to write.
+    dtype : numpy.dtype or str, optional
+        Data type of the SLC files, by default np.complex64. See `from_binary`.
+    chunks : tuple[int, int], optional
+        Chunk size in (azimuth, range) of the Zarr store, by default None, i.e.
+        determined by `from_binary`.
+    time_chunks : int or "auto", optional
+        Chunk size in time of the Zarr store, by default 1. See `from_binary`. Use
+        a large chunk size in time for time series analysis.
+    compressors : optional
+        Compressors of the `real` and `imag` variables, passed to the Zarr encoding,
+        by default "auto", i.e. the Zarr default. Use None for no compression. With
+        Zarr 2, a single numcodecs compressor.
+    metadata_files : list[str | Path], optional
+        Metadata files of the SLCs, in the same order as `slc_files`, by default
+        None. If given, the metadata is read with `read_metadata` and stored in the
+        attributes of the store, and the acquisition times are used as the `time`
+        coordinate. The files should be in the order of their acquisition times.
+    driver : {"doris4", "doris5", "snap"}, optional
+        Driver to read the metadata files, by default "doris5".
+    resume : bool, optional
+        Whether to resume a previous conversion to the same output, by default
+        True. If False, or if there is no manifest of a previous conversion, the
+        store is created from scratch.
+    engine : {"mmap", "pread"}, optional
+        I/O engine to read the binary files, by default "mmap". See `from_binary`.
+    quantization : {"int16", "float16"}, optional
+        Store `real` and `imag` quantized to int16 or float16, by default None, i.e.
+        stored with the dtype of the stack. The quantized components are scaled per
+        chunk and epoch, with the scale factors stored in the data variable `scale`.
+        This halves the size of the store before compression, and int16 compresses
+        better than float32. `from_dataset` decodes the store to complex64.
+    max_error : float, optional
+        Maximum absolute error of the quantized real and imaginary parts, by default
+        None, i.e. as small as the quantization allows. With "int16", a larger error
+        bound gives a coarser quantization, which compresses better. The conversion
+        fails with a ValueError if the bound can not be met for a chunk.
+
+    Returns
+    -------
+    str
+        Path of the Zarr store.
+
+    Raises
+    ------
+    ValueError
+        If `resume` is True and the manifest was written by a conversion with
+        different inputs, if the number of metadata files differs from the number
+        of SLC files, if the metadata files are not in the order of their
+        acquisition times, or if `quantization` is not supported.
+    """
+    output = os.fspath(output)
+    stack = from_binary(
+        slc_files,
+        shape,
+        dtype=dtype,
+        chunks=chunks,
+        time_chunks=time_chunks,
+        engine=engine,
+        attach_amp_phase=False,
+    )
+    if quantization is None:
+        ds = xr.Dataset({"real": stack.complex.real, "imag": stack.complex.imag})
+    else:
+        ds = _quantize_complex(stack.complex, quantization, max_error)
+
+    if metadata_files is not None:
+        metadata = _read_epoch_metadata(metadata_files, len(slc_files), driver)
+        if TIME_STAMP_KEY in metadata:
+            ds = ds.assign_coords(time=np.atleast_1d(metadata.pop(TIME_STAMP_KEY)))
+        ds.attrs = _metadata_to_attrs(metadata)
+
+    # Inputs of the conversion, a manifest is only resumed for the same inputs
+    config = {
+        "slc_files": [os.path.abspath(f) for f in slc_files],
+        "shape": list(shape),
+        "dtype": str(stack.complex.dtype),
+        "chunks": [c[0] for c in ds["real"].data.chunks],
+        "quantization": quantization,
+        "max_error": max_error,
+    }
+    manifest_path = output + _MANIFEST_SUFFIX
+    manifest = _read_manifest(manifest_path) if resume else None
+    if manifest is not None and not os.path.exists(output):
+        manifest = None
+    if manifest is not None and manifest["config"] != config:
+        raise ValueError(
+            f"The manifest {manifest_path} was written by a conversion with different "
+            "inputs. Use resume=False to overwrite the existing store."
+        )
+    if manifest is None:
+        encoding_compressors = _compressor_encoding(compressors)
+        encoding = {
+            var: {"chunks": config["chunks"], **encoding_compressors}
+            for var in ["real", "imag"]
+        }
+        if quantization is not None:
+            # One chunk of scale factors per region
+            chunks_scale = [c[0] for c in ds["scale"].data.chunks]
+            encoding["scale"] = {"chunks": chunks_scale, **encoding_compressors}
+        # Only write the coordinates and the array metadata
+        ds.to_zarr(output, mode="w", compute=False, encoding=encoding)
+        manifest = {"config": config, "done": []}
+        _write_manifest(manifest_path, manifest)
+
+    done = {tuple(region) for region in manifest["done"]}
+    ds_data = ds.drop_vars(["azimuth", "range", "time"])
+    nbytes = 0
+    t_start = perf_counter()
+    for i_az, sl_az in enumerate(_chunk_slices(ds["real"].data.chunks[0])):
+        for i_time, sl_time in enumerate(_chunk_slices(ds["real"].data.chunks[2])):
+            if (i_az, i_time) in done:
+                continue
+            region = {"azimuth": sl_az, "time": sl_time}
+            if quantization is not None:
+                region["azimuth_block"] = slice(i_az, i_az + 1)
+            ds_data.isel(region).to_zarr(output, region=region)
+            nbytes += stack.complex.isel(azimuth=sl_az, time=sl_time).nbytes
+            manifest["done"].append([i_az, i_time])
+            _write_manifest(manifest_path, manifest)
+            logger.debug(f"Written region azimuth={sl_az}, time={sl_time}.")
+    elapsed = perf_counter() - t_start
+
+    logger.info(
+        f"Converted {nbytes / 1024**3:.3f} GB to {output} in {elapsed:.2f} s "
+        f"({nbytes / 1024**3 / max(elapsed, 1e-9):.3f} GB/s)."
+    )
+
+    return output
+
+
+def append_to_zarr(
+    stack: xr.Dataset,
+    store: str | Path,
+    metadata_files: list[str | Path] | None = None,
+    driver: Literal["doris4", "doris5", "snap"] = "doris5",
+) -> str:
+    """Append new epochs to a SLC stack in a Zarr store.
+
+    The complex data of `stack`, e.g. loaded from new SLC files by `from_binary` or
+    from new ZNAP archives by `from_znap`, is appended along `time` to the data
+    variables `real` and `imag` of a store written by `binary_to_zarr`. Only the new
+    time slices are written, the existing data is not read or rewritten.
+
+    Parameters
+    ----------
+    stack : xr.Dataset
+        SLC stack of the new epochs, with the data variable `complex` and the
+        dimensions `(azimuth, range, time)`. The `time` coordinates should be later
+        than the last epoch in the store.
+    store : str | Path
+        Path of the Zarr store to append to.
+    metadata_files : list[str | Path], optional
+        Metadata files of the new epochs, in the same order as the `time` dimension
+        of `stack`, by default None. If given, the metadata is read with
+        `read_metadata` and merged into the attributes of the store: the per-epoch
+        array metadata is extended, and metadata with different values in the new
+        epochs is stored as a list of the unique values. The acquisition times are
+        used as the `time` coordinate of the new epochs, so the files should be in
+        the order of their acquisition times.
+    driver : {"doris4", "doris5", "snap"}, optional
+        Driver to read the metadata files, by default "doris5".
+
+    Returns
+    -------
+    str
+        Path of the Zarr store.
+
+    Raises
+    ------
+    ValueError
+        If the grid (azimuth and range coordinates) or the dtype of `stack` differs
+        from the store, if the store has no `real` and `imag` variables, if the
+        number or the order of the metadata files does not match the new epochs, or
+        if the new epochs are not later than the last epoch in the store.
+    """
+    store = os.fspath(store)
+    ds_store = xr.open_zarr(store)
+
+    if "complex" not in stack.data_vars:
+        raise ValueError("The stack should have the data variable 'complex'.")
+    if any(var not in ds_store.data_vars for var in ["real", "imag"]):
+        raise ValueError(
+            f"The store {store} should have the data variables 'real' and 'imag'."
+        )
+
+    complex_new = stack["complex"].transpose("azimuth", "range", "time")
+    metadata = {}
+    if metadata_files is not None:
+        metadata = _read_epoch_metadata(
+            metadata_files, complex_new.sizes["time"], driver
+        )
+    if TIME_STAMP_KEY in metadata:
+        complex_new = complex_new.assign_coords(
+            time=np.atleast_1d(metadata.pop(TIME_STAMP_KEY))
+        )
+
+    # Validate the grid, the dtype and the time of the new epochs
+    for dim in ["azimuth", "range"]:
+        if not np.array_equal(complex_new[dim].values, ds_store[dim].values):
+            raise ValueError(
+                f"The {dim} coordinates of the stack differ from the store {store}."
+            )
+    quantized = _is_quantized(ds_store)
+    dtype_store = ds_store["real"].dtype
+    if (quantized and complex_new.dtype != _dtypes["complex"]) or (
+        not quantized and complex_new.real.dtype != dtype_store
+    ):
+        raise ValueError(
+            f"The stack has dtype {complex_new.dtype}, but the store {store} has "
+            f"real and imag of dtype {dtype_store}."
+        )
+    time_new = complex_new["time"].values
+    time_store = ds_store["time"].values
+    time_valid = (
+        time_new.dtype.kind == time_store.dtype.kind
+        and np.all(time_new[1:] > time_new[:-1])
+        and time_new[0] > time_store[-1]
+    )
+    if not time_valid:
+        raise ValueError(
+            f"The time coordinates of the stack should be increasing, of the same "
+            f"type, and later than the last epoch {time_store[-1]} in the store "
+            f"{store}. Use `stack.assign_coords(time=...)` to set the time."
+        )
+
+    # Align the new chunks with the Zarr chunks, the first time chunk of the new
+    # epochs fills up the last (partial) time chunk of the store
+    chunks_az, chunks_rg, chunks_time = ds_store["real"].encoding["chunks"]
+    n_time_new = complex_new.sizes["time"]
+    first = chunks_time - ds_store.sizes["time"] % chunks_time
+    time_chunks = [min(first, n_time_new)]
+    while sum(time_chunks) < n_time_new:
+        time_chunks.append(min(chunks_time, n_time_new - sum(time_chunks)))
+    complex_new = complex_new.chunk(
+        {"azimuth": chunks_az, "range": chunks_rg, "time": tuple(time_chunks)}
+    )
+
+    if quantized:
+        ds_new = _quantize_complex(
+            complex_new,
+            ds_store["real"].attrs["quantization"],
+            ds_store["real"].attrs.get("quantization_max_error"),
+        )
+    else:
+        ds_new = xr.Dataset({"real": complex_new.real, "imag": complex_new.imag})
+
+    ds_new.attrs = _merge_attrs(
+        ds_store.attrs,
+        _metadata_to_attrs(metadata),
+        ds_store.sizes["time"],
+        n_time_new,
+    )
+
+    t_start = perf_counter()
+    ds_new.drop_vars(["azimuth", "range"]).to_zarr(store, append_dim="time")
+    elapsed = perf_counter() - t_start
+    nbytes = complex_new.nbytes
+    logger.info(
+        f"Appended {n_time_new} epochs ({nbytes / 1024**3:.3f} GB) to {store} in "
+        f"{elapsed:.2f} s ({nbytes / 1024**3 / max(elapsed, 1e-9):.3f} GB/s)."
+    )
+
+    return store
+
+
+def _read_epoch_metadata(metadata_files, n_time, driver):
+    """Read the metadata of the epochs of a stack, one metadata file per epoch."""
+    if len(metadata_files) != n_time:
+        raise ValueError(
+            f"The number of metadata files should equal the number of epochs {n_time}."
+        )
+    # read_metadata sorts the acquisition times, they only label the epochs if the
+    # files are in the order of their acquisition times
+    times = _read_time_stamps(metadata_files, driver)
+    if np.any(times[1:] < times[:-1]):
+        raise ValueError(
+            "The metadata files should be in the order of their acquisition times, "
+            f"got the times {times}. Sort the SLC files and the metadata files by "
+            "acquisition time."
+        )
+    return read_metadata(list(metadata_files), driver=driver)
+
+
+def _merge_attrs(attrs, attrs_new, n_time, n_time_new):
+    """Merge the metadata attributes of new epochs into the attributes of a store."""
+    merged = dict(attrs)
+    for key, value in attrs_new.items():
+        if key not in merged:
+            merged[key] = value
+        elif key in META_ARRAY_KEYS:
+            # Per-epoch arrays, which are not nested in a list for a single epoch
+            values = merged[key] if n_time > 1 else [merged[key]]
+            values_new = value if n_time_new > 1 else [value]
+            merged[key] = values + values_new
+        elif merged[key] != value:
+            # Different values, stored as a list of the unique values
+            merged[key] = sorted(_as_set(merged[key]) | _as_set(value))
+    return merged
+
+
+def _as_set(value):
+    return set(value) if isinstance(value, list) else {value}
+
+
+def _read_manifest(manifest_path):
+    """Read a manifest file, return None if it does not exist."""
+    if not os.path.exists(manifest_path):
+        return None
+    with open(manifest_path) as f:
+        return json.load(f)
+
+
+def _write_manifest(manifest_path, manifest):
+    """Write a manifest file atomically, so an interruption can not corrupt it."""
+    with open(manifest_path + ".tmp", "w") as f:
+        json.dump(manifest, f)
+    os.replace(manifest_path + ".tmp", manifest_path)
+
+
+def _metadata_to_attrs(metadata):
+    """Convert the metadata of `read_metadata` to JSON serializable attributes."""
+    return {key: _to_json_value(value) for key, value in metadata.items()}
+
+
+def _to_json_value(value):
+    if isinstance(value, set):
+        return sorted(_to_json_value(v) for v in value)
+    if isinstance(value, list | tuple):
+        return [_to_json_value(v) for v in value]
+    if isinstance(value, np.ndarray):
+        if np.issubdtype(value.dtype, np.datetime64):
+            return np.datetime_as_string(value).tolist()
+        return value.tolist()
+    if isinstance(value, np.datetime64 | datetime):
+        return str(value)
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def main(argv=None):
+    """Convert a SLC stack in binary files to a Zarr store from the command line."""
+    parser = argparse.ArgumentParser(
+        prog="sarxarray-binary-to-zarr",
+        description="Convert a SLC stack in binary files to a Zarr store.",
+    )
+    parser.add_argument("slc_files", nargs="+", help="Paths to the SLC files.")
+    parser.add_argument("-o", "--output", required=True, help="Output Zarr store.")
+    parser.add_argument(
+        "--shape",
+        nargs=2,
+        type=int,
+        required=True,
+        metavar=("AZIMUTH", "RANGE"),
+        help="Shape of each SLC file.",
+    )
+    parser.add_argument(
+        "--dtype",
+        default="complex64",
+        help="Data type of the SLC files, e.g. complex64 or cint16.",
+    )
+    parser.add_argument(
+        "--chunks",
+        nargs=2,
+        type=int,
+        metavar=("AZIMUTH", "RANGE"),
+        help="Chunk size in azimuth and range of the Zarr store.",
+    )
+    parser.add_argument(
+        "--time-chunks",
+        default="1",
+        help='Chunk size in time of the Zarr store, an integer or "auto".',
+    )
+    parser.add_argument(
+        "--compressor",
+        choices=["auto", "zstd", "blosc", "none"],
+        default="auto",
+        help="Compressor of the Zarr store.",
+    )
+    parser.add_argument(
+        "--metadata-files", nargs="+", help="Metadata files of the SLC files."
+    )
+    parser.add_argument(
+        "--driver",
+        choices=["doris4", "doris5", "snap"],
+        default="doris5",
+        help="Driver to read the metadata files.",
+    )
+    parser.add_argument(
+        "--engine",
+        choices=["mmap", "pread"],
+        default="mmap",
+        help="I/O engine to read the SLC files.",
+    )
+    parser.add_argument(
+        "--quantization",
+        choices=["int16", "float16"],
+        help="Quantize the real and imaginary parts to int16 or float16.",
+    )
+    parser.add_argument(
+        "--max-error",
+        type=float,
+        help="Maximum absolute error of the quantized real and imaginary parts.",
+    )
+    parser.add_argument(
+        "--no-resume",
+        action="store_true",
+        help="Overwrite the store instead of resuming a previous conversion.",
+    )
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    time_chunks = args.time_chunks
+    if time_chunks != "auto":
+        time_chunks = int(time_chunks)
+
+    binary_to_zarr(
+        args.slc_files,
+        tuple(args.shape),
+        args.output,
+        dtype=args.dtype,
+        chunks=tuple(args.chunks) if args.chunks is not None else None,
+        time_chunks=time_chunks,
+        compressors=_get_compressors(args.compressor),
+        metadata_files=args.metadata_files,
+        driver=args.driver,
+        resume=not args.no_resume,
+        engine=args.engine,
+        quantization=args.quantization,
+        max_error=args.max_error,
+    )
+
+
+def _get_compressors(name):
+    """Get the Zarr compressors from their name on the command line."""
+    if _ZARR_V2:
+        from numcodecs import Blosc, Zstd
+
+        compressors = {
+            "zstd": Zstd(),
+            "blosc": Blosc(cname="zstd", shuffle=Blosc.BITSHUFFLE),
+        }
+    else:
+        from zarr.codecs import BloscCodec, ZstdCodec
+
+        compressors = {
+            "zstd": ZstdCodec(),
+            "blosc": BloscCodec(cname="zstd", shuffle="bitshuffle"),
+        }
+    compressors.update({"auto": "auto", "none": None})
+    return compressors[name]
+
+
+def _compressor_encoding(compressors) -> dict:
+    """Get the Zarr encoding of the compressors for the installed Zarr version."""
+    if isinstance(compressors, str) and compressors == "auto":
+        return {}  # the Zarr default
+    if not _ZARR_V2:
+        return {"compressors": compressors}
+    # Zarr 2 takes a single compressor
+    if isinstance(compressors, list | tuple):
+        if len(compressors) > 1:
+            raise ValueError("Zarr 2 supports only one compressor per variable.")
+        compressors = compressors[0] if compressors else None
+    return {"compressor": compressors}
@@ -3,9 +3,22 @@ import numpy as np
 # Standard data types in sarxarray:
 _dtypes = dict(int=np.int32, float=np.float32, complex=np.complex64)
 
+# Interleaved complex data types of binary files, decoded to complex when reading
+# e.g. CInt16 is the format of Sentinel-1 and TerraSAR-X SLCs
+_complex_interleaved_dtypes = {
+    "cint16": np.dtype([("re", np.int16), ("im", np.int16)]),
+    "cfloat16": np.dtype([("re", np.float16), ("im", np.float16)]),
+}
+
 # Optimal memory size of a chunk, in MB
 _memsize_chunk_mb = 100
 
+# Maximum number of memory maps kept open per process when reading binary files
+_mmap_cache_maxsize = 128
+
+# Default maximum size of the on-disk cache of parsed metadata files, in MB
+_metadata_cache_max_size_mb = 1024
+
 # Configuration for reading metadata from DORIS .res files
 # Regular expressions for reading metadata from DORIS4 files
 RE_PATTERNS_DORIS4 = {
@@ -60,8 +73,10 @@ RE_PATTERNS_DORIS5 = {
     "deramp": r"deramp:\s+([\d\.Ee\+\-]+)",
     "reramp": r"reramp:\s+([\d\.Ee\+\-]+)",
     "esd_correct": r"ESD_correct:\s+([\d\.Ee\+\-]+)",
+    # A match always starts at the first digit of a number, the lookbehind only
+    # avoids trying the other digits
     "orbit_txyz": (
-        r"(\d+)\s+([-+]?\d+\.\d+(?:\.\d+)?)\s+([-+]?\d+"
+        r"(?<!\d)(\d+)\s+([-+]?\d+\.\d+(?:\.\d+)?)\s+([-+]?\d+"
         r"\.\d+(?:\.\d+)?)\s+([-+]?\d+\.\d+(?:\.\d+)?)"
     ),
     "scene_centre_latitude": (
@@ -0,0 +1,327 @@
+from datetime import datetime
+from typing import Literal
+
+import dask.array as da
+import numpy as np
+from numpy.polynomial import polynomial
+
+# Number of times evaluated at once
+_SLICE_SIZE = 2**14
+
+
+class Orbit:
+    """Satellite orbit interpolated from state vectors.
+
+    The orbit is stored as a piecewise polynomial of the position in time, such that
+    the position and velocity at many times are evaluated with a few vectorized
+    operations. With `method="hermite"`, each interval between two state vectors is
+    a cubic Hermite polynomial through the positions and velocities at its ends.
+    With `method="polynomial"`, one polynomial of degree `degree` is fitted to all
+    positions by least squares, which does not need velocities, e.g. for the orbits
+    in DORIS metadata. The velocity is the derivative of the polynomial.
+
+    Parameters
+    ----------
+    time : array_like
+        Times of the state vectors, in seconds since `reference`, strictly increasing.
+    position : array_like
+        Positions of the state vectors, with shape (n, 3), in meters.
+    velocity : array_like | None, optional
+        Velocities of the state vectors, with shape (n, 3), in meters per second, by
+        default None.
+    reference : numpy.datetime64 | None, optional
+        Time that `time` is relative to, by default None. Required to evaluate the
+        orbit at datetime64 times.
+    method : {"hermite", "polynomial"} | None, optional
+        Interpolation method, by default None, i.e. "hermite" if `velocity` is
+        given, otherwise "polynomial".
+    degree : int, optional
+        Degree of the polynomial of `method="polynomial"`, by default 5. It is
+        limited to the number of state vectors minus one.
+
+    Raises
+    ------
+    ValueError
+        If the shapes of the state vectors do not match, if there are less than two
+        state vectors, if the times are not strictly increasing, or if
+        `method="hermite"` without velocities.
+    """
+
+    def __init__(
+        self,
+        time,
+        position,
+        velocity=None,
+        reference: np.datetime64 | None = None,
+        method: Literal["hermite", "polynomial"] | None = None,
+        degree: int = 5,
+    ):
+        time = np.array(time, dtype=np.float64)
+        position = np.array(position, dtype=np.float64)
+        if velocity is not None:
+            velocity = np.array(velocity, dtype=np.float64)
+        if method is None:
+            method = "polynomial" if velocity is None else "hermite"
+
+        # Validate the state vectors
+        if time.ndim != 1 or time.size < 2:
+            raise ValueError("At least two state vectors are required.")
+        if position.shape != (time.size, 3):
+            raise ValueError(
+                f"The shape of position should be ({time.size}, 3), "
+                f"got {position.shape}."
+            )
+        if velocity is not None and velocity.shape != (time.size, 3):
+            raise ValueError(
+                f"The shape of velocity should be ({time.size}, 3), "
+                f"got {velocity.shape}."
+            )
+        if not (np.diff(time) > 0).all():
+            raise ValueError("The times of the state vectors should be increasing.")
+
+        if method == "hermite":
+            if velocity is None:
+                raise ValueError("The hermite method requires velocities.")
+            origins, scale, coefficients = _hermite_coefficients(
+                time, position, velocity
+            )
+        elif method == "polynomial":
+            origins, scale, coefficients = _polynomial_coefficients(
+                time, position, min(degree, time.size - 1)
+            )
+        else:
+            raise ValueError(
+                f"Unknown method '{method}', expected 'hermite' or 'polynomial'."
+            )
+
+        self._time = time
+        self._position = position
+        self._velocity = velocity
+        self._reference = reference
+        self._method = method
+        # Each interval i of the piecewise polynomial starts at origins[i], and is a
+        # polynomial in s = (t - origins[i]) / scale with coefficients[:, :, i] of
+        # the x, y, z positions, from the lowest to the highest order
+        self._origins = origins
+        self._scale = scale
+        self._coefficients = coefficients
+
+    @classmethod
+    def from_metadata(
+        cls,
+        metadata: dict,
+        method: Literal["hermite", "polynomial"] | None = None,
+        degree: int = 5,
+    ) -> "Orbit":
+        """Create the orbit from the metadata of one file.
+
+        The metadata should be read by `read_metadata` from a single file. For the
+        "doris4" and "doris5" drivers, the times of the orbit are in seconds since
+        the start of the day of the acquisition, and there are no velocities. For
+        the "snap" driver, the times are in seconds since the first state vector.
+
+        Parameters
+        ----------
+        metadata : dict
+            Metadata with the orbit records, "orbit_txyz" or "orbit_time",
+            "orbit_position" and "orbit_velocity".
+        method : {"hermite", "polynomial"} | None, optional
+            Interpolation method, see `Orbit`.
+        degree : int, optional
+            Degree of the polynomial of `method="polynomial"`, by default 5.
+
+        Returns
+        -------
+        Orbit
+            The orbit, with `reference` set.
+
+        Raises
+        ------
+        ValueError
+            If the metadata has no orbit records, or is read from multiple files.
+        """
+        if "orbit_txyz" in metadata:  # DORIS
+            orbit_txyz = metadata["orbit_txyz"]
+            _check_single_orbit(orbit_txyz)
+            reference = np.datetime64(metadata["first_azimuth_time"], "D")
+            return cls(
+                orbit_txyz[:, 0],
+                orbit_txyz[:, 1:],
+                reference=reference.astype("datetime64[ns]"),
+                method=method,
+                degree=degree,
+            )
+        elif "orbit_time" in metadata:  # SNAP
+            orbit_time = metadata["orbit_time"]
+            _check_single_orbit(orbit_time)
+            # The timestamps are converted like the time stamps of the metadata
+            start = orbit_time[0, 0]
+            reference = np.datetime64(datetime.fromtimestamp(start), "ns")
+            return cls(
+                orbit_time[:, 0] - start,
+                metadata["orbit_position"],
+                metadata["orbit_velocity"],
+                reference=reference,
+                method=method,
+                degree=degree,
+            )
+        raise ValueError("No orbit records are found in the metadata.")
+
+    @property
+    def time(self) -> np.ndarray:
+        """Times of the state vectors, in seconds since `reference`."""
+        return self._time
+
+    @property
+    def position(self) -> np.ndarray:
+        """Positions of the state vectors, with shape (n, 3)."""
+        return self._position
+
+    @property
+    def velocity(self) -> np.ndarray | None:
+        """Velocities of the state vectors, with shape (n, 3), or None."""
+        return self._velocity
+
+    @property
+    def reference(self) -> np.datetime64 | None:
+        """Time that the times of the orbit are relative to."""
+        return self._reference
+
+    @property
+    def method(self) -> str:
+        """Interpolation method of the orbit."""
+        return self._method
+
+    def interpolate(self, times) -> tuple:
+        """Interpolate the position and velocity of the satellite.
+
+        Parameters
+        ----------
+        times : array_like | dask.array.Array
+            Times to interpolate at, of any shape, in seconds since `reference`, or
+            as datetime64. For a dask array, the interpolation is lazy and done per
+            chunk of `times`.
+
+        Returns
+        -------
+        tuple
+            Position and velocity, each with the shape of `times` plus a last
+            dimension of size 3 for x, y, z. Dask arrays if `times` is a dask array.
+
+        Raises
+        ------
+        ValueError
+            If a time is outside the state vectors, or if `times` are datetime64 and
+            `reference` is not set.
+        """
+        if not isinstance(times, da.Array):
+            times = np.asarray(times)
+        if np.issubdtype(times.dtype, np.datetime64):
+            if self._reference is None:
+                raise ValueError(
+                    "The reference of the orbit is required for datetime64 times."
+                )
+            times = (times - self._reference) / np.timedelta64(1, "s")
+
+        if isinstance(times, da.Array):
+            times = times.astype(np.float64)
+            # Position and velocity are computed in one task per chunk
+            stacked = times.map_blocks(
+                self._interpolate_block,
+                dtype=np.float64,
+                new_axis=times.ndim,
+                chunks=times.chunks + ((6,),),
+            )
+            return stacked[..., :3], stacked[..., 3:]
+
+        times = times.astype(np.float64, copy=False)
+        position = np.empty(times.shape + (3,))
+        velocity = np.empty(times.shape + (3,))
+        self._evaluate(
+            times.reshape(-1), position.reshape(-1, 3), velocity.reshape(-1, 3)
+        )
+        return position, velocity
+
+    def _interpolate_block(self, times: np.ndarray) -> np.ndarray:
+        """Interpolate one block of times to stacked position and velocity."""
+        stacked = np.empty(times.shape + (6,))
+        flat = stacked.reshape(-1, 6)
+        self._evaluate(times.reshape(-1), flat[:, :3], flat[:, 3:])
+        return stacked
+
+    def _evaluate(self, t: np.ndarray, position: np.ndarray, velocity: np.ndarray):
+        """Evaluate the piecewise polynomial at 1D times into (n, 3) arrays."""
+        if t.size and (t.min() < self._time[0] or t.max() > self._time[-1]):
+            raise ValueError(
+                f"Times should be within the state vectors, from {self._time[0]} "
+                f"to {self._time[-1]} seconds, got {t.min()} to {t.max()}."
+            )
+        # Evaluate in slices, such that the temporary arrays stay in the CPU cache
+        for start in range(0, t.size, _SLICE_SIZE):
+            part = slice(start, start + _SLICE_SIZE)
+            self._evaluate_slice(t[part], position[part], velocity[part])
+
+    def _evaluate_slice(self, t, position, velocity):
+        """Evaluate the piecewise polynomial at a slice of the times."""
+        n_intervals = self._origins.size
+        if n_intervals == 1:
+            interval = None
+            s = (t - self._origins[0]) / self._scale
+        else:
+            interval = np.searchsorted(self._origins, t, side="right") - 1
+            np.clip(interval, 0, n_intervals - 1, out=interval)
+            s = (t - self._origins[interval]) / self._scale
+
+        # Horner's scheme for the polynomial and its derivative, per coordinate
+        for axis in range(3):
+            terms = self._coefficients[axis]
+            if interval is None:
+                terms = terms[:, 0]
+            else:
+                terms = [term[interval] for term in terms]
+            value, derivative = terms[-1], 0.0
+            for term in terms[-2::-1]:
+                derivative = derivative * s + value
+                value = value * s + term
+            position[:, axis] = value
+            velocity[:, axis] = derivative / self._scale
+
+
+def _check_single_orbit(orbit):
+    """Raise a ValueError if the orbit records are from multiple files."""
+    if isinstance(orbit, list):
+        raise ValueError(
+            f"The metadata has the orbits of {len(orbit)} files, "
+            "an orbit is created from the metadata of a single file."
+        )
+
+
+def _hermite_coefficients(time, position, velocity):
+    """Return the cubic Hermite polynomials between the state vectors."""
+    h = np.diff(time)[:, None]
+    slope = np.diff(position, axis=0) / h
+    v0, v1 = velocity[:-1], velocity[1:]
+    coefficients = np.stack(
+        [
+            position[:-1],
+            v0,
+            (3 * slope - 2 * v0 - v1) / h,
+            (v0 + v1 - 2 * slope) / h**2,
+        ]
+    )
+    # (terms, intervals, xyz) -> (xyz, terms, intervals)
+    return time[:-1], 1.0, np.ascontiguousarray(coefficients.transpose(2, 0, 1))
+
+
+def _polynomial_coefficients(time, position, degree):
+    """Return the least squares polynomial through the positions."""
+    # Fit in normalized time, from -1 to 1, for a well conditioned system
+    origin = (time[0] + time[-1]) / 2
+    scale = (time[-1] - time[0]) / 2
+    coefficients = polynomial.polyfit((time - origin) / scale, position, degree)
+    # (terms, xyz) -> (xyz, terms, 1 interval)
+    return (
+        np.array([origin]),
+        scale,
+        np.ascontiguousarray(coefficients.T[:, :, None]),
+    )
@@ -31,10 +31,62 @@ class Stack:
         self._obj = self._obj.assign({"phase": (("azimuth", "range", "time"), phase)})
         return self._obj
 
+    def _get_amplitude_phase(self):
+        # Fused kernel: amplitude and phase are computed from one pass over each
+        # complex block in memory, instead of one pass per kernel
+        meta_arr = np.array((), dtype=_dtypes["float"])
+        amplitude, phase = da.apply_gufunc(
+            _compute_amp_phase,
+            "()->(),()",
+            self._obj.complex,
+            meta=(meta_arr, meta_arr),
+        )
+        self._obj = self._obj.assign(
+            {
+                "amplitude": (("azimuth", "range", "time"), amplitude),
+                "phase": (("azimuth", "range", "time"), phase),
+            }
+        )
+        return self._obj
+
+    @property
+    def amplitude(self):
+        """Amplitude of the stack.
+
+        The `amplitude` data variable if present, otherwise the amplitude is
+        computed lazily from the `complex` data variable, without being stored in
+        the stack.
+        """
+        if "amplitude" in self._obj.data_vars:
+            return self._obj.amplitude
+        return self._derive(_compute_amp, "amplitude")
+
+    @property
+    def phase(self):
+        """Phase of the stack.
+
+        The `phase` data variable if present, otherwise the phase is computed
+        lazily from the `complex` data variable, without being stored in the stack.
+        """
+        if "phase" in self._obj.data_vars:
+            return self._obj.phase
+        return self._derive(_compute_phase, "phase")
+
+    def _derive(self, func, name):
+        meta_arr = np.array((), dtype=_dtypes["float"])
+        data = da.apply_gufunc(func, "()->()", self._obj.complex.data, meta=meta_arr)
+        return xr.DataArray(
+            data,
+            coords=self._obj.complex.coords,
+            dims=self._obj.complex.dims,
+            name=name,
+        )
+
     def mrm(self):
         """Compute a Mean Reflection Map (MRM)."""
-        t_order = list(self._obj.sizes).index("time")  # Time dimension index
-        return self._obj.amplitude.mean(axis=t_order)
+        amplitude = self.amplitude
+        t_order = amplitude.dims.index("time")  # Time dimension index
+        return amplitude.mean(axis=t_order)
 
     def point_selection(self, threshold, method="amplitude_dispersion", chunks=1000):
         """Select pixels from a Stack, and return a Space-Time Matrix.
@@ -120,13 +172,18 @@ class Stack:
         return stm_masked
 
     def _amp_disp(self, chunk_azimuth=500, chunk_range=500):
+        amplitude = self.amplitude
+
         # Time dimension order
-        t_order = list(self._obj.sizes).index("time")
+        t_order = amplitude.dims.index("time")
 
         # Rechunk to make temporal operation more efficient
-        amplitude = self._obj.amplitude.chunk(
-            {"azimuth": chunk_azimuth, "range": chunk_range, "time": -1}
-        )
+        # Skip it if all epochs are already in one chunk, e.g. when loaded by
+        # `from_binary` with `time_chunks=-1`
+        if amplitude.chunks is None or len(amplitude.chunks[t_order]) > 1:
+            amplitude = amplitude.chunk(
+                {"azimuth": chunk_azimuth, "range": chunk_range, "time": -1}
+            )
 
         # Compoute amplitude dispersion
         # By defalut, the mean and std function from Xarray will skip NaN values
@@ -174,3 +231,7 @@ def _compute_amp(complex):
 
 def _compute_phase(complex):
     return np.angle(complex)
+
+
+def _compute_amp_phase(complex):
+    return np.abs(complex), np.angle(complex)
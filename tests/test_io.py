@@ -1,14 +1,39 @@
 """test _io.py"""
 
+import glob
+import json
 import logging
+import mmap
 import os
+import re
+import shutil
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime
 
+import dask.array as da
 import numpy as np
 import pytest
 import xarray as xr
+from dask.local import get_sync
 
 import sarxarray
-from sarxarray._io import _calc_chunksize, _unpack_complex
+from sarxarray._io import (
+    _append_mother,
+    _calc_chunksize,
+    _combine_complex_block,
+    _literal_prefix,
+    _MetadataCache,
+    _parse_snap_data_entry_value,
+    _read_one_znap_archive,
+    _regulate_metadata,
+    _scan_res,
+    _scan_snap_json,
+    _snap_path_starts,
+    _stack_daughters,
+    _unpack_complex,
+    _view_complex_block,
+)
 from sarxarray.conf import (
     META_ARRAY_KEYS,
     META_FLOAT_KEYS,
@@ -144,6 +169,39 @@ class TestFromDS:
             var in slcs.variables.keys() for var in ["complex", "amplitude", "phase"]
         )
 
+    def test_from_dataset_no_amp_phase(self):
+        test_ds = xr.open_zarr(
+            f"{os.path.dirname(__file__)}/data/zarrs/slcs_example.zarr"
+        )
+        slcs = sarxarray.from_dataset(test_ds, attach_amp_phase=False)
+        assert list(slcs.data_vars) == ["complex"]
+        assert np.allclose(slcs.slcstack.amplitude, np.abs(slcs.complex))
+
+    def test_from_dataset_complex64(self):
+        test_ds = xr.open_zarr(
+            f"{os.path.dirname(__file__)}/data/zarrs/slcs_example.zarr"
+        )
+        # float64 parts would give complex128 with real + 1j * imag
+        test_ds = test_ds.astype(np.float64)
+        slcs = sarxarray.from_dataset(test_ds)
+        assert slcs.complex.dtype == np.complex64
+        assert slcs.complex.chunks == test_ds["real"].chunks
+        assert np.allclose(
+            slcs.complex, (test_ds["real"] + 1j * test_ds["imag"]).astype(np.complex64)
+        )
+
+    def test_from_dataset_iq(self):
+        rng = np.random.default_rng(0)
+        iq = rng.standard_normal((10, 12, 3, 2), dtype=np.float32)
+        test_ds = xr.Dataset(
+            {"iq": (("azimuth", "range", "time", "component"), iq)}
+        ).chunk({"azimuth": 5, "range": 6, "time": 1})
+        slcs = sarxarray.from_dataset(test_ds)
+        assert "iq" not in slcs.variables
+        assert "component" not in slcs.dims
+        assert slcs.complex.dtype == np.complex64
+        assert np.array_equal(slcs.complex, iq[..., 0] + 1j * iq[..., 1])
+
     def test_from_dataset_broken_dim(self):
         test_ds_broken_dim = xr.open_zarr(
             f"{os.path.dirname(__file__)}/data/zarrs/slcs_example_broken_dim.zarr"
@@ -192,6 +250,13 @@ class TestFromBinary:
         )
         assert stack.sizes == {"azimuth": 100, "range": 100, "time": 2}
 
+    def test_loading_no_amp_phase(self, test_slcs):
+        stack = sarxarray.from_binary(
+            test_slcs, (100, 100), chunks=(50, 50), attach_amp_phase=False
+        )
+        assert list(stack.data_vars) == ["complex"]
+        assert np.allclose(stack.slcstack.phase, np.angle(stack.complex))
+
     def test_loading_chunksizes(self, test_slcs):
         stack = sarxarray.from_binary(
             test_slcs, (100, 100), dtype=np.complex64, chunks=(10, 10)
@@ -219,6 +284,165 @@ class TestFromBinary:
         assert stack.chunks["azimuth"][0] == 100
         assert stack.chunks["range"][0] == 100
 
+    def test_loading_values(self, test_slcs):
+        stack = sarxarray.from_binary(
+            test_slcs, (100, 100), dtype=np.complex64, chunks=(30, 40)
+        )
+        expected = np.stack(
+            [np.fromfile(f, dtype=np.complex64).reshape((100, 100)) for f in test_slcs],
+            axis=-1,
+        )
+        assert np.array_equal(stack.complex.values, expected)
+
+    def test_loading_single_graph_layer(self, test_slcs):
+        stack = sarxarray.from_binary(
+            test_slcs, (100, 100), dtype=np.complex64, chunks=(30, 40)
+        )
+        graph = stack.complex.data.__dask_graph__()
+        assert len(graph.layers) == 1
+        # One task per (azimuth-chunk, range-chunk, time-chunk)
+        assert len(graph) == 4 * 3 * 2
+
+    def test_loading_time_chunks(self, test_slcs):
+        stack = sarxarray.from_binary(
+            test_slcs, (100, 100), dtype=np.complex64, chunks=(30, 40), time_chunks=2
+        )
+        assert stack.chunks["time"] == (2,)
+        graph = stack.complex.data.__dask_graph__()
+        assert len(graph) == 4 * 3 * 1
+        stack_ref = sarxarray.from_binary(
+            test_slcs, (100, 100), dtype=np.complex64, chunks=(30, 40)
+        )
+        assert np.array_equal(stack.complex.values, stack_ref.complex.values)
+
+    def test_loading_auto_time_chunks(self, test_slcs):
+        stack = sarxarray.from_binary(
+            test_slcs, (100, 100), dtype=np.complex64, time_chunks="auto"
+        )
+        assert stack.chunks["time"] == (2,)
+        assert stack.chunks["azimuth"][0] == 100
+        assert stack.chunks["range"][0] == 100
+
+    @pytest.mark.parametrize("time_chunks", [1, 2])
+    def test_loading_io_hints(self, test_slcs, time_chunks):
+        stack = sarxarray.from_binary(
+            test_slcs,
+            (100, 100),
+            dtype=np.complex64,
+            chunks=(30, 40),
+            time_chunks=time_chunks,
+            io_hints=True,
+        )
+        stack_ref = sarxarray.from_binary(
+            test_slcs, (100, 100), dtype=np.complex64, chunks=(30, 40)
+        )
+        assert np.array_equal(stack.complex.values, stack_ref.complex.values)
+
+    @pytest.mark.parametrize("engine", ["mmap", "pread"])
+    @pytest.mark.parametrize("chunks", [(30, 40), (30, 100)])
+    def test_loading_io_hints_chunk_bytes(self, test_slcs, monkeypatch, engine, chunks):
+        advised = []
+
+        def record(target, advices, start, length):
+            advised.append((type(target), advices, start, length))
+
+        monkeypatch.setattr(sarxarray._io, "_madvise", record)
+        monkeypatch.setattr(sarxarray._io, "_fadvise", record)
+        stack = sarxarray.from_binary(
+            test_slcs[:1],
+            (100, 100),
+            dtype=np.complex64,
+            chunks=chunks,
+            io_hints=True,
+            engine=engine,
+        )
+        stack.complex.isel(azimuth=slice(30, 60), range=slice(40, 80)).compute()
+
+        if engine == "mmap":
+            assert all(target is mmap.mmap for target, *_ in advised)
+        row_nbytes = 100 * 8
+        dontneed = [hint for hint in advised if "DONTNEED" in hint[1][0]]
+        if chunks == (30, 100):  # complete rows, one range of bytes
+            rows = (30 * row_nbytes, 30 * row_nbytes)
+            assert [hint[2:] for hint in dontneed] == [rows]
+        else:  # only the bytes of the chunk, and kept for the neighbouring chunks
+            assert dontneed == []
+            assert len(advised) == 30
+            for i_row, (_, advices, start, length) in enumerate(advised):
+                assert "SEQUENTIAL" not in advices[0]
+                assert start == (30 + i_row) * row_nbytes + 40 * 8
+                assert length == 40 * 8
+
+    @pytest.mark.parametrize("chunks", [(30, 40), (30, 100)])
+    @pytest.mark.parametrize("time_chunks", [1, 2])
+    @pytest.mark.parametrize("io_hints", [False, True])
+    def test_loading_pread_engine(self, test_slcs, chunks, time_chunks, io_hints):
+        stack = sarxarray.from_binary(
+            test_slcs,
+            (100, 100),
+            dtype=np.complex64,
+            chunks=chunks,
+            time_chunks=time_chunks,
+            io_hints=io_hints,
+            engine="pread",
+        )
+        stack_ref = sarxarray.from_binary(
+            test_slcs, (100, 100), dtype=np.complex64, chunks=(30, 40)
+        )
+        assert np.array_equal(stack.complex.values, stack_ref.complex.values)
+
+    def test_loading_pread_engine_short_file_failing(self, test_slcs):
+        stack = sarxarray.from_binary(
+            test_slcs, (200, 100), dtype=np.complex64, engine="pread"
+        )
+        with pytest.raises(OSError):
+            stack.complex.compute()
+
+    def test_loading_unknown_engine_failing(self, test_slcs):
+        with pytest.raises(ValueError):
+            sarxarray.from_binary(
+                test_slcs, (100, 100), dtype=np.complex64, engine="unknown"
+            )
+
+    @pytest.mark.parametrize(
+        "dtype, comp_dtype",
+        [
+            ("cint16", np.int16),
+            ("cfloat16", np.float16),
+            (np.dtype([("re", np.float32), ("im", np.float32)]), np.float32),
+        ],
+    )
+    @pytest.mark.parametrize("engine", ["mmap", "pread"])
+    @pytest.mark.parametrize("time_chunks", [1, 2])
+    def test_loading_interleaved_complex(
+        self, tmp_path, dtype, comp_dtype, engine, time_chunks
+    ):
+        rng = np.random.default_rng(0)
+        expected = rng.integers(-1000, 1000, (100, 100, 2)) + 1j * rng.integers(
+            -1000, 1000, (100, 100, 2)
+        )
+        slc_files = []
+        for i_t in range(2):
+            components = np.stack(
+                [expected[:, :, i_t].real, expected[:, :, i_t].imag], axis=-1
+            )
+            f_slc = tmp_path / f"slc_{i_t}.raw"
+            components.astype(comp_dtype).tofile(f_slc)
+            slc_files.append(f_slc)
+
+        stack = sarxarray.from_binary(
+            slc_files,
+            (100, 100),
+            dtype=dtype,
+            chunks=(30, 40),
+            time_chunks=time_chunks,
+            engine=engine,
+        )
+        assert stack.complex.dtype == np.complex64
+        # Unpacked when reading, no extra graph layer
+        assert len(stack.complex.data.__dask_graph__().layers) == 1
+        assert np.array_equal(stack.complex.values, expected.astype(np.complex64))
+
     def test_loading_one_slc(self, test_slcs):
         stack = sarxarray.from_binary(
             [test_slcs[0]], (100, 100), dtype=np.complex64, chunks=(10, 10)
@@ -284,6 +508,54 @@ class TestUtils:
         cmp_unpacked = _unpack_complex(cmp)
         assert cmp_unpacked == 2j + 1
 
+    def test_unpack_complex_window(self):
+        dtype = np.dtype([("re", np.int16), ("im", np.int16)])
+        cmp = np.zeros((4, 6), dtype=dtype)
+        cmp["re"] = np.arange(24).reshape((4, 6))
+        cmp["im"] = -np.arange(24).reshape((4, 6))
+        cmp_unpacked = _unpack_complex(cmp[1:3, 2:5])
+        assert cmp_unpacked.dtype == np.complex64
+        assert np.array_equal(
+            cmp_unpacked, cmp["re"][1:3, 2:5] + 1j * cmp["im"][1:3, 2:5]
+        )
+
+    def test_combine_complex_block(self):
+        real = np.arange(6, dtype=np.float64).reshape((2, 3))
+        cmp = _combine_complex_block(real, -real)
+        assert cmp.dtype == np.complex64
+        assert np.array_equal(cmp, real - 1j * real)
+
+    def test_combine_complex_block_peak_memory(self):
+        rng = np.random.default_rng(0)
+        real = rng.standard_normal((1000, 1000), dtype=np.float32)
+        imag = rng.standard_normal((1000, 1000), dtype=np.float32)
+        tracemalloc.start()
+        try:
+            tracemalloc.reset_peak()
+            cmp = _combine_complex_block(real, imag)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        # Only the complex64 output is allocated, no temporaries
+        assert peak < 1.05 * cmp.nbytes
+
+    def test_view_complex_block_zero_copy(self):
+        iq = np.arange(24, dtype=np.float32).reshape((2, 3, 2, 2))
+        cmp = _view_complex_block(iq)
+        assert cmp.shape == (2, 3, 2)
+        assert np.shares_memory(cmp, iq)
+        assert np.array_equal(cmp, iq[..., 0] + 1j * iq[..., 1])
+
+    def test_view_complex_block_copy(self):
+        # Not float32, or components not adjacent: combined into a new array
+        iq = np.arange(24, dtype=np.float64).reshape((2, 3, 2, 2))
+        iq_transposed = np.moveaxis(iq.astype(np.float32).reshape((2, 3, 2, 2)), 2, 3)
+        for iq_block in [iq, iq_transposed]:
+            cmp = _view_complex_block(iq_block)
+            assert cmp.dtype == np.complex64
+            assert not np.shares_memory(cmp, iq_block)
+            assert np.array_equal(cmp, iq_block[..., 0] + 1j * iq_block[..., 1])
+
     def test_calc_chunksize_tiny(self):
         assert _calc_chunksize((100, 100), np.float32, 1) == (100, 100)
         assert _calc_chunksize((100, 100), np.float32, 2) == (100, 100)
@@ -298,6 +570,29 @@ class TestUtils:
         assert _calc_chunksize((100, 1000000), np.float32, 1) == (100, 6000)
         assert _calc_chunksize((100, 1000000), np.float32, 2) == (100, 4000)
 
+    def test_calc_chunksize_n_time(self):
+        assert _calc_chunksize((1000000, 1000000), np.complex64, 1, n_time=1) == (
+            4000,
+            4000,
+        )
+        assert _calc_chunksize((1000000, 1000000), np.complex64, 1, n_time=400) == (
+            200,
+            200,
+        )
+
+
+def _assert_metadata_equal(metadata, expected):
+    assert metadata.keys() == expected.keys()
+    for key, value in expected.items():
+        if isinstance(value, list):  # arrays per file
+            assert len(metadata[key]) == len(value)
+            for arr, arr_expected in zip(metadata[key], value, strict=True):
+                assert np.array_equal(arr, arr_expected)
+        elif isinstance(value, np.ndarray):
+            assert np.array_equal(metadata[key], value)
+        else:
+            assert metadata[key] == value
+
 
 class TestReadMetadata:
     """Test reading metadata from DORIS .res files"""
@@ -338,6 +633,209 @@ class TestReadMetadata:
                     assert isinstance(metadata[key], int)
         assert metadata["first_azimuth_time"].shape[0] == 3
 
+    @pytest.mark.parametrize(
+        "patterns", [RE_PATTERNS_DORIS4, RE_PATTERNS_DORIS5, RE_PATTERNS_DORIS5_IFG]
+    )
+    def test_scan_res_same_as_regex(self, patterns):
+        files = glob.glob(
+            f"{os.path.dirname(__file__)}/data/metadata/**/*.res", recursive=True
+        )
+        rng = np.random.default_rng(0)
+        for file in files:
+            with open(file) as f:
+                content = f.read()
+            lines = content.splitlines(keepends=True)
+            # The file itself, and shuffled and truncated versions
+            contents = [content]
+            for _ in range(5):
+                shuffled = "".join(rng.permutation(lines))
+                contents.append(shuffled[: rng.integers(len(shuffled))])
+            for content in contents:
+                expected = {}
+                for key, pattern in patterns.items():
+                    if key in META_ARRAY_KEYS:
+                        expected[key] = re.findall(pattern, content) or None
+                    else:
+                        match = re.search(pattern, content)
+                        expected[key] = match.group(1) if match else None
+                assert _scan_res(content, patterns) == expected
+
+    def test_scan_snap_json_same_as_filter(self):
+        files = glob.glob(
+            f"{os.path.dirname(__file__)}/data/zarrs/*/SNAP/product_metadata.json"
+        )
+
+        def flatten(content, path):
+            # All (path, data) pairs in the tree, as the paths of the patterns
+            if isinstance(content, list):
+                for index, item in enumerate(content):
+                    yield from flatten(item, f"{path}.{index}" if path else str(index))
+            elif isinstance(content, dict):
+                path = f"{path}.{content['name']}" if path else content["name"]
+                if "data" in content:
+                    yield path, content["data"]
+                for child_key in ("elements", "attributes"):
+                    yield from flatten(content.get(child_key), f"{path}.{child_key}")
+
+        for file in files:
+            with open(file) as f:
+                content = json.load(f)
+            paths = dict(flatten(content, ""))
+            results = _scan_snap_json(content, RE_PATTERNS_SNAP)
+            for key, pattern in RE_PATTERNS_SNAP.items():
+                expected = [
+                    _parse_snap_data_entry_value(data)
+                    for path, data in paths.items()
+                    if re.match(pattern, path)
+                ]
+                assert results[key] == expected
+
+    def test_snap_path_starts(self):
+        starts = re.compile(
+            _snap_path_starts(r"[\d]+.Slave_Metadata.elements.[\d]+.*_Orb_[\d]{4}")
+        )
+        assert starts.fullmatch("0")
+        assert starts.fullmatch("4.Slave_Metadata.elements")
+        assert starts.fullmatch("4.Slave_Metadata.elements.0.S1A_Orb_2023")
+        assert starts.fullmatch("4.Slave_Metadata.elements.0.S1A_Orb_2023.attributes")
+        assert not starts.fullmatch("1.Original_Product_Metadata")
+        assert not starts.fullmatch("4.Slave_Metadata.attributes")
+
+    def test_literal_prefix(self):
+        assert _literal_prefix(r"Radar_wavelength \(m\):\s+(.+)") == (
+            "Radar_wavelength (m):"
+        )
+        assert _literal_prefix(r"Scene identification:.*?(A|D)") == (
+            "Scene identification:"
+        )
+        assert _literal_prefix(r"colou?r:\s+(.+)") == "colo"
+        assert _literal_prefix(r"(\d+)\s+") == ""
+        # Top-level alternation, the branches start with different text
+        assert _literal_prefix("abc|xyz") == ""
+        assert _literal_prefix(r"Pass:\s+(A|D)") == "Pass:"
+        assert _literal_prefix(r"abc[|]") == "abc"
+        assert _literal_prefix(r"abc\|def") == "abc|def"
+
+    @pytest.mark.parametrize(
+        "executor", [None, ThreadPoolExecutor, ProcessPoolExecutor]
+    )
+    def test_read_metadata_concurrent(self, res_files_doris5, executor):
+        metadata = sarxarray.read_metadata(res_files_doris5, driver="doris5")
+        # Reversed files, to check the order of the per-file values
+        metadata_reversed = sarxarray.read_metadata(
+            res_files_doris5[::-1], driver="doris5"
+        )
+        if executor is None:
+            metadata_concurrent = sarxarray.read_metadata(
+                res_files_doris5, driver="doris5", max_workers=3
+            )
+        else:
+            with executor(max_workers=2) as pool:
+                metadata_concurrent = sarxarray.read_metadata(
+                    res_files_doris5, driver="doris5", executor=pool
+                )
+        _assert_metadata_equal(metadata_concurrent, metadata)
+        for key in META_ARRAY_KEYS:
+            if key in metadata:
+                for arr, arr_reversed in zip(
+                    metadata_concurrent[key], metadata_reversed[key][::-1], strict=True
+                ):
+                    assert np.array_equal(arr, arr_reversed)
+
+    @pytest.fixture
+    def count_parse(self, monkeypatch):
+        files_parsed = []
+        parse_metadata = sarxarray._io._parse_metadata
+
+        def counting_parse_metadata(file, *args, **kwargs):
+            files_parsed.append(file)
+            return parse_metadata(file, *args, **kwargs)
+
+        monkeypatch.setattr(sarxarray._io, "_parse_metadata", counting_parse_metadata)
+        return files_parsed
+
+    def test_read_metadata_cache(self, res_files_doris5, tmp_path, count_parse):
+        metadata = sarxarray.read_metadata(res_files_doris5, driver="doris5")
+        assert len(count_parse) == 3
+        metadata_cached = sarxarray.read_metadata(
+            res_files_doris5, driver="doris5", cache_dir=tmp_path / "cache"
+        )
+        assert len(count_parse) == 6
+        assert len(list((tmp_path / "cache").glob("*.npz"))) == 3
+        # Read again, from the cache only
+        metadata_cached = sarxarray.read_metadata(
+            res_files_doris5, driver="doris5", cache_dir=tmp_path / "cache"
+        )
+        assert len(count_parse) == 6
+        _assert_metadata_equal(metadata_cached, metadata)
+
+    def test_read_metadata_cache_snap(self, metadata_files_snap, tmp_path):
+        metadata = sarxarray.read_metadata(metadata_files_snap, driver="snap")
+        for _ in range(2):
+            metadata_cached = sarxarray.read_metadata(
+                metadata_files_snap, driver="snap", cache_dir=tmp_path
+            )
+        _assert_metadata_equal(metadata_cached, metadata)
+        for key, value in metadata.items():
+            assert type(metadata_cached[key]) is type(value)
+            if isinstance(value, np.ndarray):
+                assert metadata_cached[key].dtype == value.dtype
+
+    def test_read_metadata_cache_modified(
+        self, res_files_doris4, tmp_path, count_parse
+    ):
+        files = []
+        for i_file, file in enumerate(res_files_doris4):
+            files.append(tmp_path / f"{i_file}.res")
+            shutil.copy(file, files[-1])
+        sarxarray.read_metadata(files, driver="doris4", cache_dir=tmp_path / "cache")
+        # Modify one file
+        content = files[0].read_text()
+        files[0].write_text(content.replace("HAMMING", "RECTANGLE", 1))
+        metadata = sarxarray.read_metadata(
+            files, driver="doris4", cache_dir=tmp_path / "cache"
+        )
+        assert len(count_parse) == 4
+        assert metadata["weighting_azimuth"] == {"HAMMING", "RECTANGLE"}
+
+    def test_read_metadata_cache_eviction(self, res_files_doris4, tmp_path):
+        cache_dir = tmp_path / "cache"
+        sarxarray.read_metadata(
+            res_files_doris4[0], driver="doris4", cache_dir=cache_dir
+        )
+        entry_size = sum(f.stat().st_size for f in cache_dir.glob("*.npz"))
+        for file in res_files_doris4[1:]:
+            sarxarray.read_metadata(
+                file,
+                driver="doris4",
+                cache_dir=cache_dir,
+                cache_max_size_mb=1.5 * entry_size / 1024**2,
+            )
+        # Only the most recently used entry is kept
+        assert len(list(cache_dir.glob("*.npz"))) == 1
+        assert not list(cache_dir.glob("*.tmp"))
+
+    def test_read_metadata_cache_evict_once(
+        self, res_files_doris4, tmp_path, monkeypatch
+    ):
+        count_evict = []
+        evict = _MetadataCache.evict
+
+        def counting_evict(self):
+            count_evict.append(1)
+            evict(self)
+
+        monkeypatch.setattr(_MetadataCache, "evict", counting_evict)
+        cache_dir = tmp_path / "cache"
+        sarxarray.read_metadata(
+            res_files_doris4,
+            driver="doris4",
+            cache_dir=cache_dir,
+            cache_max_size_mb=1e-6,
+        )
+        assert len(count_evict) == 1
+        assert not list(cache_dir.glob("*.npz"))
+
     def test_read_metadata_non_existent_driver(self, res_files_doris4):
         with pytest.raises(NotImplementedError):
             sarxarray.read_metadata(res_files_doris4, driver="non_existent")
@@ -455,6 +953,69 @@ class TestReadMetadata:
         assert np.isclose(metadata["first_pixel_number"], 9178)
         assert np.isclose(metadata["first_line_number"], 912)
 
+    def test_read_metadata_per_epoch(self, res_files_doris5):
+        table = sarxarray.read_metadata(
+            res_files_doris5[::-1], driver="doris5", per_epoch=True
+        )
+        assert isinstance(table, xr.Dataset)
+        assert table.sizes == {"time": 3}
+        assert (np.diff(table.time.values) > np.timedelta64(0)).all()
+        assert "orbit_txyz" not in table
+        assert table["wavelength"].dtype == np.float64
+        assert table["deramp"].dtype == np.int64
+        assert table["swath"].values.tolist() == ["IW3"] * 3
+        # 20180312 has a different number of pixels, 20180318 has no ifgs.res
+        assert table["number_of_pixels"].sel(time="2018-03-12").item() == 24866
+        assert np.isnan(table["number_of_pixels"].sel(time="2018-03-18").item())
+        for i_epoch, file in enumerate(res_files_doris5):
+            metadata = sarxarray.read_metadata(file, driver="doris5")
+            epoch = table.isel(time=i_epoch)
+            assert epoch.time.values == metadata["first_azimuth_time"]
+            assert np.isclose(
+                epoch["range_sampling_rate"], metadata["range_sampling_rate"]
+            )
+            assert epoch["pass_direction"].item() == metadata["pass_direction"]
+
+    def test_read_metadata_per_epoch_missing_fields(
+        self, res_files_doris5_err_missing_fields
+    ):
+        table = sarxarray.read_metadata(
+            res_files_doris5_err_missing_fields, driver="doris5", per_epoch=True
+        )
+        assert np.isnan(table["wavelength"].values).tolist() == [False, False, True]
+
+    def test_read_metadata_per_epoch_doris4(self, res_files_doris4):
+        table = sarxarray.read_metadata(
+            res_files_doris4, driver="doris4", per_epoch=True
+        )
+        assert table.sizes == {"time": 3}
+        assert np.allclose(table["range_sampling_rate"], 164.829163 * 1_000_000)
+
+    def test_read_metadata_per_epoch_snap(self, metadata_files_snap):
+        with pytest.raises(NotImplementedError):
+            sarxarray.read_metadata(metadata_files_snap, driver="snap", per_epoch=True)
+
+    def test_regulate_metadata_arrays(self):
+        orbit_position = np.array([[1.0, 2.0, 3.0], [4.0, 5.0, 6.0]])
+        metadata = _regulate_metadata(
+            {
+                "first_azimuth_time": [1680234623.0, 1680234623.5],
+                "orbit_txyz": [[("1", "2.5", "-3.5", "4")], [("5", "6", "7", "8")]],
+                "orbit_position": [orbit_position, orbit_position],
+                "polarisations": [np.array([["VV"], ["VH"]])] * 2,
+            },
+            driver="snap",
+        )
+        assert len(metadata["orbit_txyz"]) == 2
+        assert metadata["orbit_txyz"][0].dtype == np.float64
+        assert np.array_equal(metadata["orbit_txyz"][0], [[1.0, 2.5, -3.5, 4.0]])
+        assert np.array_equal(metadata["orbit_txyz"][1], [[5.0, 6.0, 7.0, 8.0]])
+        assert metadata["orbit_position"][0] is not orbit_position
+        assert np.array_equal(metadata["orbit_position"][1], orbit_position)
+        for polarisations in metadata["polarisations"]:
+            assert polarisations.dtype == np.dtypes.StringDType()
+            assert polarisations.tolist() == [["VV"], ["VH"]]
+
 
 class TestFromSnapDataset:
     """from_znap in _io.py"""
@@ -476,6 +1037,99 @@ class TestFromSnapDataset:
         # Test data can be loaded without error
         _ = stack.compute()
 
+    def test_loading_no_amp_phase(self, znap_files_snap):
+        stack = sarxarray.from_znap(znap_files_snap, attach_amp_phase=False)
+        assert "complex" in stack.data_vars
+        assert not set(["amplitude", "phase"]) & set(stack.data_vars)
+
+    def test_max_workers(self, znap_files_snap):
+        stack = sarxarray.from_znap(znap_files_snap)
+        # Reversed order, read concurrently
+        stack_threads = sarxarray.from_znap(znap_files_snap[::-1], max_workers=2)
+        xr.testing.assert_equal(stack_threads, stack)
+        assert stack_threads.attrs["mother_epoch"] == stack.attrs["mother_epoch"]
+        assert (
+            stack_threads.attrs["metadata_mother"].keys()
+            == stack.attrs["metadata_mother"].keys()
+        )
+
+    def test_metadata_read_once(self, znap_files_snap, monkeypatch):
+        files_read = []
+        read_metadata = sarxarray._io.read_metadata
+
+        def counting_read_metadata(files, *args, **kwargs):
+            files_read.append(files)
+            return read_metadata(files, *args, **kwargs)
+
+        monkeypatch.setattr(sarxarray._io, "read_metadata", counting_read_metadata)
+        stack = sarxarray.from_znap(znap_files_snap, max_workers=2)
+        assert len(files_read) == len(znap_files_snap)
+        # The metadata of the mother epoch is taken from the first archive
+        metadata = read_metadata(
+            f"{znap_files_snap[0]}/SNAP/product_metadata.json", driver="snap"
+        )
+        assert stack.attrs["metadata_mother"]["mother_file"] == metadata["mother_file"]
+
+    def test_mother_fill_layer(self, znap_files_snap, tmp_path):
+        stack = sarxarray.from_znap(znap_files_snap)
+        # h2ph only exists at the daughter epoch
+        h2ph = stack["h2ph"]
+        assert h2ph.dtype == np.float32
+        assert h2ph.chunks == stack["complex"].chunks
+        i_mother = list(stack["time"].dt.strftime("%Y%m%d").values).index(
+            stack.attrs["mother_epoch"]
+        )
+        # The fill chunk is a broadcast view of a single zero
+        graph = dict(h2ph.data.__dask_graph__())
+        key = h2ph.data.__dask_keys__()[0][0][i_mother]
+        block = get_sync(graph, key)
+        assert block.strides == (0, 0, 0)
+        assert np.all(block == 0)
+
+        # It stays lazy until written
+        delayed = (
+            stack[["h2ph"]].drop_attrs().to_zarr(tmp_path / "h2ph.zarr", compute=False)
+        )
+        delayed.compute()
+        # Zero is the fill value of h2ph, so read it without masking
+        written = xr.open_zarr(tmp_path / "h2ph.zarr", mask_and_scale=False)["h2ph"]
+        assert written.dtype == np.float32
+        assert np.all(written.isel(time=i_mother).values == 0)
+
+    def test_mother_fill_layer_not_dask(self, znap_files_snap):
+        data_mother, _ = _read_one_znap_archive(znap_files_snap[0])
+        data_daughter, _ = _read_one_znap_archive(znap_files_snap[1])
+        daughters = _stack_daughters([(datetime(2023, 3, 19), data_daughter)])
+        # A daughter layer in memory, e.g. after loading
+        daughters["h2ph"] = daughters["h2ph"].load()
+        stack = _append_mother(daughters, data_mother, datetime(2023, 3, 31), "")
+        assert stack["h2ph"].sizes["time"] == 2
+        assert np.all(stack["h2ph"].isel(time=-1).values == 0)
+
+    def test_archives_and_index(self, znap_files_snap, tmp_path):
+        with pytest.raises(ValueError):
+            sarxarray.from_znap()
+        with pytest.raises(ValueError):
+            sarxarray.from_znap(znap_files_snap, index=tmp_path / "znap_index.json")
+
+    def test_stack_daughters(self, znap_files_snap):
+        data, _ = _read_one_znap_archive(znap_files_snap[1])
+        time_stamps = [datetime(2023, 3, day) for day in [19, 7, 13]]
+        stack = _stack_daughters([(t, data) for t in time_stamps])
+        assert stack.sizes["time"] == 3
+        assert list(stack["time"].values) == sorted(np.array(time_stamps, "M8[ns]"))
+        assert stack.attrs == {"mother_epoch": None}
+        for name, variable in data.data_vars.items():
+            assert variable.attrs
+            assert stack[name].attrs == variable.attrs
+        assert _stack_daughters([]) is None
+
+    def test_variable_attrs_kept(self, znap_files_snap):
+        stack = sarxarray.from_znap(znap_files_snap)
+        # The layers read from the archives, complex is computed from i and q
+        for name in ["h2ph", "latitude", "elevation"]:
+            assert {"units", "geocoding", "znap_format"} <= set(stack[name].attrs)
+
     def test_only_mother(self, znap_files_snap_only_mother):
         stack = sarxarray.from_znap(znap_files_snap_only_mother)
         assert set(["complex", "amplitude", "phase"]).issubset(
@@ -494,6 +1148,131 @@ class TestFromSnapDataset:
         # Test data can be loaded without error
         _ = stack.compute()
 
+
+class TestZnapIndex:
+    """build_znap_index and from_znap with an index in _io.py"""
+
+    @pytest.fixture
+    def znap_dir(self, tmp_path, znap_files_snap):
+        for file in znap_files_snap:
+            shutil.copytree(file, tmp_path / os.path.basename(file))
+        return tmp_path
+
+    def test_build_index(self, znap_dir):
+        index = sarxarray.build_znap_index(znap_dir)
+        assert index == str(znap_dir / "znap_index.json")
+        with open(index) as f:
+            archives = json.load(f)["archives"]
+        assert [archive["path"] for archive in archives] == [
+            "20230319-coreg.znap",
+            "20230331-coreg.znap",
+        ]
+        assert [archive["is_mother"] for archive in archives] == [False, True]
+        assert archives[0]["epoch"] == "20230319"
+        assert archives[1]["first_line_number"] == 912
+        assert archives[1]["first_pixel_number"] == 9178
+        assert set(archives[0]["variables"]) == {"i", "q", "h2ph"}
+        assert archives[0]["variables"]["i"]["name"] == "i_VV_19Mar2023"
+        assert archives[0]["variables"]["i"]["shape"] == [84, 338]
+
+    def test_build_index_empty(self, tmp_path):
+        with pytest.raises(ValueError):
+            sarxarray.build_znap_index(tmp_path)
+
+    def test_from_index(self, znap_dir, tmp_path_factory):
+        index = sarxarray.build_znap_index(
+            znap_dir, output=tmp_path_factory.mktemp("index") / "index.json"
+        )
+        stack = sarxarray.from_znap(sorted(znap_dir.glob("*.znap")))
+        stack_index = sarxarray.from_znap(index=index, max_workers=2)
+        xr.testing.assert_identical(stack_index.drop_attrs(), stack.drop_attrs())
+        assert stack_index.attrs["mother_epoch"] == stack.attrs["mother_epoch"]
+        metadata = stack.attrs["metadata_mother"]
+        metadata_index = stack_index.attrs["metadata_mother"]
+        assert metadata_index.keys() == metadata.keys()
+        for key, value in metadata.items():
+            if isinstance(value, np.ndarray):
+                assert metadata_index[key].dtype == value.dtype
+                assert np.array_equal(metadata_index[key], value)
+            else:
+                assert metadata_index[key] == value
+
+    def test_from_index_no_metadata_files(self, znap_dir):
+        index = sarxarray.build_znap_index(znap_dir)
+        for file in znap_dir.glob("*.znap/SNAP/product_metadata.json"):
+            file.unlink()
+        stack = sarxarray.from_znap(index=index)
+        assert stack.sizes == {"azimuth": 84, "range": 338, "time": 2}
+
+    def test_from_index_lazy(self, znap_dir):
+        index = sarxarray.build_znap_index(znap_dir)
+        stack = sarxarray.from_znap(index=index)
+        for name in ["complex", "h2ph", "latitude"]:
+            assert isinstance(stack[name].data, da.Array)
+        assert stack["h2ph"].chunks == ((84,), (338,), (1, 1))
+
+    def test_from_index_outdated(self, znap_dir):
+        index = sarxarray.build_znap_index(znap_dir)
+        with open(index) as f:
+            content = json.load(f)
+        content["archives"][0]["variables"]["i"]["shape"] = [100, 338]
+        with open(index, "w") as f:
+            json.dump(content, f)
+        with pytest.raises(ValueError):
+            sarxarray.from_znap(index=index)
+
+
+class TestMmapCache:
+    """Cache of memory maps used by from_binary in _io.py"""
+
+    @pytest.fixture(autouse=True)
+    def reset_cache(self):
+        maxsize = sarxarray.mmap_cache_info()["maxsize"]
+        sarxarray.set_mmap_cache_size(maxsize, clear=True)
+        yield
+        sarxarray.set_mmap_cache_size(maxsize, clear=True)
+
+    def test_cache_hits_and_misses(self, test_slcs):
+        stack = sarxarray.from_binary(
+            test_slcs, (100, 100), dtype=np.complex64, chunks=(50, 50)
+        )
+        stack.complex.compute(scheduler="sync")
+        info = sarxarray.mmap_cache_info()
+        assert info["misses"] == 2  # one per file
+        assert info["hits"] == 2 * 4 - 2
+        assert info["currsize"] == 2
+
+        # A second pass only hits the cache
+        stack.complex.compute(scheduler="sync")
+        info = sarxarray.mmap_cache_info()
+        assert info["misses"] == 2
+        assert info["hits"] == 2 * 2 * 4 - 2
+
+    def test_cache_eviction(self, test_slcs):
+        sarxarray.set_mmap_cache_size(1)
+        stack = sarxarray.from_binary(
+            test_slcs, (100, 100), dtype=np.complex64, chunks=(50, 50), time_chunks=2
+        )
+        stack.complex.compute(scheduler="sync")
+        info = sarxarray.mmap_cache_info()
+        assert info["currsize"] == 1
+        assert info["misses"] == 2 * 4  # files alternate, each read is a miss
+
+    def test_cache_disabled(self, test_slcs):
+        sarxarray.set_mmap_cache_size(0)
+        stack = sarxarray.from_binary(
+            test_slcs, (100, 100), dtype=np.complex64, chunks=(50, 50)
+        )
+        stack.complex.compute(scheduler="sync")
+        info = sarxarray.mmap_cache_info()
+        assert info["currsize"] == 0
+        assert info["hits"] == 0
+
+    def test_cache_negative_size_failing(self):
+        with pytest.raises(ValueError):
+            sarxarray.set_mmap_cache_size(-1)
+
+
 class TestToBinary:
     """to_binary in _io.py"""
 
@@ -514,6 +1293,48 @@ class TestToBinary:
         sarxarray.to_binary(str(output_path), arr)
         assert output_path.exists()
 
+    def test_to_binary_values_roundtrip(self, test_slcs, tmp_path):
+        output_path = tmp_path / "dummy_ds.raw"
+        stack = sarxarray.from_binary(
+            test_slcs, (100, 100), dtype=np.complex64, chunks=(30, 40)
+        )
+        sarxarray.to_binary(str(output_path), stack, data_var_name="complex")
+        written = np.fromfile(output_path, dtype=np.complex64).reshape((100, 100, 2))
+        assert np.array_equal(written, stack.complex.values)
+
+    def test_to_binary_numpy_backed(self, tmp_path):
+        output_path = tmp_path / "dummy_arr.raw"
+        arr = xr.DataArray(np.arange(12, dtype=np.float32).reshape((3, 4)))
+        sarxarray.to_binary(str(output_path), arr)
+        written = np.fromfile(output_path, dtype=np.float32).reshape((3, 4))
+        assert np.array_equal(written, arr.values)
+
+    def test_to_binary_streams_chunks(self, test_slcs, tmp_path, monkeypatch):
+        output_path = tmp_path / "dummy_ds.raw"
+        stack = sarxarray.from_binary(
+            test_slcs, (100, 100), dtype=np.complex64, chunks=(50, 50)
+        )
+        written_shapes = []
+        setitem = sarxarray._io._BinaryWriter.__setitem__
+
+        def record_setitem(self, key, value):
+            written_shapes.append(value.shape)
+            setitem(self, key, value)
+
+        monkeypatch.setattr(sarxarray._io._BinaryWriter, "__setitem__", record_setitem)
+        sarxarray.to_binary(str(output_path), stack, data_var_name="complex")
+        # Written chunk by chunk, the whole array is never materialized
+        assert written_shapes == [(50, 50, 1)] * 8
+
+    def test_to_binary_logs_throughput(self, test_slcs, tmp_path, caplog):
+        output_path = tmp_path / "dummy_ds.raw"
+        stack = sarxarray.from_binary(
+            test_slcs, (100, 100), dtype=np.complex64, chunks=(50, 50)
+        )
+        with caplog.at_level(logging.INFO, logger="sarxarray._io"):
+            sarxarray.to_binary(str(output_path), stack, data_var_name="complex")
+        assert "MB/s" in caplog.text
+
     def test_empty_data_var_with_dataset(self, test_slcs):
         stack = sarxarray.from_binary(
             test_slcs[-1:], (100, 100), dtype=np.complex64, chunks=(10, 10)
@@ -571,3 +1392,109 @@ class TestToBinary:
             str(output_path), stack, data_var_name="complex", allow_overwrite=True
         )
         assert output_path.exists()
+
+
+class TestToBinaryStack:
+    """to_binary_stack in _io.py"""
+
+    def test_to_binary_stack_directory(self, test_slcs, tmp_path):
+        stack = sarxarray.from_binary(
+            test_slcs, (100, 100), dtype=np.complex64, chunks=(30, 40)
+        )
+        output_paths = sarxarray.to_binary_stack(
+            tmp_path / "export", stack, data_var_name="complex"
+        )
+        assert output_paths == [
+            str(tmp_path / "export" / "0.raw"),
+            str(tmp_path / "export" / "1.raw"),
+        ]
+        for f_out, f_in in zip(output_paths, test_slcs, strict=True):
+            written = np.fromfile(f_out, dtype=np.complex64)
+            assert np.array_equal(written, np.fromfile(f_in, dtype=np.complex64))
+        assert not list((tmp_path / "export").glob("*.part"))
+
+    def test_to_binary_stack_pattern_datetime(self, test_slcs, tmp_path):
+        stack = sarxarray.from_binary(
+            test_slcs, (100, 100), dtype=np.complex64, chunks=(30, 40)
+        )
+        stack = stack.assign_coords(
+            time=np.array(["2018-03-06", "2018-03-12"], dtype="datetime64[ns]")
+        )
+        output_paths = sarxarray.to_binary_stack(
+            str(tmp_path / "{epoch}" / "slc_{index}.raw"), stack.amplitude
+        )
+        assert output_paths == [
+            str(tmp_path / "20180306" / "slc_0.raw"),
+            str(tmp_path / "20180312" / "slc_1.raw"),
+        ]
+        written = np.fromfile(output_paths[1], dtype=np.float32).reshape((100, 100))
+        assert np.array_equal(written, stack.amplitude.isel(time=1).values)
+
+    def test_to_binary_stack_reads_shared_chunks_once(self, test_slcs, tmp_path):
+        maxsize = sarxarray.mmap_cache_info()["maxsize"]
+        stack = sarxarray.from_binary(
+            test_slcs, (100, 100), dtype=np.complex64, chunks=(50, 50), time_chunks=2
+        )
+        sarxarray.set_mmap_cache_size(maxsize, clear=True)
+        sarxarray.to_binary_stack(tmp_path, stack, data_var_name="complex")
+        info = sarxarray.mmap_cache_info()
+        # 4 blocks of 2 epochs, each read once
+        assert info["hits"] + info["misses"] == 4 * 2
+
+    def test_to_binary_stack_exists_no_overwrite(self, test_slcs, tmp_path):
+        stack = sarxarray.from_binary(
+            test_slcs, (100, 100), dtype=np.complex64, chunks=(30, 40)
+        )
+        (tmp_path / "1.raw").write_bytes(b"existing")
+        with pytest.raises(OSError):
+            sarxarray.to_binary_stack(tmp_path, stack, data_var_name="complex")
+        # Nothing is written when an existing file is found
+        assert not (tmp_path / "0.raw").exists()
+
+    def test_to_binary_stack_allow_overwrite(self, test_slcs, tmp_path):
+        stack = sarxarray.from_binary(
+            test_slcs, (100, 100), dtype=np.complex64, chunks=(30, 40)
+        )
+        (tmp_path / "1.raw").write_bytes(b"existing")
+        sarxarray.to_binary_stack(
+            tmp_path, stack, data_var_name="complex", allow_overwrite=True
+        )
+        assert (tmp_path / "1.raw").stat().st_size == 100 * 100 * 8
+
+    def test_to_binary_stack_resume(self, test_slcs, tmp_path):
+        stack = sarxarray.from_binary(
+            test_slcs, (100, 100), dtype=np.complex64, chunks=(30, 40)
+        )
+        # Simulate a partial failure: epoch 0 complete, epoch 1 incomplete
+        (tmp_path / "0.raw").write_bytes(b"complete")
+        (tmp_path / "1.raw.part").write_bytes(b"incomplete")
+        sarxarray.to_binary_stack(tmp_path, stack, data_var_name="complex", resume=True)
+        assert (tmp_path / "0.raw").read_bytes() == b"complete"
+        written = np.fromfile(tmp_path / "1.raw", dtype=np.complex64)
+        assert np.array_equal(written, np.fromfile(test_slcs[1], dtype=np.complex64))
+        assert not (tmp_path / "1.raw.part").exists()
+
+    def test_to_binary_stack_duplicate_paths_failing(self, test_slcs, tmp_path):
+        stack = sarxarray.from_binary(
+            test_slcs, (100, 100), dtype=np.complex64, chunks=(30, 40)
+        )
+        with pytest.raises(ValueError):
+            sarxarray.to_binary_stack(
+                str(tmp_path / "{index}" / "slc.raw").replace("{index}", "{{x}}"),
+                stack,
+                data_var_name="complex",
+            )
+
+    def test_to_binary_stack_no_time_failing(self, test_slcs, tmp_path):
+        stack = sarxarray.from_binary(
+            test_slcs, (100, 100), dtype=np.complex64, chunks=(30, 40)
+        )
+        with pytest.raises(ValueError):
+            sarxarray.to_binary_stack(tmp_path, stack.complex.isel(time=0))
+
+    def test_to_binary_stack_empty_data_var_failing(self, test_slcs, tmp_path):
+        stack = sarxarray.from_binary(
+            test_slcs, (100, 100), dtype=np.complex64, chunks=(30, 40)
+        )
+        with pytest.raises(ValueError):
+            sarxarray.to_binary_stack(tmp_path, stack)
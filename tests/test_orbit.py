@@ -0,0 +1,165 @@
+"""test orbit.py"""
+
+import os
+
+import dask.array as da
+import numpy as np
+import pytest
+
+import sarxarray
+from sarxarray.orbit import Orbit
+
+# A circular orbit with a constant climb rate
+RADIUS = 7.07e6
+OMEGA = 7.5e3 / RADIUS
+CLIMB = 1e3
+
+
+def _circular_position(t):
+    return np.stack(
+        [RADIUS * np.cos(OMEGA * t), RADIUS * np.sin(OMEGA * t), CLIMB * t], axis=-1
+    )
+
+
+def _circular_velocity(t):
+    return np.stack(
+        [
+            -RADIUS * OMEGA * np.sin(OMEGA * t),
+            RADIUS * OMEGA * np.cos(OMEGA * t),
+            np.full_like(t, CLIMB),
+        ],
+        axis=-1,
+    )
+
+
+@pytest.fixture
+def state_vectors():
+    time = np.arange(0, 201, 10.0)
+    return time, _circular_position(time), _circular_velocity(time)
+
+
+@pytest.fixture
+def query_times():
+    return np.random.default_rng(0).uniform(0, 200, (50, 40))
+
+
+@pytest.fixture
+def metadata_file_doris5():
+    return (
+        f"{os.path.dirname(__file__)}/data/metadata/meta_doris5/20180306/metadata.res"
+    )
+
+
+@pytest.fixture
+def metadata_file_snap():
+    return (
+        f"{os.path.dirname(__file__)}/data/zarrs/20230331-coreg.znap/SNAP/"
+        "product_metadata.json"
+    )
+
+
+class TestOrbit:
+    @pytest.mark.parametrize(
+        "method, degree, tolerance",
+        [("hermite", 5, 1e-3), ("polynomial", 5, 1e-2), ("polynomial", 9, 1e-6)],
+    )
+    def test_interpolate(self, state_vectors, query_times, method, degree, tolerance):
+        orbit = Orbit(*state_vectors, method=method, degree=degree)
+        position, velocity = orbit.interpolate(query_times)
+        assert position.shape == velocity.shape == (50, 40, 3)
+        assert np.abs(position - _circular_position(query_times)).max() < tolerance
+        assert np.abs(velocity - _circular_velocity(query_times)).max() < tolerance
+
+    def test_interpolate_at_state_vectors(self, state_vectors):
+        time, position, velocity = state_vectors
+        orbit = Orbit(time, position, velocity)
+        assert orbit.method == "hermite"
+        position_interp, velocity_interp = orbit.interpolate(time)
+        assert np.allclose(position_interp, position, rtol=0, atol=1e-6)
+        assert np.allclose(velocity_interp, velocity, rtol=0, atol=1e-6)
+
+    def test_interpolate_polynomial_without_velocity(self, state_vectors):
+        time, position, _ = state_vectors
+        orbit = Orbit(time, position)
+        assert orbit.method == "polynomial"
+        assert orbit.velocity is None
+        times = np.array([0.0, 95.0, 200.0])
+        _, velocity = orbit.interpolate(times)
+        assert np.allclose(velocity, _circular_velocity(times), rtol=0, atol=1e-2)
+
+    def test_interpolate_dask(self, state_vectors, query_times):
+        orbit = Orbit(*state_vectors)
+        times = da.from_array(query_times, chunks=(20, 15))
+        position, velocity = orbit.interpolate(times)
+        assert isinstance(position, da.Array)
+        assert position.chunks == times.chunks + ((3,),)
+        position_np, velocity_np = orbit.interpolate(query_times)
+        assert np.array_equal(position.compute(), position_np)
+        assert np.array_equal(velocity.compute(), velocity_np)
+
+    def test_interpolate_datetime64(self, state_vectors):
+        reference = np.datetime64("2023-03-31T05:50:00", "ns")
+        orbit = Orbit(*state_vectors, reference=reference)
+        times = reference + np.array([1500, 97250], dtype="timedelta64[ms]")
+        position, _ = orbit.interpolate(times)
+        assert np.allclose(position, orbit.interpolate([1.5, 97.25])[0])
+
+    def test_interpolate_datetime64_without_reference(self, state_vectors):
+        orbit = Orbit(*state_vectors)
+        with pytest.raises(ValueError):
+            orbit.interpolate(np.array(["2023-03-31T05:50:00"], dtype="datetime64[ns]"))
+
+    def test_interpolate_outside(self, state_vectors):
+        orbit = Orbit(*state_vectors)
+        with pytest.raises(ValueError):
+            orbit.interpolate([100.0, 200.5])
+
+    def test_invalid_state_vectors(self, state_vectors):
+        time, position, velocity = state_vectors
+        with pytest.raises(ValueError):
+            Orbit(time[::-1], position, velocity)
+        with pytest.raises(ValueError):
+            Orbit(time, position[:, :2])
+        with pytest.raises(ValueError):
+            Orbit(time[:1], position[:1])
+        with pytest.raises(ValueError):
+            Orbit(time, position, method="hermite")
+        with pytest.raises(ValueError):
+            Orbit(time, position, method="spline")
+
+    def test_from_metadata_doris5(self, metadata_file_doris5):
+        metadata = sarxarray.read_metadata(metadata_file_doris5, driver="doris5")
+        orbit = Orbit.from_metadata(metadata)
+        assert orbit.method == "polynomial"
+        assert orbit.reference == np.datetime64("2018-03-06", "ns")
+        assert np.array_equal(orbit.time, metadata["orbit_txyz"][:, 0])
+        position, _ = orbit.interpolate(orbit.time)
+        assert np.allclose(position, metadata["orbit_txyz"][:, 1:], rtol=0, atol=1e-2)
+        # The position at the first line
+        position, velocity = orbit.interpolate(
+            np.array([metadata["first_azimuth_time"]])
+        )
+        assert np.linalg.norm(position) == pytest.approx(7.07e6, rel=0.01)
+        assert np.linalg.norm(velocity) == pytest.approx(7.6e3, rel=0.01)
+
+    def test_from_metadata_snap(self, metadata_file_snap):
+        metadata = sarxarray.read_metadata(metadata_file_snap, driver="snap")
+        orbit = Orbit.from_metadata(metadata)
+        assert orbit.method == "hermite"
+        assert orbit.time[0] == 0
+        position, velocity = orbit.interpolate(orbit.time)
+        assert np.allclose(position, metadata["orbit_position"], rtol=0, atol=1e-6)
+        assert np.allclose(velocity, metadata["orbit_velocity"], rtol=0, atol=1e-6)
+        position, _ = orbit.interpolate(np.array([metadata["first_azimuth_time"]]))
+        assert np.linalg.norm(position) == pytest.approx(7.07e6, rel=0.01)
+
+    def test_from_metadata_multiple_files(self, metadata_file_doris5):
+        metadata = sarxarray.read_metadata(
+            [metadata_file_doris5, metadata_file_doris5], driver="doris5"
+        )
+        with pytest.raises(ValueError):
+            Orbit.from_metadata(metadata)
+
+    def test_from_metadata_without_orbit(self):
+        with pytest.raises(ValueError):
+            Orbit.from_metadata({"first_azimuth_time": np.datetime64("2018-03-06")})
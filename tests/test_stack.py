@@ -38,6 +38,38 @@ class TestStackSARrelated:
         assert ds.range.size == 10
         assert ds.time.size == 10
 
+    def test_stack_get_amp_phase(self, synthetic_dataset):
+        ds = synthetic_dataset.slcstack._get_amplitude_phase()
+        assert np.allclose(ds.amplitude, np.abs(synthetic_dataset.complex))
+        assert np.allclose(ds.phase, np.angle(synthetic_dataset.complex))
+
+    def test_stack_get_amp_phase_one_kernel(self, synthetic_dataset):
+        ds = synthetic_dataset.chunk({"azimuth": 5, "range": 5, "time": 1})
+        ds = ds.slcstack._get_amplitude_phase()
+        # Amplitude and phase are outputs of the same fused kernel layer
+        layers_amp = set(ds.amplitude.data.__dask_graph__().layers)
+        layers_phase = set(ds.phase.data.__dask_graph__().layers)
+        assert len(layers_amp & layers_phase) == 2  # complex and fused kernel
+
+    def test_stack_amp_phase_properties_derived(self, synthetic_dataset):
+        amplitude = synthetic_dataset.slcstack.amplitude
+        phase = synthetic_dataset.slcstack.phase
+        assert amplitude.dims == ("azimuth", "range", "time")
+        assert np.allclose(amplitude, np.abs(synthetic_dataset.complex))
+        assert np.allclose(phase, np.angle(synthetic_dataset.complex))
+        # Derived on access, not stored in the stack
+        assert "amplitude" not in synthetic_dataset.data_vars
+        assert "phase" not in synthetic_dataset.data_vars
+
+    def test_stack_amp_phase_properties_attached(self, synthetic_dataset):
+        ds = synthetic_dataset.slcstack._get_amplitude_phase()
+        assert ds.slcstack.amplitude.identical(ds.amplitude)
+        assert ds.slcstack.phase.identical(ds.phase)
+
+    def test_stack_mrm_no_amplitude(self, synthetic_dataset):
+        mrm = synthetic_dataset.slcstack.mrm()
+        assert np.allclose(np.abs(synthetic_dataset.complex).mean(axis=2), mrm)
+
     def test_stack_mrm(self, synthetic_dataset):
         ds = synthetic_dataset.slcstack._get_amplitude()
         mrm = ds.slcstack.mrm()
@@ -53,6 +85,14 @@ class TestStackSARrelated:
         amp_disp_calc = amp.std(axis=2) / amp.mean(axis=2)
         assert np.allclose(amp_disp, amp_disp_calc)
 
+    def test_amp_disp_time_one_chunk_no_rechunk(self, synthetic_dataset):
+        ds = synthetic_dataset.chunk({"azimuth": 5, "range": 5, "time": -1})
+        ds = ds.slcstack._get_amplitude()
+        amp_disp = ds.slcstack._amp_disp()
+        layers = amp_disp.data.__dask_graph__().layers
+        assert not any(name.startswith("rechunk") for name in layers)
+        assert amp_disp.chunks == ((5, 5), (5, 5))
+
     def test_stack_pointselection_all(self, synthetic_dataset):
         synthetic_dataset = synthetic_dataset.slcstack._get_amplitude()
         synthetic_dataset = synthetic_dataset.slcstack._get_phase()
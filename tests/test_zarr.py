@@ -0,0 +1,394 @@
+"""test _zarr.py"""
+
+import json
+import logging
+import os
+
+import numpy as np
+import pytest
+import xarray as xr
+
+import sarxarray
+from sarxarray import _zarr
+
+
+@pytest.fixture()
+def test_slcs():
+    return [
+        f"{os.path.dirname(__file__)}/data/scene_0.binaray",
+        f"{os.path.dirname(__file__)}/data/scene_1.binaray",
+    ]
+
+
+@pytest.fixture()
+def res_files_doris5():
+    return [
+        f"{os.path.dirname(__file__)}/data/metadata/meta_doris5/20180306/metadata.res",
+        f"{os.path.dirname(__file__)}/data/metadata/meta_doris5/20180312/metadata.res",
+    ]
+
+
+class TestBinaryToZarr:
+    """binary_to_zarr in _zarr.py"""
+
+    def test_binary_to_zarr_values(self, test_slcs, tmp_path):
+        output = sarxarray.binary_to_zarr(
+            test_slcs, (100, 100), tmp_path / "stack.zarr", chunks=(30, 50)
+        )
+        stack = sarxarray.from_dataset(xr.open_zarr(output))
+        stack_binary = sarxarray.from_binary(test_slcs, (100, 100))
+        assert stack.complex.dtype == np.complex64
+        assert np.array_equal(stack.complex.values, stack_binary.complex.values)
+        assert stack.complex.data.chunks == ((30, 30, 30, 10), (50, 50), (1, 1))
+
+    def test_binary_to_zarr_time_chunks(self, test_slcs, tmp_path):
+        output = sarxarray.binary_to_zarr(
+            test_slcs,
+            (100, 100),
+            tmp_path / "stack.zarr",
+            chunks=(50, 100),
+            time_chunks=-1,
+            compressors=None,
+        )
+        ds = xr.open_zarr(output)
+        assert ds["real"].data.chunks == ((50, 50), (100,), (2,))
+        # No compression, with the encoding of Zarr 2 or 3
+        assert not ds["real"].encoding.get("compressor")
+        assert not ds["real"].encoding.get("compressors")
+
+    def test_binary_to_zarr_metadata(self, test_slcs, res_files_doris5, tmp_path):
+        output = sarxarray.binary_to_zarr(
+            test_slcs,
+            (100, 100),
+            tmp_path / "stack.zarr",
+            metadata_files=res_files_doris5,
+        )
+        ds = xr.open_zarr(output)
+        assert np.issubdtype(ds.time.dtype, np.datetime64)
+        assert ds.time.values[0] == np.datetime64("2018-03-06T17:24:29.954980")
+        assert ds.attrs["swath"] == "IW3"
+        assert ds.attrs["number_of_pixels"] == [24865, 24866]
+
+    def test_binary_to_zarr_metadata_length_failing(
+        self, test_slcs, res_files_doris5, tmp_path
+    ):
+        with pytest.raises(ValueError):
+            sarxarray.binary_to_zarr(
+                test_slcs,
+                (100, 100),
+                tmp_path / "stack.zarr",
+                metadata_files=res_files_doris5[:1],
+            )
+
+    def test_binary_to_zarr_metadata_unsorted_failing(
+        self, test_slcs, res_files_doris5, tmp_path
+    ):
+        # The acquisition times would be sorted, but not the SLC files
+        with pytest.raises(ValueError, match="order of their acquisition times"):
+            sarxarray.binary_to_zarr(
+                test_slcs,
+                (100, 100),
+                tmp_path / "stack.zarr",
+                metadata_files=res_files_doris5[::-1],
+            )
+
+    def test_binary_to_zarr_manifest(self, test_slcs, tmp_path):
+        output = sarxarray.binary_to_zarr(
+            test_slcs, (100, 100), tmp_path / "stack.zarr", chunks=(50, 50)
+        )
+        with open(f"{output}.manifest.json") as f:
+            manifest = json.load(f)
+        assert manifest["config"]["chunks"] == [50, 50, 1]
+        assert sorted(manifest["done"]) == [[0, 0], [0, 1], [1, 0], [1, 1]]
+
+    def test_binary_to_zarr_resume(self, test_slcs, tmp_path, monkeypatch, caplog):
+        # Interrupt the conversion after two regions
+        write_manifest = _zarr._write_manifest
+        n_calls = []
+
+        def interrupted_write_manifest(manifest_path, manifest):
+            if len(n_calls) == 3:  # store creation and two regions
+                raise KeyboardInterrupt
+            n_calls.append(1)
+            write_manifest(manifest_path, manifest)
+
+        monkeypatch.setattr(_zarr, "_write_manifest", interrupted_write_manifest)
+        with pytest.raises(KeyboardInterrupt):
+            sarxarray.binary_to_zarr(
+                test_slcs, (100, 100), tmp_path / "stack.zarr", chunks=(50, 50)
+            )
+        monkeypatch.setattr(_zarr, "_write_manifest", write_manifest)
+
+        with caplog.at_level(logging.DEBUG, logger="sarxarray._zarr"):
+            output = sarxarray.binary_to_zarr(
+                test_slcs, (100, 100), tmp_path / "stack.zarr", chunks=(50, 50)
+            )
+        # The interrupted region is written again, the two recorded are skipped
+        assert caplog.text.count("Written region") == 2
+        assert "GB/s" in caplog.text
+
+        stack = sarxarray.from_dataset(xr.open_zarr(output))
+        stack_binary = sarxarray.from_binary(test_slcs, (100, 100))
+        assert np.array_equal(stack.complex.values, stack_binary.complex.values)
+
+    def test_binary_to_zarr_resume_different_inputs_failing(self, test_slcs, tmp_path):
+        sarxarray.binary_to_zarr(
+            test_slcs, (100, 100), tmp_path / "stack.zarr", chunks=(50, 50)
+        )
+        with pytest.raises(ValueError):
+            sarxarray.binary_to_zarr(
+                test_slcs, (100, 100), tmp_path / "stack.zarr", chunks=(20, 20)
+            )
+        # Without resume, the store is overwritten
+        output = sarxarray.binary_to_zarr(
+            test_slcs,
+            (100, 100),
+            tmp_path / "stack.zarr",
+            chunks=(20, 20),
+            resume=False,
+        )
+        assert xr.open_zarr(output)["real"].data.chunks[0] == (20,) * 5
+
+
+class TestAppendToZarr:
+    """append_to_zarr in _zarr.py"""
+
+    @pytest.fixture()
+    def store(self, test_slcs, res_files_doris5, tmp_path):
+        # Store with the first two epochs, time chunks of 2
+        return sarxarray.binary_to_zarr(
+            test_slcs,
+            (100, 100),
+            tmp_path / "stack.zarr",
+            chunks=(50, 50),
+            time_chunks=2,
+            metadata_files=res_files_doris5,
+        )
+
+    @pytest.fixture()
+    def metadata_file_new(self):
+        return (
+            f"{os.path.dirname(__file__)}/data/metadata/meta_doris5/20180318/"
+            "metadata.res"
+        )
+
+    def test_append_to_zarr(self, test_slcs, store, metadata_file_new):
+        stack_new = sarxarray.from_binary(test_slcs[::-1], (100, 100), chunks=(30, 30))
+        stack_new = stack_new.isel(time=[0])
+        sarxarray.append_to_zarr(stack_new, store, metadata_files=[metadata_file_new])
+
+        ds = xr.open_zarr(store)
+        assert ds.sizes == {"azimuth": 100, "range": 100, "time": 3}
+        assert ds["real"].encoding["chunks"] == (50, 50, 2)
+        metadata_new = sarxarray.read_metadata(metadata_file_new, driver="doris5")
+        assert ds.time.values[-1] == metadata_new["first_azimuth_time"]
+        stack = sarxarray.from_dataset(ds)
+        assert np.array_equal(
+            stack.complex.isel(time=2).values, stack_new.complex.isel(time=0).values
+        )
+        assert np.array_equal(
+            stack.complex.isel(time=1).values, stack_new.complex.isel(time=0).values
+        )
+        # The per-epoch metadata is extended, the common metadata is kept
+        assert len(ds.attrs["orbit_txyz"]) == 3
+        assert ds.attrs["swath"] == "IW3"
+
+    def test_append_to_zarr_metadata_unsorted_failing(
+        self, test_slcs, res_files_doris5, metadata_file_new, tmp_path
+    ):
+        store = sarxarray.binary_to_zarr(
+            test_slcs[:1],
+            (100, 100),
+            tmp_path / "stack.zarr",
+            metadata_files=res_files_doris5[:1],
+        )
+        stack_new = sarxarray.from_binary(test_slcs, (100, 100))
+        # The acquisition times would be sorted, but not the new epochs
+        with pytest.raises(ValueError, match="order of their acquisition times"):
+            sarxarray.append_to_zarr(
+                stack_new,
+                store,
+                metadata_files=[metadata_file_new, res_files_doris5[1]],
+            )
+        assert xr.open_zarr(store).sizes["time"] == 1
+
+    def test_append_to_zarr_metadata_length_failing(
+        self, test_slcs, store, metadata_file_new
+    ):
+        stack_new = sarxarray.from_binary(test_slcs, (100, 100))
+        with pytest.raises(ValueError):
+            sarxarray.append_to_zarr(
+                stack_new, store, metadata_files=[metadata_file_new]
+            )
+
+    def test_append_to_zarr_partial_time_chunk(self, test_slcs, store):
+        # Append one epoch at a time, the last time chunk is filled up
+        for time in [10, 11, 12]:
+            stack_new = sarxarray.from_binary(test_slcs[:1], (100, 100))
+            stack_new = stack_new.assign_coords(time=[np.datetime64(f"2018-04-{time}")])
+            sarxarray.append_to_zarr(stack_new, store)
+        ds = xr.open_zarr(store)
+        assert ds["real"].data.chunks[2] == (2, 2, 1)
+        assert np.array_equal(
+            ds["imag"].isel(time=-1).values,
+            ds["imag"].isel(time=0).values,
+        )
+
+    def test_append_to_zarr_different_grid_failing(self, test_slcs, store):
+        stack_new = sarxarray.from_binary(test_slcs[:1], (100, 100))
+        stack_new = stack_new.assign_coords(
+            time=[np.datetime64("2018-04-01")], azimuth=np.arange(1, 101)
+        )
+        with pytest.raises(ValueError):
+            sarxarray.append_to_zarr(stack_new, store)
+
+    def test_append_to_zarr_different_dtype_failing(self, test_slcs, store):
+        stack_new = sarxarray.from_binary(test_slcs[:1], (100, 100))
+        stack_new = stack_new.assign_coords(time=[np.datetime64("2018-04-01")])
+        stack_new["complex"] = stack_new["complex"].astype(np.complex128)
+        with pytest.raises(ValueError):
+            sarxarray.append_to_zarr(stack_new, store)
+
+    def test_append_to_zarr_earlier_time_failing(self, test_slcs, store):
+        stack_new = sarxarray.from_binary(test_slcs[:1], (100, 100))
+        stack_new = stack_new.assign_coords(time=[np.datetime64("2018-03-01")])
+        with pytest.raises(ValueError):
+            sarxarray.append_to_zarr(stack_new, store)
+        # Integer time from from_binary is not a valid epoch either
+        with pytest.raises(ValueError):
+            sarxarray.append_to_zarr(
+                sarxarray.from_binary(test_slcs, (100, 100)), store
+            )
+
+
+class TestQuantization:
+    """Quantized storage of binary_to_zarr and append_to_zarr in _zarr.py"""
+
+    @pytest.mark.parametrize(
+        "quantization,max_error",
+        [("int16", None), ("int16", 5.0), ("float16", None), ("float16", 50.0)],
+    )
+    def test_binary_to_zarr_quantized(
+        self, test_slcs, tmp_path, quantization, max_error
+    ):
+        output = sarxarray.binary_to_zarr(
+            test_slcs,
+            (100, 100),
+            tmp_path / "stack.zarr",
+            chunks=(30, 50),
+            quantization=quantization,
+            max_error=max_error,
+        )
+        ds = xr.open_zarr(output)
+        assert ds["real"].dtype == quantization
+        assert ds["scale"].shape == (4, 2, 2)
+
+        stack = sarxarray.from_dataset(ds)
+        stack_binary = sarxarray.from_binary(test_slcs, (100, 100))
+        assert set(stack.data_vars) == {"complex", "amplitude", "phase"}
+        assert stack.complex.dtype == np.complex64
+        error = np.abs(stack.complex.values - stack_binary.complex.values)
+        assert error.max() > 0
+        if max_error is not None:
+            assert error.max() <= max_error * np.sqrt(2)
+
+    def test_binary_to_zarr_quantized_error_bound_failing(self, test_slcs, tmp_path):
+        with pytest.raises(ValueError):
+            sarxarray.binary_to_zarr(
+                test_slcs,
+                (100, 100),
+                tmp_path / "stack.zarr",
+                quantization="float16",
+                max_error=1e-8,
+            )
+
+    def test_binary_to_zarr_quantized_unknown_failing(self, test_slcs, tmp_path):
+        with pytest.raises(ValueError):
+            sarxarray.binary_to_zarr(
+                test_slcs, (100, 100), tmp_path / "stack.zarr", quantization="int8"
+            )
+
+    def test_binary_to_zarr_quantized_resume(self, test_slcs, tmp_path, monkeypatch):
+        write_manifest = _zarr._write_manifest
+        n_calls = []
+
+        def interrupted_write_manifest(manifest_path, manifest):
+            if len(n_calls) == 2:  # store creation and one region
+                raise KeyboardInterrupt
+            n_calls.append(1)
+            write_manifest(manifest_path, manifest)
+
+        monkeypatch.setattr(_zarr, "_write_manifest", interrupted_write_manifest)
+        with pytest.raises(KeyboardInterrupt):
+            sarxarray.binary_to_zarr(
+                test_slcs,
+                (100, 100),
+                tmp_path / "stack.zarr",
+                chunks=(50, 50),
+                quantization="int16",
+            )
+        monkeypatch.setattr(_zarr, "_write_manifest", write_manifest)
+        output = sarxarray.binary_to_zarr(
+            test_slcs,
+            (100, 100),
+            tmp_path / "stack.zarr",
+            chunks=(50, 50),
+            quantization="int16",
+        )
+        stack = sarxarray.from_dataset(xr.open_zarr(output))
+        stack_binary = sarxarray.from_binary(test_slcs, (100, 100))
+        assert np.allclose(stack.complex.values, stack_binary.complex.values, atol=5)
+
+    def test_append_to_zarr_quantized(self, test_slcs, tmp_path):
+        output = sarxarray.binary_to_zarr(
+            test_slcs,
+            (100, 100),
+            tmp_path / "stack.zarr",
+            chunks=(50, 50),
+            quantization="int16",
+            max_error=5.0,
+        )
+        stack_new = sarxarray.from_binary(test_slcs[:1], (100, 100))
+        stack_new = stack_new.assign_coords(time=[2])
+        sarxarray.append_to_zarr(stack_new, output)
+
+        ds = xr.open_zarr(output)
+        assert ds["scale"].shape == (2, 2, 3)
+        assert ds["real"].attrs["quantization_max_error"] == 5.0
+        stack = sarxarray.from_dataset(ds)
+        error = np.abs(
+            stack.complex.isel(time=2).values - stack_new.complex.isel(time=0).values
+        )
+        assert error.max() <= 5.0 * np.sqrt(2)
+
+
+class TestMain:
+    """Command line interface in _zarr.py"""
+
+    def test_main(self, test_slcs, tmp_path):
+        output = str(tmp_path / "stack.zarr")
+        _zarr.main(
+            [
+                *test_slcs,
+                "--output",
+                output,
+                "--shape",
+                "100",
+                "100",
+                "--chunks",
+                "50",
+                "100",
+                "--time-chunks",
+                "auto",
+                "--compressor",
+                "zstd",
+            ]
+        )
+        ds = xr.open_zarr(output)
+        assert ds["real"].data.chunks == ((50, 50), (100,), (2,))
+        compressors = ds["real"].encoding.get("compressors") or [
+            ds["real"].encoding["compressor"]
+        ]
+        assert "zstd" in type(compressors[0]).__name__.lower()
+        stack_binary = sarxarray.from_binary(test_slcs, (100, 100))
+        assert np.array_equal(ds["imag"].values, stack_binary.complex.values.imag)